@@ -0,0 +1,122 @@
+"""
+Admission control for LLM calls.
+Caps the number of chat turns talking to the LLM at once, lets a bounded
+number wait for a slot until a deadline, and rejects the rest immediately so
+users get a fast "busy" reply instead of timing out behind a long queue.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+# How often waiting requests check whether their client has gone away
+_POLL_INTERVAL = 0.1
+
+
+class Overloaded(Exception):
+    """Raised when a request is turned away; `reason` is 'queue_full' or 'timeout'."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Server busy ({reason})")
+        self.reason = reason
+
+
+class Cancelled(Exception):
+    """Raised when the client disconnected before its request finished."""
+
+
+class AdmissionController:
+    """Counting semaphore with a bounded, deadline-limited wait queue."""
+
+    BUSY_MESSAGE = ("Sorry, we're getting a lot of questions right now and couldn't get to yours in time. "
+                    "Please try again in a moment. 🧸")
+
+    def __init__(self, max_concurrent: int = 4, max_queue: int = 16, queue_timeout: float = 10.0):
+        """Initialize the controller.
+
+        Args:
+            max_concurrent: Requests allowed to run at once.
+            max_queue: Requests allowed to wait for a slot; beyond that they are
+                rejected immediately.
+            queue_timeout: Seconds a request may wait before it is rejected.
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self._cond = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.stats = {
+            'admitted': 0,
+            'rejected_queue_full': 0,
+            'rejected_timeout': 0,
+            'cancelled': 0,
+            'peak_queue': 0,
+            'wait_time': 0.0,
+        }
+
+    def acquire(self, should_cancel: Optional[Callable[[], bool]] = None) -> float:
+        """Wait for a slot and return the seconds waited.
+
+        Raises Overloaded when the queue is full or the deadline passes, and
+        Cancelled when `should_cancel` reports that the client went away.
+        """
+        start = time.perf_counter()
+        deadline = start + self.queue_timeout
+        with self._cond:
+            if self.active >= self.max_concurrent and self.waiting >= self.max_queue:
+                self.stats['rejected_queue_full'] += 1
+                raise Overloaded('queue_full')
+
+            self.waiting += 1
+            self.stats['peak_queue'] = max(self.stats['peak_queue'], self.waiting)
+            try:
+                while self.active >= self.max_concurrent:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        self.stats['rejected_timeout'] += 1
+                        raise Overloaded('timeout')
+                    if should_cancel is not None and should_cancel():
+                        self.stats['cancelled'] += 1
+                        raise Cancelled()
+                    self._cond.wait(min(remaining, _POLL_INTERVAL))
+            finally:
+                self.waiting -= 1
+
+            self.active += 1
+            self.stats['admitted'] += 1
+            waited = time.perf_counter() - start
+            self.stats['wait_time'] += waited
+            return waited
+
+    def release(self):
+        """Free a slot and wake one waiting request."""
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+    def record_cancel(self):
+        """Count a request abandoned after it was admitted (e.g. mid LLM call)."""
+        with self._cond:
+            self.stats['cancelled'] += 1
+
+    @contextmanager
+    def slot(self, should_cancel: Optional[Callable[[], bool]] = None):
+        """Hold a slot for the duration of a `with` block."""
+        self.acquire(should_cancel)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def get_stats(self) -> Dict:
+        """Return current load, rejection counts and average queue wait."""
+        with self._cond:
+            stats = dict(self.stats)
+            stats['active'] = self.active
+            stats['queue_depth'] = self.waiting
+        stats['rejected'] = stats['rejected_queue_full'] + stats['rejected_timeout']
+        stats['avg_wait_ms'] = stats['wait_time'] / stats['admitted'] * 1000 if stats['admitted'] else 0.0
+        return stats
@@ -0,0 +1,1107 @@
+"""
+In-process vector indexes used alongside ChromaDB for large corpora.
+ExactIndex does brute-force search with NumPy; HNSWIndex uses hnswlib for
+approximate nearest-neighbour search with a tunable recall/latency knob (ef_search).
+Int8Index and PQIndex keep compressed codes in memory and re-score a short
+candidate list against memory-mapped float32 vectors. ShardedIndex partitions
+vectors across several of these and searches the shards in parallel.
+All return squared L2 distances, matching ChromaDB's default metric.
+Every index guards itself with a reader/writer lock, so searches run
+concurrently with each other but never see a half-applied add or remove.
+"""
+
+import functools
+import heapq
+import itertools
+import json
+import multiprocessing
+import os
+import threading
+import zlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from operator import itemgetter
+from typing import List, Dict, Tuple, Optional, Iterable
+
+import numpy as np
+
+try:
+    import hnswlib
+except ImportError:  # optional dependency
+    hnswlib = None
+
+
+class ReadWriteLock:
+    """Any number of readers, or one writer; a waiting writer holds back new readers."""
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writing = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writing or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writing or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
+
+_lock_init = threading.Lock()
+_scheduling = threading.Lock()
+
+
+def _reads(method):
+    """Run an index method under the index's read lock."""
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with self.lock.read():
+            return method(self, *args, **kwargs)
+    return locked
+
+
+def _writes(method):
+    """Run an index method under the index's write lock."""
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with self.lock.write():
+            return method(self, *args, **kwargs)
+    return locked
+
+
+class VectorIndex:
+    """Common interface for the vector indexes."""
+
+    kind = "base"
+
+    @property
+    def lock(self) -> ReadWriteLock:
+        """Reader/writer lock: search (and save, where it only reads) share it, mutations own it."""
+        lock = self.__dict__.get('_rw_lock')
+        if lock is None:
+            # Created lazily, since load() classmethods bypass __init__
+            with _lock_init:
+                lock = self.__dict__.setdefault('_rw_lock', ReadWriteLock())
+        return lock
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def add(self, ids: List[str], embeddings: np.ndarray):
+        """Insert vectors; ids already in the index are skipped."""
+        raise NotImplementedError
+
+    def remove(self, ids: Iterable[str]):
+        """Delete vectors by id (unknown ids are ignored)."""
+        raise NotImplementedError
+
+    def search(self, queries: np.ndarray, k: int) -> List[List[Tuple[str, float]]]:
+        """Return (id, squared L2 distance) pairs, closest first, for each query row."""
+        raise NotImplementedError
+
+    def clear(self):
+        """Remove all vectors."""
+        raise NotImplementedError
+
+    def save(self, path: str):
+        """Persist the index to a directory."""
+        raise NotImplementedError
+
+    @_writes
+    def configure(self, **options):
+        """Apply query-time settings (ef_search, rescore) this index supports; others are ignored."""
+        for name in ('ef_search', 'rescore'):
+            if name in options and hasattr(self, name):
+                setattr(self, name, options[name])
+
+    def close(self):
+        """Release worker threads or processes (nothing to release for single in-process indexes)."""
+
+
+class ExactIndex(VectorIndex):
+    """Brute-force float32 index; exact results, O(n) per query."""
+
+    kind = "exact"
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.clear()
+
+    def __len__(self) -> int:
+        return self._count
+
+    @_writes
+    def clear(self):
+        self._vectors = np.empty((0, self.dim), dtype=np.float32)
+        self._norms = np.empty(0, dtype=np.float32)
+        self._ids: List[str] = []
+        self._positions = {}
+        self._count = 0
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """View of the stored vectors (rows aligned with `ids`)."""
+        return self._vectors[:self._count]
+
+    @property
+    def ids(self) -> List[str]:
+        return self._ids
+
+    def _reserve(self, extra: int):
+        needed = self._count + extra
+        if needed <= len(self._vectors):
+            return
+        capacity = max(needed, 2 * len(self._vectors), 1024)
+        vectors = np.empty((capacity, self.dim), dtype=np.float32)
+        norms = np.empty(capacity, dtype=np.float32)
+        vectors[:self._count] = self._vectors[:self._count]
+        norms[:self._count] = self._norms[:self._count]
+        self._vectors, self._norms = vectors, norms
+
+    @_writes
+    def add(self, ids: List[str], embeddings: np.ndarray):
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dim)
+        keep = [i for i, doc_id in enumerate(ids) if doc_id not in self._positions]
+        if not keep:
+            return
+        if len(keep) < len(ids):
+            embeddings = embeddings[keep]
+            ids = [ids[i] for i in keep]
+
+        self._reserve(len(ids))
+        start, end = self._count, self._count + len(ids)
+        self._vectors[start:end] = embeddings
+        self._norms[start:end] = np.einsum('ij,ij->i', embeddings, embeddings)
+        for offset, doc_id in enumerate(ids):
+            self._positions[doc_id] = start + offset
+        self._ids.extend(ids)
+        self._count = end
+
+    @_writes
+    def remove(self, ids: Iterable[str]):
+        for doc_id in ids:
+            pos = self._positions.pop(doc_id, None)
+            if pos is None:
+                continue
+            last = self._count - 1
+            if pos != last:
+                # Move the last row into the hole to keep storage dense
+                moved_id = self._ids[last]
+                self._vectors[pos] = self._vectors[last]
+                self._norms[pos] = self._norms[last]
+                self._ids[pos] = moved_id
+                self._positions[moved_id] = pos
+            self._ids.pop()
+            self._count = last
+
+    @_reads
+    def search(self, queries: np.ndarray, k: int) -> List[List[Tuple[str, float]]]:
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        if self._count == 0:
+            return [[] for _ in range(len(queries))]
+
+        k = min(k, self._count)
+        vectors = self._vectors[:self._count]
+        query_norms = np.einsum('ij,ij->i', queries, queries)
+        distances = query_norms[:, None] + self._norms[:self._count][None, :] - 2.0 * (queries @ vectors.T)
+
+        results = []
+        for row in distances:
+            top = np.argpartition(row, k - 1)[:k] if k < len(row) else np.arange(len(row))
+            top = top[np.argsort(row[top])]
+            results.append([(self._ids[i], float(max(row[i], 0.0))) for i in top])
+        return results
+
+    @_reads
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "vectors.npy"), self.vectors)
+        np.save(os.path.join(path, "ids.npy"), np.array(self._ids, dtype=str))
+        with open(os.path.join(path, "index.json"), 'w', encoding='utf-8') as f:
+            json.dump({'kind': self.kind, 'dim': self.dim, 'count': self._count}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "ExactIndex":
+        with open(os.path.join(path, "index.json"), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        index = cls(meta['dim'])
+        vectors = np.load(os.path.join(path, "vectors.npy"))
+        ids = np.load(os.path.join(path, "ids.npy")).tolist()
+        index.add(ids, vectors)
+        return index
+
+
+class HNSWIndex(VectorIndex):
+    """Approximate nearest-neighbour index backed by hnswlib.
+
+    Knobs:
+        m: Graph degree. Higher improves recall at the cost of memory/build time.
+        ef_construction: Build-time beam width.
+        ef_search: Query-time beam width; raise for recall, lower for latency.
+    """
+
+    kind = "hnsw"
+
+    def __init__(self, dim: int, max_elements: int = 100_000, m: int = 16,
+                 ef_construction: int = 200, ef_search: int = 64):
+        if hnswlib is None:
+            raise ImportError("HNSWIndex requires the 'hnswlib' package: pip install hnswlib")
+        self.dim = dim
+        self.m = m
+        self.ef_construction = ef_construction
+        self._ef_search = ef_search
+        self._initial_capacity = max_elements
+        self.clear()
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    @_writes
+    def clear(self):
+        self._index = hnswlib.Index(space='l2', dim=self.dim)
+        self._index.init_index(max_elements=self._initial_capacity, ef_construction=self.ef_construction,
+                               M=self.m, allow_replace_deleted=True)
+        self._index.set_ef(self._ef_search)
+        self._labels = {}        # chunk id -> integer label
+        self._ids: List[Optional[str]] = []  # integer label -> chunk id (None once deleted)
+        self._deleted_slots = 0  # graph slots freed by remove(), reused by add()
+
+    @property
+    def ef_search(self) -> int:
+        return self._ef_search
+
+    @ef_search.setter
+    def ef_search(self, value: int):
+        self._ef_search = value
+        self._index.set_ef(value)
+
+    @_writes
+    def add(self, ids: List[str], embeddings: np.ndarray):
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dim)
+        keep = [i for i, doc_id in enumerate(ids) if doc_id not in self._labels]
+        if not keep:
+            return
+        if len(keep) < len(ids):
+            embeddings = embeddings[keep]
+            ids = [ids[i] for i in keep]
+
+        reused = min(len(ids), self._deleted_slots)
+        needed = self._index.get_current_count() + len(ids) - reused
+        capacity = self._index.get_max_elements()
+        if needed > capacity:
+            self._index.resize_index(max(needed, 2 * capacity))
+
+        labels = np.arange(len(self._ids), len(self._ids) + len(ids), dtype=np.int64)
+        for doc_id, label in zip(ids, labels):
+            self._labels[doc_id] = int(label)
+        self._ids.extend(ids)
+
+        # Deleted slots are overwritten in place before the graph grows
+        self._index.add_items(embeddings, labels, replace_deleted=True)
+        self._deleted_slots -= reused
+
+    @_writes
+    def remove(self, ids: Iterable[str]):
+        for doc_id in ids:
+            label = self._labels.pop(doc_id, None)
+            if label is None:
+                continue
+            self._index.mark_deleted(label)
+            self._ids[label] = None
+            self._deleted_slots += 1
+
+    @_reads
+    def search(self, queries: np.ndarray, k: int) -> List[List[Tuple[str, float]]]:
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        if not self._labels:
+            return [[] for _ in range(len(queries))]
+
+        # hnswlib searches with max(ef, k), so ef is never toggled under the shared read lock
+        k = min(k, len(self._labels))
+        labels, distances = self._index.knn_query(queries, k=k)
+
+        return [
+            [(self._ids[label], float(dist)) for label, dist in zip(row_labels, row_dists)]
+            for row_labels, row_dists in zip(labels, distances)
+        ]
+
+    @_reads
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        self._index.save_index(os.path.join(path, "hnsw.bin"))
+        np.save(os.path.join(path, "ids.npy"), np.array([i or "" for i in self._ids], dtype=str))
+        with open(os.path.join(path, "index.json"), 'w', encoding='utf-8') as f:
+            json.dump({
+                'kind': self.kind,
+                'dim': self.dim,
+                'm': self.m,
+                'ef_construction': self.ef_construction,
+                'ef_search': self._ef_search,
+                'count': len(self._labels),
+            }, f)
+
+    @classmethod
+    def load(cls, path: str, ef_search: Optional[int] = None) -> "HNSWIndex":
+        with open(os.path.join(path, "index.json"), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        index = cls.__new__(cls)
+        index.dim = meta['dim']
+        index.m = meta['m']
+        index.ef_construction = meta['ef_construction']
+        index._ef_search = ef_search or meta['ef_search']
+        index._initial_capacity = max(meta['count'], 1024)
+
+        index._index = hnswlib.Index(space='l2', dim=index.dim)
+        index._index.load_index(os.path.join(path, "hnsw.bin"), allow_replace_deleted=True)
+        index._index.set_ef(index._ef_search)
+
+        index._ids = [i or None for i in np.load(os.path.join(path, "ids.npy")).tolist()]
+        index._labels = {doc_id: label for label, doc_id in enumerate(index._ids) if doc_id}
+        index._deleted_slots = index._index.get_current_count() - len(index._labels)
+        return index
+
+
+class QuantizedIndex(VectorIndex):
+    """Compressed index: quantized codes in RAM, float32 vectors for re-scoring.
+
+    Search scores every code approximately, then re-ranks the best
+    `rescore * k` candidates with exact float32 distances. After save()/load()
+    the float32 vectors are memory-mapped from disk, so only the codes, norms
+    and ids take private memory in each worker.
+
+    Codecs that learn from the data (PQ) are trained off the query path: the
+    slow fit runs on a background thread without holding the index lock, and
+    searches keep using the previous codec until the new codes are swapped in.
+    """
+
+    kind = "quantized"
+    code_dtype = np.uint8
+    _block_rows = 4096
+
+    def __init__(self, dim: int, rescore: int = 4):
+        self.dim = dim
+        self.rescore = rescore
+        self._training = threading.Lock()
+        self._training_thread: Optional[threading.Thread] = None
+        self.clear()
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def code_width(self) -> int:
+        raise NotImplementedError
+
+    @property
+    def trained(self) -> bool:
+        return True
+
+    @_writes
+    def clear(self):
+        self._codes = np.empty((0, self.code_width), dtype=self.code_dtype)
+        self._norms = np.empty(0, dtype=np.float32)
+        self._rows = np.empty(0, dtype=np.int64)    # code row -> float row
+        self._ids: List[str] = []
+        self._positions = {}
+        self._count = 0
+        self._float_disk: Optional[np.ndarray] = None   # memory-mapped after load()
+        self._float_mem = np.empty((0, self.dim), dtype=np.float32)
+        self._float_count = 0                           # rows in disk + memory stores
+        self._trained_count = 0                         # vectors stored when last trained
+        self._layout = getattr(self, '_layout', 0) + 1  # changes whenever float rows are renumbered
+
+    # Storage ---------------------------------------------------------------
+
+    @staticmethod
+    def _grow(array: np.ndarray, used: int, needed: int) -> np.ndarray:
+        if needed <= len(array):
+            return array
+        grown = np.empty((max(needed, 2 * len(array), 1024),) + array.shape[1:], dtype=array.dtype)
+        grown[:used] = array[:used]
+        return grown
+
+    def _disk_rows(self) -> int:
+        return 0 if self._float_disk is None else len(self._float_disk)
+
+    def _float_rows(self, rows: np.ndarray) -> np.ndarray:
+        """Full-precision vectors for float-store rows (disk or memory)."""
+        disk_rows = self._disk_rows()
+        out = np.empty((len(rows), self.dim), dtype=np.float32)
+        on_disk = rows < disk_rows
+        if on_disk.any():
+            out[on_disk] = self._float_disk[rows[on_disk]]
+        if (~on_disk).any():
+            out[~on_disk] = self._float_mem[rows[~on_disk] - disk_rows]
+        return out
+
+    # Codec hooks -------------------------------------------------------------
+
+    def _encode(self, vectors: np.ndarray, codec=None) -> np.ndarray:
+        """Codes for vectors, with the given codec (from _fit) or the current one."""
+        raise NotImplementedError
+
+    def _query_tables(self, queries: np.ndarray):
+        """Per-search precomputation shared by every block of codes (the queries themselves by default)."""
+        return queries
+
+    def _approx_dots(self, tables, codes: np.ndarray) -> np.ndarray:
+        """Approximate query . vector for a block of codes; shape (queries, rows)."""
+        raise NotImplementedError
+
+    def _fit(self, sample: np.ndarray):
+        """Learn a codec from sample vectors without touching the index; returns it."""
+        return None
+
+    def _use_codec(self, codec):
+        pass
+
+    def _codec_meta(self) -> dict:
+        return {}
+
+    def _save_codec(self, path: str):
+        pass
+
+    def _load_codec(self, path: str, meta: dict):
+        pass
+
+    def _needs_training(self) -> bool:
+        return not self.trained
+
+    def _encode_float_rows(self, rows: np.ndarray, codec=None) -> np.ndarray:
+        codes = np.empty((len(rows), self.code_width), dtype=self.code_dtype)
+        for start in range(0, len(rows), self._block_rows):
+            block = rows[start:start + self._block_rows]
+            codes[start:start + len(block)] = self._encode(self._float_rows(block), codec)
+        return codes
+
+    def train(self):
+        """Train (or retrain) the codec on the stored vectors and re-encode them, if needed.
+
+        Fitting and encoding the existing vectors happen without the index lock,
+        so searches continue on the old codec; only swapping in the new codes
+        (and encoding vectors added meanwhile) takes the write lock.
+        """
+        with self._training:
+            with self.lock.read():
+                if not self._count or not self._needs_training():
+                    return
+                count, layout, float_count = self._count, self._layout, self._float_count
+                rows = self._rows[:count]
+                sample = rows if count <= 20000 else np.random.default_rng(0).choice(rows, 20000, replace=False)
+                sample = self._float_rows(np.sort(sample))
+            codec = self._fit(sample)
+
+            with self.lock.read():
+                if self._layout != layout:  # cleared or compacted by save() meanwhile
+                    return
+                encoded = self._encode_float_rows(np.arange(float_count), codec)
+            with self.lock.write():
+                if self._layout != layout:
+                    return
+                rows = self._rows[:self._count]
+                codes = np.empty((len(self._rows), self.code_width), dtype=self.code_dtype)
+                old = rows < float_count
+                codes[:self._count][old] = encoded[rows[old]]
+                if (~old).any():  # added while the codec was being fitted
+                    codes[:self._count][~old] = self._encode_float_rows(rows[~old], codec)
+                self._codes = codes
+                self._use_codec(codec)
+                self._trained_count = count
+
+    def _schedule_training(self):
+        """Start background training unless it is already running."""
+        with _scheduling:
+            if self._training_thread is not None and self._training_thread.is_alive():
+                return
+            self._training_thread = threading.Thread(target=self.train, name=f"{self.kind}-training", daemon=True)
+            self._training_thread.start()
+
+    # VectorIndex -------------------------------------------------------------
+
+    @_writes
+    def add(self, ids: List[str], embeddings: np.ndarray):
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dim)
+        keep = [i for i, doc_id in enumerate(ids) if doc_id not in self._positions]
+        if not keep:
+            return
+        if len(keep) < len(ids):
+            embeddings = embeddings[keep]
+            ids = [ids[i] for i in keep]
+
+        n = len(ids)
+        start, end = self._count, self._count + n
+        mem_used = self._float_count - self._disk_rows()
+        self._float_mem = self._grow(self._float_mem, mem_used, mem_used + n)
+        self._float_mem[mem_used:mem_used + n] = embeddings
+
+        self._rows = self._grow(self._rows, start, end)
+        self._rows[start:end] = np.arange(self._float_count, self._float_count + n)
+        self._float_count += n
+        self._norms = self._grow(self._norms, start, end)
+        self._norms[start:end] = np.einsum('ij,ij->i', embeddings, embeddings)
+        if self.trained:
+            self._codes = self._grow(self._codes, start, end)
+            self._codes[start:end] = self._encode(embeddings)
+
+        for offset, doc_id in enumerate(ids):
+            self._positions[doc_id] = start + offset
+        self._ids.extend(ids)
+        self._count = end
+        if self._needs_training():
+            self._schedule_training()
+
+    @_writes
+    def remove(self, ids: Iterable[str]):
+        for doc_id in ids:
+            pos = self._positions.pop(doc_id, None)
+            if pos is None:
+                continue
+            last = self._count - 1
+            if pos != last:
+                # Move the last entry into the hole; its float row stays where it is
+                moved_id = self._ids[last]
+                self._rows[pos] = self._rows[last]
+                self._norms[pos] = self._norms[last]
+                if self.trained:
+                    self._codes[pos] = self._codes[last]
+                self._ids[pos] = moved_id
+                self._positions[moved_id] = pos
+            self._ids.pop()
+            self._count = last
+
+    @_reads
+    def search(self, queries: np.ndarray, k: int) -> List[List[Tuple[str, float]]]:
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        if self._count == 0:
+            return [[] for _ in range(len(queries))]
+        if self._needs_training():
+            self._schedule_training()  # meanwhile the current codes (or float vectors) serve
+        k = min(k, self._count)
+        n_candidates = min(max(k * self.rescore, k), self._count)
+
+        # Approximate distances (minus the constant query norm) over all codes, one block
+        # of rows at a time. The running best candidates per query stay in the front of a
+        # fixed buffer, and each block is written behind them.
+        trained = self.trained
+        tables = self._query_tables(queries) if trained else None
+        best_d = np.empty((len(queries), n_candidates + self._block_rows), dtype=np.float32)
+        best_i = np.empty(best_d.shape, dtype=np.int64)
+        filled = 0
+        for start in range(0, self._count, self._block_rows):
+            end = min(start + self._block_rows, self._count)
+            if trained:
+                dots = self._approx_dots(tables, self._codes[start:end])
+            else:  # not trained yet: score the float32 vectors exactly
+                dots = queries @ self._float_rows(self._rows[start:end]).T
+            best_d[:, filled:filled + end - start] = self._norms[start:end][None, :] - 2.0 * dots
+            best_i[:, filled:filled + end - start] = np.arange(start, end)
+            filled += end - start
+            if filled > n_candidates:
+                keep = np.argpartition(best_d[:, :filled], n_candidates - 1, axis=1)[:, :n_candidates]
+                best_i[:, :n_candidates] = np.take_along_axis(best_i[:, :filled], keep, axis=1)
+                best_d[:, :n_candidates] = np.take_along_axis(best_d[:, :filled], keep, axis=1)
+                filled = n_candidates
+        best_i = best_i[:, :filled]
+
+        query_norms = np.einsum('ij,ij->i', queries, queries)
+        results = []
+        for query, query_norm, candidates in zip(queries, query_norms, best_i):
+            # Exact re-scoring of the short list from the float32 store
+            vectors = self._float_rows(self._rows[candidates])
+            exact = query_norm + self._norms[candidates] - 2.0 * (vectors @ query)
+            order = np.argsort(exact)[:k]
+            results.append([(self._ids[candidates[i]], float(max(exact[i], 0.0))) for i in order])
+        return results
+
+    def memory_bytes(self) -> int:
+        """Private RAM used by codes, norms and row map (excludes ids and the mmapped floats)."""
+        n = self._count
+        mem_floats = (self._float_count - self._disk_rows()) * self.dim * 4
+        return n * (self.code_width * np.dtype(self.code_dtype).itemsize + 4 + 8) + mem_floats
+
+    def save(self, path: str):
+        # Persisted codes must come from an up-to-date codec; the fit itself doesn't block searches
+        self.train()
+        self._save(path)
+
+    @_writes
+    def _save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        if self._count and not self.trained:  # cleared and refilled since train() above
+            codec = self._fit(self._float_rows(self._rows[:self._count]))
+            self._codes = self._encode_float_rows(self._rows[:self._count], codec)
+            self._use_codec(codec)
+            self._trained_count = self._count
+
+        # Rewrite the float store compacted into code-row order, then map it back in
+        vectors_path = os.path.join(path, "vectors.f32")
+        tmp_path = vectors_path + ".tmp"
+        rows = self._rows[:self._count]
+        with open(tmp_path, 'wb') as f:
+            for start in range(0, self._count, self._block_rows):
+                f.write(self._float_rows(rows[start:start + self._block_rows]).tobytes())
+        self._float_disk = None
+        os.replace(tmp_path, vectors_path)
+
+        np.save(os.path.join(path, "codes.npy"), self._codes[:self._count])
+        np.save(os.path.join(path, "norms.npy"), self._norms[:self._count])
+        np.save(os.path.join(path, "ids.npy"), np.array(self._ids, dtype=str))
+        self._save_codec(path)
+        with open(os.path.join(path, "index.json"), 'w', encoding='utf-8') as f:
+            json.dump(dict(self._codec_meta(), kind=self.kind, dim=self.dim, count=self._count,
+                           rescore=self.rescore), f)
+
+        self._map_floats(path, self._count)
+        self._rows = np.arange(max(len(self._rows), self._count), dtype=np.int64)
+        self._layout += 1
+
+    def _map_floats(self, path: str, count: int):
+        self._float_disk = np.memmap(os.path.join(path, "vectors.f32"), dtype=np.float32, mode='r',
+                                     shape=(count, self.dim)) if count else None
+        self._float_mem = np.empty((0, self.dim), dtype=np.float32)
+        self._float_count = count
+
+    @classmethod
+    def load(cls, path: str) -> "QuantizedIndex":
+        with open(os.path.join(path, "index.json"), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        index = cls.__new__(cls)
+        index.dim = meta['dim']
+        index.rescore = meta['rescore']
+        index._training = threading.Lock()
+        index._training_thread = None
+        index._load_codec(path, meta)
+        index.clear()
+
+        count = meta['count']
+        index._codes = np.load(os.path.join(path, "codes.npy"))
+        index._norms = np.load(os.path.join(path, "norms.npy"))
+        index._rows = np.arange(count, dtype=np.int64)
+        index._ids = np.load(os.path.join(path, "ids.npy")).tolist()
+        index._positions = {doc_id: i for i, doc_id in enumerate(index._ids)}
+        index._count = count
+        index._trained_count = meta.get('trained_count', count)
+        index._map_floats(path, count)
+        return index
+
+
+class Int8Index(QuantizedIndex):
+    """Scalar quantization: one int8 per dimension plus a float32 scale per vector (~4x smaller)."""
+
+    kind = "int8"
+    code_dtype = np.int8
+
+    @property
+    def code_width(self) -> int:
+        # Codes hold the dimensions plus the vector's scale packed as 4 bytes
+        return self.dim + 4
+
+    def _encode(self, vectors: np.ndarray, codec=None) -> np.ndarray:
+        scales = np.abs(vectors).max(axis=1).astype(np.float32)
+        scales[scales == 0] = 1.0
+        codes = np.empty((len(vectors), self.code_width), dtype=np.int8)
+        codes[:, :self.dim] = np.rint(vectors / scales[:, None] * 127.0)
+        codes[:, self.dim:] = (scales / 127.0).view(np.int8).reshape(-1, 4)
+        return codes
+
+    def _approx_dots(self, queries, codes: np.ndarray) -> np.ndarray:
+        scales = np.ascontiguousarray(codes[:, self.dim:]).view(np.float32).ravel()
+        return (queries @ codes[:, :self.dim].astype(np.float32).T) * scales[None, :]
+
+
+class PQIndex(QuantizedIndex):
+    """Product quantization: `m` sub-vectors, each coded as one of 256 centroids (m bytes per vector).
+
+    The default m=96 stores 384-d embeddings in 96 bytes (16x smaller than float32).
+
+    Codebooks are trained with k-means on the stored vectors in the background
+    after the first inserts (or by save()); until then searches score the float32
+    vectors exactly. Later inserts are encoded with the codebooks. Once the index
+    has grown to `retrain_factor` times the size it was trained at, they are
+    retrained the same way and every vector is re-encoded, so codebooks trained
+    on a small first batch don't stay in use.
+
+    Scoring builds one lookup table of sub-vector dot products per query and
+    sums table entries gathered by code, one sub-space at a time for the whole
+    batch of queries.
+    """
+
+    kind = "pq"
+
+    def __init__(self, dim: int, m: int = 96, rescore: int = 16, train_iterations: int = 20,
+                 retrain_factor: float = 2.0):
+        if dim % m:
+            raise ValueError(f"dim ({dim}) must be divisible by m ({m})")
+        self.m = m
+        self.train_iterations = train_iterations
+        self.retrain_factor = retrain_factor
+        self._codebooks: Optional[np.ndarray] = None   # (m, 256, dim // m)
+        super().__init__(dim, rescore)
+
+    @property
+    def code_width(self) -> int:
+        return self.m
+
+    @property
+    def trained(self) -> bool:
+        return self._codebooks is not None
+
+    def _needs_training(self) -> bool:
+        if self._codebooks is None:
+            return True
+        return bool(self.retrain_factor) and self._count >= self.retrain_factor * max(self._trained_count, 1)
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        return vectors.reshape(len(vectors), self.m, self.dim // self.m)
+
+    def _fit(self, sample: np.ndarray) -> np.ndarray:
+        rng = np.random.default_rng(0)
+        parts = self._split(sample)
+        n_centroids = min(256, len(sample))
+        codebooks = np.zeros((self.m, 256, self.dim // self.m), dtype=np.float32)
+        for j in range(self.m):
+            data = parts[:, j, :]
+            centroids = data[rng.choice(len(data), n_centroids, replace=False)].copy()
+            for _ in range(self.train_iterations):
+                assign = self._nearest(data, centroids)
+                counts = np.bincount(assign, minlength=n_centroids)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assign, data)
+                filled = counts > 0
+                centroids[filled] = sums[filled] / counts[filled, None]
+            # With fewer than 256 training vectors, codes simply don't use the repeats
+            codebooks[j] = centroids[np.arange(256) % n_centroids]
+        return codebooks
+
+    def _use_codec(self, codec: np.ndarray):
+        self._codebooks = codec
+
+    @staticmethod
+    def _nearest(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        distances = (np.einsum('ij,ij->i', centroids, centroids)[None, :] - 2.0 * (data @ centroids.T))
+        return distances.argmin(axis=1)
+
+    def _encode(self, vectors: np.ndarray, codec: Optional[np.ndarray] = None) -> np.ndarray:
+        codebooks = self._codebooks if codec is None else codec
+        parts = self._split(vectors)
+        codes = np.empty((len(vectors), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            codes[:, j] = self._nearest(parts[:, j, :], codebooks[j])
+        return codes
+
+    def _query_tables(self, queries: np.ndarray) -> np.ndarray:
+        # Dot products of each query sub-vector with every centroid: (m, queries, 256)
+        return np.ascontiguousarray(np.einsum('qjd,jcd->jqc', self._split(queries), self._codebooks))
+
+    def _approx_dots(self, tables: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        codes = np.ascontiguousarray(codes.T)  # one row of codes per sub-space
+        dots = tables[0].take(codes[0], axis=1)
+        for j in range(1, self.m):
+            dots += tables[j].take(codes[j], axis=1)
+        return dots
+
+    def _codec_meta(self) -> dict:
+        return {'m': self.m, 'train_iterations': self.train_iterations,
+                'retrain_factor': self.retrain_factor, 'trained_count': self._trained_count}
+
+    def _save_codec(self, path: str):
+        np.save(os.path.join(path, "codebooks.npy"), self._codebooks)
+
+    def _load_codec(self, path: str, meta: dict):
+        self.m = meta['m']
+        self.train_iterations = meta['train_iterations']
+        self.retrain_factor = meta.get('retrain_factor', 2.0)
+        self._codebooks = np.load(os.path.join(path, "codebooks.npy")) if meta['count'] else None
+
+
+def _shard_number(key: str, shards: int) -> int:
+    """Stable shard for a key (the same in every process, unlike hash())."""
+    return zlib.crc32(key.encode('utf-8')) % shards
+
+
+def _serve_shard(conn, path: Optional[str], kind: str, dim: int, options: Dict):
+    """Worker process loop: own one shard index and run the calls sent over `conn`."""
+    if path and os.path.exists(os.path.join(path, "index.json")):
+        index = load_index(path)
+        index.configure(**options)
+    else:
+        index = create_index(kind, dim, **options)
+    while True:
+        try:
+            method, args, kwargs = conn.recv()
+        except EOFError:  # parent closed the pipe or exited
+            break
+        try:
+            conn.send((None, getattr(index, method)(*args, **kwargs)))
+        except Exception as e:
+            conn.send((e, None))
+
+
+class _ShardProcess:
+    """Proxy for a shard index that lives in its own worker process."""
+
+    def __init__(self, name: str, path: Optional[str], kind: str, dim: int, options: Dict):
+        # Spawned rather than forked: the parent may hold torch threads and locks
+        context = multiprocessing.get_context('spawn')
+        self._conn, child_conn = context.Pipe()
+        self._lock = threading.Lock()
+        self.process = context.Process(target=_serve_shard, args=(child_conn, path, kind, dim, options),
+                                       name=name, daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def _call(self, method: str, *args, **kwargs):
+        with self._lock:
+            self._conn.send((method, args, kwargs))
+            error, result = self._conn.recv()
+        if error is not None:
+            raise error
+        return result
+
+    def __len__(self) -> int:
+        return self._call('__len__')
+
+    def add(self, ids: List[str], embeddings: np.ndarray):
+        self._call('add', ids, embeddings)
+
+    def remove(self, ids: Iterable[str]):
+        self._call('remove', list(ids))
+
+    def search(self, queries: np.ndarray, k: int) -> List[List[Tuple[str, float]]]:
+        return self._call('search', queries, k)
+
+    def clear(self):
+        self._call('clear')
+
+    def save(self, path: str):
+        self._call('save', path)
+
+    def configure(self, **options):
+        self._call('configure', **options)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+        self.process.join(timeout=5)
+
+
+class ShardedIndex(VectorIndex):
+    """Vectors partitioned across N independent indexes, searched scatter-gather.
+
+    Each vector goes to one shard by a stable hash of its id, or of a key
+    passed to `add` (e.g. the chunk's source, with by='source', so one brand's
+    documents share a shard). A query is sent to every shard in parallel and
+    the per-shard top-k lists are merged with a heap into the global top-k.
+
+    Shards run on a thread pool by default; NumPy's matrix products and
+    hnswlib's knn_query release the GIL, so they use separate cores. With
+    processes=True each shard lives in its own worker process instead, which
+    spreads index memory across processes at the cost of pickling queries
+    and hits over a pipe.
+    """
+
+    kind = "sharded"
+
+    def __init__(self, dim: int, shards: int = 4, shard_kind: str = "exact", by: str = "id",
+                 processes: bool = False, workers: Optional[int] = None, **shard_options):
+        """Create an empty sharded index.
+
+        Args:
+            dim: Vector dimension.
+            shards: Number of partitions.
+            shard_kind: Index type of each shard: 'exact', 'hnsw', 'int8' or 'pq'.
+            by: 'id' to spread vectors evenly, or 'source' to keep each source's
+                vectors together (requires keys in `add`).
+            processes: Run each shard in its own worker process.
+            workers: Threads used to fan out calls (defaults to one per shard, up to the core count).
+            shard_options: Passed to each shard, e.g. ef_search=64 or rescore=8.
+        """
+        if by not in ('id', 'source'):
+            raise ValueError(f"Unknown shard key: {by}")
+        self.dim = dim
+        self.shard_kind = shard_kind
+        self.by = by
+        self.processes = processes
+        self.shard_options = shard_options
+        self._assigned: Dict[str, int] = {}  # chunk id -> shard number
+        self._pool = ThreadPoolExecutor(max_workers=workers or min(shards, os.cpu_count() or 1),
+                                        thread_name_prefix="index-shard")
+        self._shards = [self._open_shard(None, i) for i in range(shards)]
+
+    def _open_shard(self, path: Optional[str], number: int):
+        if self.processes:
+            return _ShardProcess(f"index-shard-{number}", path, self.shard_kind, self.dim, self.shard_options)
+        if path and os.path.exists(os.path.join(path, "index.json")):
+            shard = load_index(path)
+            shard.configure(**self.shard_options)
+            return shard
+        return create_index(self.shard_kind, self.dim, **self.shard_options)
+
+    def __len__(self) -> int:
+        return len(self._assigned)
+
+    @property
+    def shard_count(self) -> int:
+        return len(self._shards)
+
+    def shard_sizes(self) -> List[int]:
+        return [len(shard) for shard in self._shards]
+
+    def _fan_out(self, calls: Dict[int, tuple]) -> Dict[int, object]:
+        """Run shard.method(*args) for each {shard number: (method, args)} in parallel."""
+        futures = {number: self._pool.submit(getattr(self._shards[number], method), *args)
+                   for number, (method, args) in calls.items()}
+        return {number: future.result() for number, future in futures.items()}
+
+    @_writes
+    def add(self, ids: List[str], embeddings: np.ndarray, keys: Optional[List[str]] = None):
+        """Insert vectors; `keys` (e.g. sources) choose the shard when by='source'."""
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dim)
+        keys = keys if self.by == 'source' and keys is not None else ids
+        rows = defaultdict(list)
+        for row, (doc_id, key) in enumerate(zip(ids, keys)):
+            if doc_id in self._assigned:
+                continue
+            number = _shard_number(key, len(self._shards))
+            self._assigned[doc_id] = number
+            rows[number].append(row)
+        self._fan_out({number: ('add', ([ids[row] for row in shard_rows], embeddings[shard_rows]))
+                       for number, shard_rows in rows.items()})
+
+    @_writes
+    def remove(self, ids: Iterable[str]):
+        by_shard = defaultdict(list)
+        for doc_id in ids:
+            number = self._assigned.pop(doc_id, None)
+            if number is not None:
+                by_shard[number].append(doc_id)
+        self._fan_out({number: ('remove', (shard_ids,)) for number, shard_ids in by_shard.items()})
+
+    @_reads
+    def search(self, queries: np.ndarray, k: int) -> List[List[Tuple[str, float]]]:
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        if not self._assigned:
+            return [[] for _ in range(len(queries))]
+
+        per_shard = self._fan_out({number: ('search', (queries, k)) for number in range(len(self._shards))})
+        # Each shard's hits are sorted by distance; a heap merge stops after the global top k
+        return [
+            list(itertools.islice(heapq.merge(*(hits[q] for hits in per_shard.values()), key=itemgetter(1)), k))
+            for q in range(len(queries))
+        ]
+
+    @_writes
+    def clear(self):
+        self._fan_out({number: ('clear', ()) for number in range(len(self._shards))})
+        self._assigned = {}
+
+    @_writes
+    def configure(self, **options):
+        self.shard_options.update({name: options[name] for name in ('ef_search', 'rescore') if name in options})
+        for shard in self._shards:
+            shard.configure(**options)
+
+    @_reads
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        self._fan_out({number: ('save', (os.path.join(path, f"shard-{number}"),))
+                       for number in range(len(self._shards))})
+        np.save(os.path.join(path, "ids.npy"), np.array(list(self._assigned), dtype=str))
+        np.save(os.path.join(path, "shards.npy"), np.array(list(self._assigned.values()), dtype=np.int32))
+        with open(os.path.join(path, "index.json"), 'w', encoding='utf-8') as f:
+            json.dump({
+                'kind': self.kind,
+                'dim': self.dim,
+                'shards': len(self._shards),
+                'shard_kind': self.shard_kind,
+                'by': self.by,
+                'shard_options': self.shard_options,
+                'count': len(self._assigned),
+            }, f)
+
+    def close(self):
+        """Stop shard worker processes and fan-out threads."""
+        for shard in self._shards:
+            if isinstance(shard, _ShardProcess):
+                shard.close()
+        self._pool.shutdown(wait=False)
+
+    @classmethod
+    def load(cls, path: str, processes: bool = False, workers: Optional[int] = None) -> "ShardedIndex":
+        with open(os.path.join(path, "index.json"), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        index = cls.__new__(cls)
+        index.dim = meta['dim']
+        index.shard_kind = meta['shard_kind']
+        index.by = meta['by']
+        index.processes = processes
+        index.shard_options = meta['shard_options']
+        ids = np.load(os.path.join(path, "ids.npy")).tolist()
+        shards = np.load(os.path.join(path, "shards.npy")).tolist()
+        index._assigned = dict(zip(ids, shards))
+        index._pool = ThreadPoolExecutor(max_workers=workers or min(meta['shards'], os.cpu_count() or 1),
+                                         thread_name_prefix="index-shard")
+        # With processes=True each worker maps its own shard; the parent only keeps the id map
+        index._shards = [index._open_shard(os.path.join(path, f"shard-{i}"), i) for i in range(meta['shards'])]
+        return index
+
+
+def load_index(path: str, processes: bool = False) -> VectorIndex:
+    """Load whichever index type was saved at `path`.
+
+    `processes` serves each shard of a sharded index from its own worker process.
+    """
+    with open(os.path.join(path, "index.json"), 'r', encoding='utf-8') as f:
+        kind = json.load(f)['kind']
+    if kind == ShardedIndex.kind:
+        return ShardedIndex.load(path, processes=processes)
+    if kind == HNSWIndex.kind:
+        return HNSWIndex.load(path)
+    if kind == ExactIndex.kind:
+        return ExactIndex.load(path)
+    if kind == Int8Index.kind:
+        return Int8Index.load(path)
+    if kind == PQIndex.kind:
+        return PQIndex.load(path)
+    raise ValueError(f"Unknown index type: {kind}")
+
+
+def create_index(kind: str, dim: int, **kwargs) -> VectorIndex:
+    """Create an empty index by name: 'exact', 'hnsw', 'int8', 'pq' or 'sharded'."""
+    if kind == ShardedIndex.kind:
+        return ShardedIndex(dim, **kwargs)
+    if kind == HNSWIndex.kind:
+        return HNSWIndex(dim, **kwargs)
+    if kind == ExactIndex.kind:
+        return ExactIndex(dim)
+    if kind == Int8Index.kind:
+        return Int8Index(dim, **kwargs)
+    if kind == PQIndex.kind:
+        return PQIndex(dim, **kwargs)
+    raise ValueError(f"Unknown index type: {kind}")
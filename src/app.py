@@ -3,8 +3,12 @@
 Web interface for the FluffyAI Helpdesk Chatbot using Gradio.
 """
 
+import hmac
 import os
+import shutil
 import sys
+import threading
+from contextlib import nullcontext
 
 # Fix proxy URL before importing any libraries that might use it
 for proxy_var in ['all_proxy', 'ALL_PROXY', 'http_proxy', 'https_proxy', 'HTTP_PROXY', 'HTTPS_PROXY']:
@@ -18,8 +22,11 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 from dotenv import load_dotenv
 import gradio as gr
 
-from src.chatbot import HelpdeskChatbot
-from src.vector_store import VectorStore
+from src.admission import AdmissionController, Cancelled, Overloaded
+from src import profiling
+from src.chatbot import HelpdeskChatbot, configure_chatbot
+from src.retrieval_service import RetrievalClient
+from src.session_store import create_session_store
 
 
 def create_chatbot():
@@ -31,8 +38,17 @@ def create_chatbot():
     if not openai_api_key:
         raise ValueError("OPENAI_API_KEY not found in .env file")
 
-    print("Initializing vector store...")
-    vector_store = VectorStore()
+    retrieval_socket = os.getenv('RETRIEVAL_SOCKET')
+    if retrieval_socket:
+        # Lightweight worker: search through the shared retrieval service
+        print(f"Connecting to retrieval service at {retrieval_socket}...")
+        vector_store = RetrievalClient(retrieval_socket)
+    else:
+        # Imported lazily so workers using the retrieval service never load torch
+        from src.vector_store import VectorStore
+
+        print("Initializing vector store...")
+        vector_store = VectorStore()
 
     doc_count = vector_store.get_collection_count()
     if doc_count == 0:
@@ -40,31 +56,206 @@ def create_chatbot():
 
     print(f"Loaded vector store with {doc_count} document chunks")
 
-    chatbot = HelpdeskChatbot(openai_api_key, vector_store)
+    chatbot = configure_chatbot(HelpdeskChatbot(openai_api_key, vector_store), vector_store)
+
+    # Optional live updates from data/: DATA_WATCH=1 (needs the local, writable vector store)
+    if os.getenv('DATA_WATCH', '').lower() in ('1', 'true', 'yes') and hasattr(vector_store, 'replace_source') \
+            and getattr(vector_store, 'snapshot', None) is None:
+        from src.data_watcher import DataWatcher
+        from src.ingest_data import CHUNK_SIZE, CHUNK_OVERLAP
+
+        watcher = DataWatcher(vector_store, _DATA_DIR, debounce=float(os.getenv('DATA_WATCH_DEBOUNCE', '1.0')),
+                              chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP, on_change=chatbot.update_side_indexes)
+        watcher.start()
+
+    # Per-browser-session histories: SESSION_STORE=memory|sqlite|redis
+    store_kind = os.getenv('SESSION_STORE', 'memory').lower()
+    store_options = {}
+    if store_kind == 'sqlite':
+        store_options['path'] = os.getenv('SESSION_DB', './sessions.db')
+    elif store_kind == 'redis':
+        store_options['url'] = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+    chatbot.session_store = create_session_store(store_kind, **store_options)
+    print(f"Session store: {store_kind}")
+
     return chatbot
 
 
-def chat_interface(message, history, chatbot_instance):
-    """Process user message and return response."""
+# Session hash -> event set when that browser tab closes while its request is running
+_cancel_events = {}
+_cancel_lock = threading.Lock()
+
+
+def chat_interface(message, history, chatbot_instance, session_id=None, profile=False):
+    """Process user message and return response (profiled when `profile` and profiling is enabled)."""
     # Ensure message is a string
     message = str(message).strip() if message else ""
 
     if not message:
         return ""
 
+    cancel_event = threading.Event()
+    if session_id is not None:
+        with _cancel_lock:
+            _cancel_events[session_id] = cancel_event
+
     # Get response from chatbot
-    response = chatbot_instance.chat(message)
+    try:
+        with profiling.force() if profile and profiling.enabled() else nullcontext():
+            response = chatbot_instance.chat(message, session_id=session_id, should_cancel=cancel_event.is_set)
+    except Overloaded:
+        return AdmissionController.BUSY_MESSAGE
+    finally:
+        if session_id is not None:
+            with _cancel_lock:
+                if _cancel_events.get(session_id) is cancel_event:
+                    del _cancel_events[session_id]
     return response
 
 
-def reset_conversation(chatbot_instance):
+def _wants_profile(request):
+    """Whether a request asked to be profiled (X-Profile: 1 header or ?profile=1 in the page URL)."""
+    return request.headers.get('x-profile') == '1' or request.query_params.get('profile') == '1'
+
+
+def cancel_session(session_id):
+    """Abandon the running request (queue wait or LLM stream) of a disconnected session."""
+    with _cancel_lock:
+        event = _cancel_events.get(session_id)
+    if event is not None:
+        event.set()
+
+
+def reset_conversation(chatbot_instance, session_id=None):
     """Reset the conversation history."""
-    chatbot_instance.reset_conversation()
+    chatbot_instance.reset_conversation(session_id)
     return []
 
 
+def _is_admin(token):
+    """Check an admin panel/API request's token against ADMIN_TOKEN."""
+    expected = os.getenv('ADMIN_TOKEN', '')
+    return bool(expected) and hmac.compare_digest((token or '').encode(), expected.encode())
+
+
+_DENIED = "✗ Invalid admin token"
+_DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+_reindex_lock = threading.Lock()
+_reindex_status = {'message': "Idle"}
+
+
+def _run_reindex(chatbot_instance):
+    """Rebuild the knowledge base and its side indexes into a new version and swap them in."""
+    from src.ingest_data import reindex_knowledge_base
+
+    try:
+        # The chatbot's swap listener switches the FAQ index and catalog with the chunks
+        name = reindex_knowledge_base(chatbot_instance.vector_store, _DATA_DIR)
+        _reindex_status['message'] = f"✓ {name} is live ({chatbot_instance.vector_store.get_collection_count()} chunks)"
+    except Exception as e:
+        _reindex_status['message'] = f"✗ Reindex failed, still serving the previous collection: {e}"
+    finally:
+        _reindex_lock.release()
+
+
+def start_reindex(chatbot_instance, token=None):
+    """Start a background reindex unless one is already running."""
+    if not _is_admin(token):
+        return _DENIED
+    if not _reindex_lock.acquire(blocking=False):
+        return _reindex_status['message']
+    _reindex_status['message'] = "Reindexing in the background..."
+    threading.Thread(target=_run_reindex, args=(chatbot_instance,), daemon=True).start()
+    return _reindex_status['message']
+
+
+# Background ingest jobs (admin panel), sharing the server's vector store
+_ingest_jobs = None
+
+
+def submit_ingest(token, sources_text, uploaded_files=None):
+    """Queue an ingest job for the listed paths/URLs and uploaded files."""
+    if not _is_admin(token):
+        return _DENIED
+    if _ingest_jobs is None:
+        return "Ingest jobs need the local vector store"
+    sources = [line.strip() for line in (sources_text or "").splitlines() if line.strip()]
+
+    # Uploads are kept under data/uploads so a full reindex picks them up too
+    upload_dir = os.path.join(_DATA_DIR, 'uploads')
+    for upload in uploaded_files or []:
+        path = upload if isinstance(upload, str) else upload.name
+        os.makedirs(upload_dir, exist_ok=True)
+        target = os.path.join(upload_dir, os.path.basename(path))
+        shutil.copyfile(path, target)
+        sources.append(target)
+
+    try:
+        job = _ingest_jobs.submit(sources)
+    except ValueError as e:
+        return str(e)
+    return f"Queued ingest job {job.id} ({len(job.sources)} sources)"
+
+
+def _format_job(progress):
+    line = (f"Ingest job {progress['id']}: {progress['status']}, {progress['files_done']}/{progress['files_total']} files, "
+            f"+{progress['chunks_added']} / -{progress['chunks_removed']} chunks, "
+            f"{progress['chunks_per_second']:.1f} chunks/s, {progress['yield_time']:.1f}s yielded to queries")
+    if progress['current_source']:
+        line += f" (now: {os.path.basename(progress['current_source'])})"
+    if progress['errors']:
+        line += f"; {len(progress['errors'])} errors, last: {progress['errors'][-1]}"
+    return line
+
+
+def admin_status(chatbot_instance, token=None):
+    """Reindex and ingest job status plus serving counters, as Markdown."""
+    if not _is_admin(token):
+        return _DENIED
+    lines = [_reindex_status['message']]
+    if _ingest_jobs is not None:
+        lines.extend(_format_job(job.progress()) for job in _ingest_jobs.jobs()[-5:])
+    if chatbot_instance.admission is not None:
+        stats = chatbot_instance.admission.get_stats()
+        lines.append(f"Admission: {stats['active']}/{chatbot_instance.admission.max_concurrent} LLM calls active, "
+                     f"{stats['queue_depth']} queued (peak {stats['peak_queue']}); "
+                     f"rejected {stats['rejected_queue_full']} queue full + {stats['rejected_timeout']} timed out; "
+                     f"{stats['cancelled']} cancelled; {stats['avg_wait_ms']:.0f} ms avg wait")
+    stats = chatbot_instance.context_cache.get_stats()
+    if stats['lookups']:
+        lines.append(f"Prompt context: {stats['prefix_reuse_rate']:.0%} of prompts reused a cached context prefix "
+                     f"({stats['hits']}/{stats['lookups']}, {stats['entries']} blocks cached); "
+                     f"{stats['bytes_saved'] / 1024:.1f} KiB of formatting skipped; "
+                     f"{stats['prefix_token_reuse_rate']:.0%} of prefix tokens repeated for upstream caching")
+    if chatbot_instance.intent_router is not None:
+        stats = chatbot_instance.intent_router.get_stats()
+        counts = ", ".join(f"{intent} {count}" for intent, count in stats['intents'].items())
+        lines.append(f"Intent routing: {stats['shortcut_rate']:.0%} answered locally ({counts}); "
+                     f"{stats['avg_route_ms']:.3f} ms routing + {stats['avg_embed_ms']:.1f} ms embedding per message")
+    if chatbot_instance.faq_index is not None:
+        stats = chatbot_instance.faq_index.get_stats()
+        lines.append(f"FAQ fast path: {stats['hit_rate']:.0%} answered directly ({stats['hits']}/{stats['lookups']}), "
+                     f"{stats['avg_lookup_ms']:.1f} ms avg lookup, "
+                     f"{stats['latency_saved']:.1f} s of RAG + LLM latency saved")
+    if chatbot_instance.reranker is not None:
+        stats = chatbot_instance.reranker.get_stats()
+        lines.append(f"Reranking: {stats['avg_latency_ms']:.1f} ms avg over {stats['queries']} queries "
+                     f"(budget {chatbot_instance.reranker.latency_budget * 1000:.0f} ms, "
+                     f"{stats['over_budget']} over); {stats['fallback_rate']:.0%} cut short by the budget; "
+                     f"{stats['cache_hit_rate']:.0%} of pair scores from cache")
+    if chatbot_instance.query_rewriter is not None:
+        stats = chatbot_instance.query_rewriter.get_stats()
+        line = (f"Query rewriting: {stats['rewrite_rate']:.0%} of queries rewritten "
+                f"({stats['rewritten']}/{stats['queries']}), {stats['avg_latency_ms']:.1f} ms avg")
+        if stats['llm_calls'] or stats['cache_hits']:
+            line += f"; {stats['llm_calls']} LLM calls, {stats['cache_hit_rate']:.0%} cache hits"
+        lines.append(line)
+    return "\n\n".join(lines)
+
+
 def create_ui():
     """Create and configure the Gradio interface."""
+    global _ingest_jobs
 
     # Initialize chatbot
     try:
@@ -105,6 +296,33 @@ def create_ui():
         with gr.Row():
             clear_btn = gr.Button("🔄 New Conversation", size="sm")
 
+        # Optional admin controls: ENABLE_ADMIN=1 plus ADMIN_TOKEN (needs the local, writable vector store)
+        admin_enabled = os.getenv('ENABLE_ADMIN', '').lower() in ('1', 'true', 'yes') and \
+            hasattr(chatbot.vector_store, 'reindex') and getattr(chatbot.vector_store, 'snapshot', None) is None
+        if admin_enabled and not os.getenv('ADMIN_TOKEN'):
+            print("⚠ ENABLE_ADMIN is set but ADMIN_TOKEN is not; admin controls are disabled")
+            admin_enabled = False
+        if admin_enabled:
+            from src.ingest_data import CHUNK_SIZE, CHUNK_OVERLAP
+            from src.ingest_jobs import IngestJobs
+
+            hosts = os.getenv('INGEST_URL_HOSTS', '').split(',')
+            _ingest_jobs = IngestJobs(chatbot.vector_store, _DATA_DIR, chunk_size=CHUNK_SIZE,
+                                      overlap=CHUNK_OVERLAP, allowed_hosts=hosts,
+                                      on_change=chatbot.update_side_indexes)
+            with gr.Accordion("Admin", open=False):
+                admin_token = gr.Textbox(label="Admin token", type="password")
+                with gr.Row():
+                    reindex_btn = gr.Button("Reindex knowledge base", size="sm")
+                    status_btn = gr.Button("Refresh status", size="sm")
+                with gr.Row():
+                    ingest_sources = gr.Textbox(label="Ingest paths, directories or URLs (one per line)",
+                                                lines=2, scale=3)
+                    ingest_files = gr.File(label="Or upload documents", file_count="multiple",
+                                           file_types=['.md', '.txt', '.pdf'], scale=2)
+                ingest_btn = gr.Button("Start ingest job", size="sm")
+                reindex_status = gr.Markdown("Enter the admin token and refresh the status")
+
         gr.Markdown(
             """
             ---
@@ -127,7 +345,7 @@ def create_ui():
             history.append({"role": "user", "content": str(user_message).strip()})
             return "", history
 
-        def bot_respond(history):
+        def bot_respond(history, request: gr.Request):
             """Generate bot response."""
             if not history or len(history) == 0:
                 return history
@@ -146,26 +364,50 @@ def create_ui():
                 return history
 
             # Get bot response
-            bot_message = chat_interface(user_message, history, chatbot)
+            try:
+                bot_message = chat_interface(user_message, history, chatbot, session_id=request.session_hash,
+                                             profile=_wants_profile(request))
+            except Cancelled:
+                # The browser is gone; nobody is waiting for this reply
+                return history
 
             # Add bot response in new Gradio 6.0 format
             history.append({"role": "assistant", "content": bot_message})
             return history
 
-        def clear_chat():
+        def clear_chat(request: gr.Request):
             """Clear chat and reset conversation."""
-            reset_conversation(chatbot)
+            reset_conversation(chatbot, session_id=request.session_hash)
             return []
 
+        # With admission control, Gradio hands every request straight to the
+        # controller, which decides who waits and who gets the busy reply
+        respond_limit = 1
+        if chatbot.admission is not None:
+            respond_limit = chatbot.admission.max_concurrent + chatbot.admission.max_queue
+
         # Wire up events
         msg.submit(user_submit, [msg, chatbot_ui], [msg, chatbot_ui], queue=False).then(
-            bot_respond, chatbot_ui, chatbot_ui
+            bot_respond, chatbot_ui, chatbot_ui, concurrency_limit=respond_limit
         )
         submit_btn.click(user_submit, [msg, chatbot_ui], [msg, chatbot_ui], queue=False).then(
-            bot_respond, chatbot_ui, chatbot_ui
+            bot_respond, chatbot_ui, chatbot_ui, concurrency_limit=respond_limit
         )
         clear_btn.click(clear_chat, None, chatbot_ui, queue=False)
 
+        def on_unload(request: gr.Request):
+            """Stop work for a closed tab."""
+            cancel_session(request.session_hash)
+
+        demo.unload(on_unload)
+        if admin_enabled:
+            reindex_btn.click(lambda token: start_reindex(chatbot, token), admin_token, reindex_status,
+                              queue=False)
+            status_btn.click(lambda token: admin_status(chatbot, token), admin_token, reindex_status, queue=False,
+                             api_name="admin_status")
+            ingest_btn.click(submit_ingest, [admin_token, ingest_sources, ingest_files], reindex_status,
+                             queue=False, api_name="ingest")
+
     return demo
 
 
@@ -174,9 +416,14 @@ if __name__ == "__main__":
 
     try:
         demo = create_ui()
+        # Enough worker threads for every admitted and queued request
+        admission_slots = int(os.getenv('ADMISSION_MAX_CONCURRENT', '0'))
+        if admission_slots > 0:
+            admission_slots += int(os.getenv('ADMISSION_MAX_QUEUE', '16'))
         demo.launch(
             server_name="0.0.0.0",
-            server_port=7860,
+            server_port=int(os.getenv('PORT', '7860')),
+            max_threads=max(40, admission_slots + 8),
             share=False,
             show_error=True
         )
@@ -0,0 +1,202 @@
+"""
+Startup autotuning of CPU threads and batch sizes for the embedding model.
+Micro-benchmarks `model.encode` for single queries (latency) and for bulk
+ingestion (throughput) across torch thread counts and batch sizes, then saves
+the winning settings per host and model so later starts just load them.
+"""
+
+import argparse
+import json
+import os
+import re
+import socket
+import statistics
+import sys
+import time
+from typing import List, Dict, Callable, Optional, Sequence
+
+PROFILE_DIR = "./tuning"
+
+# Settings used when no profile has been tuned
+DEFAULT_PROFILE = {
+    'query_threads': None,      # torch default
+    'bulk_threads': None,
+    'encode_batch_size': 32,
+    'ingest_batch_size': 10,
+}
+
+_QUERY = "How long does the battery last on Buddy Bear?"
+_CHUNK = ("Buddy Bear is our best-selling AI plush toy. It speaks five languages, tells bedtime stories, "
+          "and its battery lasts 8-12 hours of active use. Charging takes about two hours with the "
+          "included USB-C cable. Returns are accepted within 30 days of delivery. ")
+
+
+def available_cores() -> int:
+    """CPU cores this process may run on (respects affinity masks and cgroup pinning)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def thread_candidates(cores: int, workers: int = 1) -> List[int]:
+    """Powers of two up to this worker's share of the cores, plus the share itself."""
+    share = max(1, cores // max(1, workers))
+    candidates = {1, share}
+    n = 2
+    while n < share:
+        candidates.add(n)
+        n *= 2
+    return sorted(candidates)
+
+
+def profile_path(model_name: str, directory: str = PROFILE_DIR) -> str:
+    """Per-host, per-model profile file."""
+    slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', f"{socket.gethostname()}-{model_name}")
+    return os.path.join(directory, f"{slug}.json")
+
+
+def load_profile(model_name: str, workers: int = 1, directory: str = PROFILE_DIR) -> Optional[Dict]:
+    """Saved profile for this host and model, if it was tuned for the same cores and workers."""
+    path = profile_path(model_name, directory)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            profile = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if profile.get('cores') != available_cores() or profile.get('workers') != workers:
+        return None  # moved to different hardware or packing; retune
+    return profile
+
+
+def save_profile(profile: Dict, directory: str = PROFILE_DIR) -> str:
+    """Write a profile atomically; returns its path."""
+    os.makedirs(directory, exist_ok=True)
+    path = profile_path(profile['model'], directory)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(profile, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _torch_threads():
+    import torch
+
+    return torch.get_num_threads, torch.set_num_threads
+
+
+def _best(results: List[Dict], key: Callable, tolerance: float) -> Dict:
+    """Cheapest setting (fewest threads, then smallest batch) within `tolerance` of the best score."""
+    best_score = max(key(r) for r in results)
+    good = [r for r in results if key(r) >= best_score * (1 - tolerance)]
+    return min(good, key=lambda r: (r['threads'], r.get('batch_size', 0)))
+
+
+def tune(model, model_name: str, workers: int = 1, thread_counts: Optional[Sequence[int]] = None,
+         batch_sizes: Sequence[int] = (8, 16, 32, 64, 128), bulk_texts: int = 256,
+         query_repeats: int = 20, tolerance: float = 0.05, device: str = 'cpu',
+         set_threads: Optional[Callable[[int], None]] = None,
+         get_threads: Optional[Callable[[], int]] = None) -> Dict:
+    """Benchmark `model.encode` and return the best settings.
+
+    Args:
+        model: SentenceTransformer (anything with `encode(texts, batch_size=...)`).
+        model_name: Recorded in the profile and used for its file name.
+        workers: Embedding processes sharing this host; each is tuned for its
+            share of the cores so they don't oversubscribe.
+        thread_counts: Thread counts to try (default: see `thread_candidates`).
+        batch_sizes: Encode batch sizes tried for bulk throughput.
+        bulk_texts: Chunks encoded per bulk measurement.
+        query_repeats: Single-query encodes timed per thread count.
+        tolerance: Settings within this fraction of the best are considered equal;
+            the one using fewer threads wins.
+    """
+    if set_threads is None or get_threads is None:
+        get_threads, set_threads = _torch_threads()
+    cores = available_cores()
+    thread_counts = list(thread_counts or thread_candidates(cores, workers))
+    original_threads = get_threads()
+    chunks = [f"{i}. {_CHUNK}" for i in range(bulk_texts)]
+    encode_options = {'show_progress_bar': False, 'device': device}
+
+    query_results, bulk_results = [], []
+    try:
+        for threads in thread_counts:
+            set_threads(threads)
+            model.encode([_QUERY], **encode_options)  # warm up
+            latencies = []
+            for _ in range(query_repeats):
+                start = time.perf_counter()
+                model.encode([_QUERY], **encode_options)
+                latencies.append(time.perf_counter() - start)
+            query_results.append({'threads': threads, 'latency_ms': statistics.median(latencies) * 1000})
+
+            for batch_size in batch_sizes:
+                start = time.perf_counter()
+                model.encode(chunks, batch_size=batch_size, **encode_options)
+                elapsed = time.perf_counter() - start
+                bulk_results.append({'threads': threads, 'batch_size': batch_size,
+                                     'texts_per_second': bulk_texts / elapsed})
+    finally:
+        set_threads(original_threads)
+
+    query = _best(query_results, lambda r: 1.0 / r['latency_ms'], tolerance)
+    bulk = _best(bulk_results, lambda r: r['texts_per_second'], tolerance)
+    return {
+        'host': socket.gethostname(),
+        'model': model_name,
+        'device': device,
+        'cores': cores,
+        'workers': workers,
+        'tuned_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'query_threads': query['threads'],
+        'bulk_threads': bulk['threads'],
+        'encode_batch_size': bulk['batch_size'],
+        # Enough chunks per ingest batch for full encode batches without holding much in memory
+        'ingest_batch_size': max(DEFAULT_PROFILE['ingest_batch_size'], bulk['batch_size'] * 2),
+        'query_latency_ms': query['latency_ms'],
+        'bulk_texts_per_second': bulk['texts_per_second'],
+        'measurements': {'query': query_results, 'bulk': bulk_results},
+    }
+
+
+def load_or_tune(model, model_name: str, workers: int = 1, retune: bool = False,
+                 directory: str = PROFILE_DIR, **tune_options) -> Dict:
+    """Saved profile for this host and model, tuning (and saving) one first if needed."""
+    profile = None if retune else load_profile(model_name, workers, directory)
+    if profile is not None:
+        return profile
+    print(f"Autotuning {model_name} on {available_cores()} cores ({workers} worker(s))...")
+    profile = tune(model, model_name, workers=workers, **tune_options)
+    path = save_profile(profile, directory)
+    print(f"✓ Saved tuning profile to {path}")
+    return profile
+
+
+def main():
+    """Tune the default embedding model on this host and print the results."""
+    parser = argparse.ArgumentParser(description="Tune embedding threads and batch sizes for this host")
+    parser.add_argument('--model', default="all-MiniLM-L6-v2", help="sentence-transformers model")
+    parser.add_argument('--workers', type=int, default=int(os.getenv('EMBED_WORKERS', '1')),
+                        help="Embedding processes sharing this host")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+    from sentence_transformers import SentenceTransformer
+
+    profile = load_or_tune(SentenceTransformer(args.model, device='cpu'), args.model,
+                           workers=args.workers, retune=True)
+    print(f"\n{'threads':>8} {'query ms':>10}")
+    for r in profile['measurements']['query']:
+        print(f"{r['threads']:>8} {r['latency_ms']:>10.2f}")
+    print(f"\n{'threads':>8} {'batch':>6} {'texts/s':>10}")
+    for r in profile['measurements']['bulk']:
+        print(f"{r['threads']:>8} {r['batch_size']:>6} {r['texts_per_second']:>10.1f}")
+    print(f"\nQueries: {profile['query_threads']} threads ({profile['query_latency_ms']:.2f} ms); "
+          f"bulk: {profile['bulk_threads']} threads, batch {profile['encode_batch_size']} "
+          f"({profile['bulk_texts_per_second']:.0f} texts/s)")
+
+
+if __name__ == "__main__":
+    main()
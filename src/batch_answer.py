@@ -0,0 +1,267 @@
+"""
+Bulk offline answering: draft replies for a JSONL backlog of support tickets.
+Tickets are retrieved for in large batches (one encode pass and one vector
+search per batch), then answered by the LLM with bounded concurrency under a
+requests-per-minute limit. Results are appended to an output JSONL as they
+complete, and a rerun with the same output file skips tickets already answered.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+from typing import List, Dict, Iterable, Iterator, Set
+
+
+class RateLimiter:
+    """Spaces calls evenly to stay under a requests-per-minute quota."""
+
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Block until the next call may start; returns the seconds waited."""
+        with self._lock:
+            now = time.monotonic()
+            start_at = max(now, self._next)
+            self._next = start_at + self.interval
+        delay = start_at - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def backoff(self, seconds: float):
+        """Hold back every caller after the upstream signals it is over quota."""
+        with self._lock:
+            self._next = max(self._next, time.monotonic() + seconds)
+
+
+def read_tickets(path: str, id_field: str = 'id', text_field: str = 'question') -> Iterator[Dict]:
+    """Yield {'id', 'question', 'ticket'} from a JSONL file, skipping blank or malformed lines."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                ticket = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"⚠ Skipping line {line_number} of {path}: {e}")
+                continue
+            question = str(ticket.get(text_field) or '').strip()
+            if not question:
+                print(f"⚠ Skipping line {line_number} of {path}: no '{text_field}' field")
+                continue
+            yield {'id': str(ticket.get(id_field, line_number)), 'question': question, 'ticket': ticket}
+
+
+def completed_ids(output_path: str) -> Set[str]:
+    """Ids already answered in an output file (the checkpoint for resuming)."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut short by an interrupted run
+            if 'answer' in record:
+                done.add(record['id'])
+    return done
+
+
+class BatchAnswerer:
+    """Answers tickets with a HelpdeskChatbot's retrieval, prompt and LLM client."""
+
+    def __init__(self, chatbot, batch_size: int = 256, concurrency: int = 8,
+                 requests_per_minute: float = 0.0, max_retries: int = 5):
+        """Initialize the batch runner.
+
+        Args:
+            chatbot: HelpdeskChatbot providing the vector store, reranker, product
+                catalog, prompt and LLM client.
+            batch_size: Tickets embedded and searched together.
+            concurrency: LLM calls in flight at once.
+            requests_per_minute: Upstream quota; 0 disables rate limiting.
+            max_retries: Attempts per ticket after a failed LLM call.
+        """
+        self.chatbot = chatbot
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.limiter = RateLimiter(requests_per_minute)
+
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            'tickets': 0,
+            'skipped': 0,
+            'answered': 0,
+            'failed': 0,
+            'retries': 0,
+            'retrieval_time': 0.0,
+            'llm_time': 0.0,
+            'rate_limit_wait': 0.0,
+            'elapsed': 0.0,
+        }
+
+    def _retrieve(self, tickets: List[Dict]) -> List[List[Dict]]:
+        """Top-k chunks for a whole batch of tickets in one vectorized search."""
+        chatbot = self.chatbot
+        questions = [t['question'] for t in tickets]
+        if chatbot.reranker is None:
+            return chatbot.vector_store.search_batch(questions, top_k=chatbot.top_k)
+        candidates = chatbot.vector_store.search_batch(
+            questions, top_k=max(chatbot.rerank_candidates, chatbot.top_k))
+        return [chatbot.reranker.rerank(q, c, top_n=chatbot.top_k) for q, c in zip(questions, candidates)]
+
+    def _prepare(self, tickets: List[Dict]) -> List[Dict]:
+        """Attach the prompt and sources to each ticket of a batch."""
+        start = time.perf_counter()
+        results = self._retrieve(tickets)
+        for ticket, docs in zip(tickets, results):
+            product_rows = []
+            if self.chatbot.product_catalog is not None:
+                product_rows = self.chatbot.product_catalog.context_rows(ticket['question'])
+            history = [{"role": "user", "content": ticket['question']}]
+            ticket['messages'] = self.chatbot._build_messages(
+                history, self.chatbot._context_block(docs), product_rows)
+            ticket['sources'] = [doc['source'] for doc in docs]
+        self.stats['retrieval_time'] += time.perf_counter() - start
+        return tickets
+
+    def _answer(self, ticket: Dict) -> Dict:
+        """Call the LLM for one ticket, retrying with backoff; returns the output record."""
+        record = {'id': ticket['id'], 'question': ticket['question'], 'sources': ticket['sources']}
+        for attempt in range(self.max_retries + 1):
+            waited = self.limiter.acquire()
+            start = time.perf_counter()
+            try:
+                record['answer'] = self.chatbot._complete(ticket['messages'])
+                break
+            except Exception as e:
+                record['error'] = f"{type(e).__name__}: {e}"
+                if attempt == self.max_retries:
+                    break
+                # Over quota or transient failure: slow everyone down, then retry
+                delay = min(2.0 ** attempt, 60.0) * (1 + random.random())
+                if getattr(e, 'status_code', None) == 429:
+                    self.limiter.backoff(delay)
+                with self._stats_lock:
+                    self.stats['retries'] += 1
+                time.sleep(delay)
+            finally:
+                with self._stats_lock:
+                    self.stats['llm_time'] += time.perf_counter() - start
+                    self.stats['rate_limit_wait'] += waited
+
+        if 'answer' in record:
+            record.pop('error', None)
+        return record
+
+    def run(self, tickets: Iterable[Dict], output_path: str) -> Dict:
+        """Answer tickets, appending one JSON record per ticket to `output_path`."""
+        start = time.perf_counter()
+        done = completed_ids(output_path)
+
+        def pending():
+            for ticket in tickets:
+                self.stats['tickets'] += 1
+                if ticket['id'] in done:
+                    self.stats['skipped'] += 1
+                    continue
+                yield ticket
+
+        remaining = pending()
+        # Start on a fresh line if an interrupted run left a partial record
+        if os.path.exists(output_path) and os.path.getsize(output_path):
+            with open(output_path, 'rb+') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+
+        with open(output_path, 'a', encoding='utf-8') as out, \
+                ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            in_flight = set()
+
+            def drain(limit: int):
+                nonlocal in_flight
+                while len(in_flight) > limit:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        record = future.result()
+                        self.stats['answered' if 'answer' in record else 'failed'] += 1
+                        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                        out.flush()
+
+            while True:
+                batch = list(islice(remaining, self.batch_size))
+                if not batch:
+                    break
+                # The next batch is retrieved while this one's LLM calls run
+                for ticket in self._prepare(batch):
+                    drain(2 * self.concurrency)
+                    in_flight.add(pool.submit(self._answer, ticket))
+            drain(0)
+
+        self.stats['elapsed'] = time.perf_counter() - start
+        return self.get_stats()
+
+    def get_stats(self) -> Dict:
+        """Return ticket counts, time split and throughput."""
+        stats = dict(self.stats)
+        processed = stats['answered'] + stats['failed']
+        stats['tickets_per_second'] = processed / stats['elapsed'] if stats['elapsed'] else 0.0
+        return stats
+
+
+def main():
+    """Draft answers for a JSONL ticket backlog."""
+    parser = argparse.ArgumentParser(description="Draft helpdesk answers for a backlog of tickets")
+    parser.add_argument('input', help="JSONL file with one ticket per line")
+    parser.add_argument('output', help="JSONL file to append answers to (also the resume checkpoint)")
+    parser.add_argument('--id-field', default='id', help="Ticket id field")
+    parser.add_argument('--text-field', default='question', help="Field holding the customer's question")
+    parser.add_argument('--batch-size', type=int, default=256, help="Tickets retrieved per batch")
+    parser.add_argument('--concurrency', type=int, default=8, help="LLM calls in flight")
+    parser.add_argument('--rpm', type=float, default=float(os.getenv('LLM_REQUESTS_PER_MINUTE', '0')),
+                        help="Upstream requests-per-minute quota (0 = unlimited)")
+    parser.add_argument('--max-retries', type=int, default=5, help="Retries per ticket on LLM errors")
+    args = parser.parse_args()
+
+    # Add parent directory to Python path so imports work when run directly
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+    from dotenv import load_dotenv
+    from src.chatbot import HelpdeskChatbot
+    from src.vector_store import VectorStore
+
+    load_dotenv()
+    openai_api_key = os.getenv('OPENAI_API_KEY')
+    if not openai_api_key:
+        print("Error: OPENAI_API_KEY not found in .env file")
+        sys.exit(1)
+
+    vector_store = VectorStore()
+    if vector_store.get_collection_count() == 0:
+        print("No documents found in vector store. Please run 'python src/ingest_data.py' first.")
+        sys.exit(1)
+    chatbot = HelpdeskChatbot(openai_api_key, vector_store)
+
+    answerer = BatchAnswerer(chatbot, batch_size=args.batch_size, concurrency=args.concurrency,
+                             requests_per_minute=args.rpm, max_retries=args.max_retries)
+    stats = answerer.run(read_tickets(args.input, args.id_field, args.text_field), args.output)
+
+    print(f"✓ {stats['answered']} answered, {stats['failed']} failed, "
+          f"{stats['skipped']} already done ({stats['tickets_per_second']:.1f} tickets/s)")
+    print(f"  retrieval {stats['retrieval_time']:.1f}s, LLM {stats['llm_time']:.1f}s across "
+          f"{args.concurrency} workers, rate-limit wait {stats['rate_limit_wait']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
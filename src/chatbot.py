@@ -3,10 +3,25 @@ Helpdesk chatbot with RAG capabilities using Kimi (Moonshot AI) and custom retri
 """
 
 import os
+import time
 from openai import OpenAI
-from typing import List, Dict, Optional
+from typing import List, Dict, Callable, Optional, Sequence, Tuple, Union, TYPE_CHECKING
 
-from .vector_store import VectorStore
+from . import profiling
+from .admission import AdmissionController, Cancelled, Overloaded
+from .context_cache import ContextBlock, ContextCache, estimate_tokens
+from .faq_index import FAQIndex
+from .intent_router import IntentRouter
+from .query_log import Prewarmer, QueryLog, top_queries
+from .product_catalog import ProductCatalog, find_catalog
+from .query_rewriter import QueryRewriter
+from .reranker import Reranker
+from .session_store import SessionStore
+
+if TYPE_CHECKING:
+    # Only needed for annotations; chat workers using the shared retrieval
+    # service should not pay for importing torch/chromadb.
+    from .vector_store import VectorStore
 
 
 class HelpdeskChatbot:
@@ -38,8 +53,44 @@ Guidelines:
 
 Remember: You're here to help customers have a great experience with FluffyAI!"""
 
-    def __init__(self, openai_api_key: str, vector_store: VectorStore, model: str = "moonshot-v1-8k"):
-        """Initialize chatbot with Kimi (Moonshot AI) client and vector store."""
+    # Wraps the retrieved sources in the context system message
+    CONTEXT_HEADER = "Here is relevant information from the knowledge base that may help answer the user's question:\n\n"
+    CONTEXT_FOOTER = ("\n\n---\n\nNow, please answer the user's question based on this context. "
+                      "If the context doesn't contain the answer, let the user know and offer to help in another way.")
+
+    def __init__(self, openai_api_key: str, vector_store: "VectorStore", model: str = "moonshot-v1-8k",
+                 top_k: int = 3, query_rewriter: Optional[QueryRewriter] = None,
+                 session_store: Optional[SessionStore] = None, reranker: Optional[Reranker] = None,
+                 rerank_candidates: int = 12, faq_index: Optional[FAQIndex] = None,
+                 product_catalog: Optional[ProductCatalog] = None,
+                 intent_router: Optional[IntentRouter] = None,
+                 admission: Optional[AdmissionController] = None,
+                 query_log: Optional[QueryLog] = None, context_cache: Optional[ContextCache] = None):
+        """Initialize chatbot with Kimi (Moonshot AI) client and vector store.
+
+        Args:
+            top_k: Number of chunks retrieved per question.
+            query_rewriter: Optional rewriter that turns follow-up messages into
+                           standalone retrieval queries using recent turns.
+            session_store: Optional store for per-session histories. Used when
+                          `chat` is called with a session_id.
+            reranker: Optional cross-encoder; when set, `rerank_candidates` chunks are
+                     retrieved and only the best `top_k` are kept for the prompt.
+            faq_index: Optional FAQ question index; confident matches are answered
+                      directly without retrieval or an LLM call.
+            product_catalog: Optional structured product table; simple attribute and
+                            comparison questions are answered from it, and relevant
+                            product rows are added to the prompt otherwise.
+            intent_router: Optional local intent classifier; greetings, small talk and
+                          off-topic messages are answered from templates, and the
+                          message embedding it computes is reused for retrieval.
+            admission: Optional limit on concurrent LLM calls; turns that can't get a
+                      slot in time raise Overloaded.
+            query_log: Optional append-only log of answered questions, used to
+                      prewarm caches on the next start.
+            context_cache: Cache of rendered context messages per retrieved chunk set
+                          (a 1024-entry cache is created if omitted).
+        """
         # Fix proxy URL if it uses 'socks://' instead of 'socks5://'
         for proxy_var in ['all_proxy', 'ALL_PROXY', 'http_proxy', 'https_proxy']:
             proxy_val = os.environ.get(proxy_var)
@@ -49,73 +100,360 @@ Remember: You're here to help customers have a great experience with FluffyAI!""
         self.client = OpenAI(api_key=openai_api_key, base_url="https://api.moonshot.cn/v1")
         self.vector_store = vector_store
         self.model = model
+        self.top_k = top_k
+        self.query_rewriter = query_rewriter
+        self.session_store = session_store
+        self.reranker = reranker
+        self.rerank_candidates = rerank_candidates
+        self.faq_index = faq_index
+        self.product_catalog = product_catalog
+        self.intent_router = intent_router
+        self.admission = admission
+        self.query_log = query_log
+        self.context_cache = context_cache or ContextCache(prefix_tokens=estimate_tokens(self.SYSTEM_PROMPT))
+        # Built once so every prompt starts with the same bytes
+        self._system_message = {"role": "system", "content": self.SYSTEM_PROMPT}
         self.conversation_history: List[Dict[str, str]] = []
+        # Per-stage latencies (seconds) of the most recent chat turn
+        self.last_timings: Dict[str, float] = {}
+        # Moving average of a full retrieval + LLM turn, used to estimate time saved by shortcuts
+        self._avg_full_turn = 0.0
+        # The FAQ index and catalog are versioned with the chunks and switch with them
+        if hasattr(vector_store, 'add_swap_listener'):
+            vector_store.add_swap_listener(self.reload_side_indexes)
 
-    def _retrieve_context(self, query: str, top_k: int = 3) -> str:
+    def _retrieve_context(self, query: str, top_k: int = 3, query_embedding=None) -> str:
         """Retrieve relevant context from vector store."""
-        results = self.vector_store.search(query, top_k=top_k)
+        return self._format_context(self._retrieve(query, top_k, query_embedding))
 
-        if not results:
-            return "No relevant information found in knowledge base."
+    def _retrieve(self, query: str, top_k: int = 3, query_embedding=None,
+                  timings: Optional[Dict[str, float]] = None) -> List[Dict]:
+        """Retrieve (and optionally rerank) the chunks for a query, recording rerank time in timings."""
+        if self.reranker is None and query_embedding is not None and \
+                hasattr(self.vector_store, 'search_embeddings'):
+            results = self.vector_store.search_embeddings(query_embedding[None, :], top_k=top_k)[0]
+        elif self.reranker is not None:
+            candidates = self.vector_store.search(query, top_k=max(self.rerank_candidates, top_k))
+            start = time.perf_counter()
+            results = self.reranker.rerank(query, candidates, top_n=top_k)
+            if timings is not None:
+                timings['rerank'] = time.perf_counter() - start
+        else:
+            results = self.vector_store.search(query, top_k=top_k)
+        return results
 
-        context_parts = []
-        for i, doc in enumerate(results, 1):
-            context_parts.append(f"[Source {i}: {doc['source']}]\n{doc['content']}")
-
-        return "\n\n---\n\n".join(context_parts)
-
-    def chat(self, user_message: str, use_rag: bool = True) -> str:
-        """Process user message and generate response."""
-        # Add user message to history
-        self.conversation_history.append({
-            "role": "user",
-            "content": user_message
-        })
+    def _render_context(self, results: List[Dict]) -> Tuple[str, Dict[str, str]]:
+        """Render retrieved chunks as numbered sources, plus the system message wrapping them."""
+        if not results:
+            text = "No relevant information found in knowledge base."
+        else:
+            text = "\n\n---\n\n".join(
+                f"[Source {i}: {doc['source']}]\n{doc['content']}" for i, doc in enumerate(results, 1)
+            )
+        return text, {"role": "system", "content": self.CONTEXT_HEADER + text + self.CONTEXT_FOOTER}
 
-        # Prepare messages for API call
-        messages = [{"role": "system", "content": self.SYSTEM_PROMPT}]
+    def _context_block(self, results: List[Dict]) -> ContextBlock:
+        """Rendered context for these chunks, reused when the same chunk set comes back."""
+        return self.context_cache.get(results, self._render_context)
 
-        # Add context if RAG is enabled
-        if use_rag:
-            context = self._retrieve_context(user_message)
-            context_message = f"""Here is relevant information from the knowledge base that may help answer the user's question:
+    def _format_context(self, results: List[Dict]) -> str:
+        """Render retrieved chunks as numbered sources for the prompt."""
+        return self._context_block(results).text
 
-{context}
+    def _build_messages(self, history: List[Dict[str, str]], context: Union[ContextBlock, str, None] = None,
+                        product_rows: Sequence[str] = ()) -> List[Dict[str, str]]:
+        """Assemble the LLM prompt: system prompt, retrieved context, product facts and recent turns.
 
----
+        The stable parts come first (the system prompt, then the context
+        message, which is identical for the same chunk set), so repeated
+        questions share a prompt prefix upstream.
+        """
+        messages = [self._system_message]
 
-Now, please answer the user's question based on this context. If the context doesn't contain the answer, let the user know and offer to help in another way."""
+        if isinstance(context, ContextBlock):
+            messages.append(context.message)
+        elif context is not None:
+            messages.append({"role": "system", "content": self.CONTEXT_HEADER + context + self.CONTEXT_FOOTER})
 
+        if product_rows:
             messages.append({
                 "role": "system",
-                "content": context_message
+                "content": "Product facts from the catalog (authoritative):\n" + "\n".join(product_rows)
             })
 
         # Add conversation history (last 10 messages to keep context window manageable)
-        messages.extend(self.conversation_history[-10:])
+        messages.extend(history[-10:])
+        return messages
+
+    def _load_history(self, session_id: Optional[str]) -> List[Dict[str, str]]:
+        """Return the history for a session, or the default in-memory history."""
+        if session_id is None or self.session_store is None:
+            return self.conversation_history
+        return self.session_store.load(session_id)
 
-        # Generate response
-        response = self.client.chat.completions.create(
+    def _save_history(self, session_id: Optional[str], history: List[Dict[str, str]]):
+        """Persist a session's history (buffered by the store, never blocks)."""
+        if session_id is not None and self.session_store is not None:
+            self.session_store.save(session_id, history)
+
+    def _complete(self, messages: List[Dict[str, str]], should_cancel: Optional[Callable[[], bool]] = None) -> str:
+        """Call the LLM; with `should_cancel`, stream and stop as soon as it returns True."""
+        if should_cancel is None:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=1024
+            )
+            return response.choices[0].message.content
+
+        # Streaming lets an abandoned request close the upstream call instead of
+        # paying for the rest of the completion
+        stream = self.client.chat.completions.create(
             model=self.model,
             messages=messages,
             temperature=0.7,
-            max_tokens=1024
+            max_tokens=1024,
+            stream=True
         )
+        parts = []
+        try:
+            for chunk in stream:
+                if should_cancel():
+                    raise Cancelled()
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+        finally:
+            stream.close()
+        return "".join(parts)
+
+    def chat(self, user_message: str, use_rag: bool = True, session_id: Optional[str] = None,
+             should_cancel: Optional[Callable[[], bool]] = None) -> str:
+        """Process user message and generate response.
+
+        Args:
+            session_id: Conversation to continue when a session store is configured.
+                       Without one, the chatbot's single in-memory history is used.
+            should_cancel: Polled while waiting for an admission slot and during the
+                          LLM call; returning True (client disconnected) abandons the
+                          turn with Cancelled.
+        """
+        history = self._load_history(session_id)
+
+        # Add user message to history
+        history.append({
+            "role": "user",
+            "content": user_message
+        })
+
+        timings: Dict[str, float] = {}
+
+        # Intent routing: small talk and off-topic messages never reach retrieval
+        query_embedding = None
+        if self.intent_router is not None:
+            route = self.intent_router.route(user_message)
+            timings['intent'] = route['latency']
+            if route['reply'] is not None:
+                self.intent_router.record_saving(self._avg_full_turn - timings['intent'])
+                return self._finish_turn(history, session_id, route['reply'], timings, route=route['intent'])
+            query_embedding = route['embedding']
+
+        # FAQ fast path: answer close matches to known questions directly
+        if self.faq_index is not None:
+            start = time.perf_counter()
+            entry = self.faq_index.match(user_message)
+            timings['faq'] = time.perf_counter() - start
+            if entry is not None:
+                self.faq_index.record_saving(self._avg_full_turn - timings['faq'])
+                return self._finish_turn(history, session_id, self.faq_index.format_answer(entry), timings,
+                                         route='faq')
+
+        # Product facts: answer attribute/comparison questions from the catalog
+        product_rows: List[str] = []
+        if self.product_catalog is not None:
+            start = time.perf_counter()
+            answer = self.product_catalog.answer(user_message)
+            if answer is None:
+                product_rows = self.product_catalog.context_rows(user_message)
+            timings['catalog'] = time.perf_counter() - start
+            if answer is not None:
+                return self._finish_turn(history, session_id, answer, timings, route='catalog')
 
-        assistant_message = response.choices[0].message.content
+        # Retrieve context if RAG is enabled
+        context = None
+        chunk_ids: List[str] = []
+        if use_rag:
+            retrieval_query = user_message
+            if self.query_rewriter is not None:
+                start = time.perf_counter()
+                retrieval_query = self.query_rewriter.rewrite(user_message, history[:-1])
+                timings['rewrite'] = time.perf_counter() - start
+                if retrieval_query != user_message:
+                    query_embedding = None
+
+            start = time.perf_counter()
+            results = self._retrieve(retrieval_query, top_k=self.top_k, query_embedding=query_embedding,
+                                     timings=timings)
+            context = self._context_block(results)
+            chunk_ids = [doc['id'] for doc in results if 'id' in doc]
+            timings['retrieval'] = time.perf_counter() - start - timings.get('rerank', 0.0)
+
+        messages = self._build_messages(history, context, product_rows)
+
+        # Generate response, within an admission slot when load shedding is enabled
+        try:
+            if self.admission is not None:
+                timings['queue'] = self.admission.acquire(should_cancel)
+            try:
+                start = time.perf_counter()
+                assistant_message = self._complete(messages, should_cancel)
+                timings['llm'] = time.perf_counter() - start
+            except Cancelled:
+                if self.admission is not None:
+                    self.admission.record_cancel()
+                raise
+            finally:
+                if self.admission is not None:
+                    self.admission.release()
+        except (Overloaded, Cancelled):
+            # The turn never happened; keep the history as it was
+            history.pop()
+            raise
+
+        full_turn = sum(t for stage, t in timings.items() if stage != 'queue')
+        self._avg_full_turn = full_turn if not self._avg_full_turn else \
+            0.9 * self._avg_full_turn + 0.1 * full_turn
+
+        return self._finish_turn(history, session_id, assistant_message, timings, chunk_ids=chunk_ids)
+
+    def _finish_turn(self, history: List[Dict[str, str]], session_id: Optional[str],
+                     assistant_message: str, timings: Dict[str, float], route: str = 'support',
+                     chunk_ids: Sequence[str] = ()) -> str:
+        """Record the assistant reply and timings for this turn."""
+        self.last_timings = timings
+        if self.query_log is not None:
+            self.query_log.record(history[-1]['content'], chunk_ids, timings, route=route)
 
         # Add assistant response to history
-        self.conversation_history.append({
+        history.append({
             "role": "assistant",
             "content": assistant_message
         })
+        self._save_history(session_id, history)
 
         return assistant_message
 
-    def reset_conversation(self):
+    def reload_side_indexes(self, collection_name: str):
+        """Switch the FAQ fast path and product catalog to the versions built with a chunk collection."""
+        if self.faq_index is not None:
+            self.faq_index.use_version(collection_name)
+        if self.product_catalog is not None:
+            path = find_catalog(self.vector_store, collection_name)
+            if path is not None:
+                catalog = ProductCatalog.load(path)
+                catalog.stats = self.product_catalog.stats
+                self.product_catalog = catalog
+
+    def update_side_indexes(self, source: str, document: Optional[Dict[str, str]]):
+        """Bring the FAQ fast path and product catalog up to date with one changed source.
+
+        `document` is the re-parsed source ({'content', 'source', 'type'}), or None
+        once it has been deleted.
+        """
+        text = document['content'] if document is not None else None
+        if self.faq_index is not None:
+            self.faq_index.replace_source(source, text)
+        if self.product_catalog is not None:
+            markdown = text if document is not None and document['type'] == 'markdown' else None
+            self.product_catalog = self.product_catalog.with_source(source, markdown)
+
+    def reset_conversation(self, session_id: Optional[str] = None):
         """Clear conversation history."""
-        self.conversation_history = []
+        if session_id is not None and self.session_store is not None:
+            self.session_store.delete(session_id)
+        else:
+            self.conversation_history = []
 
-    def get_conversation_history(self) -> List[Dict[str, str]]:
+    def get_conversation_history(self, session_id: Optional[str] = None) -> List[Dict[str, str]]:
         """Get the full conversation history."""
-        return self.conversation_history
+        return self._load_history(session_id)
+
+
+def _flag(name: str) -> bool:
+    return os.getenv(name, '').lower() in ('1', 'true', 'yes')
+
+
+def configure_chatbot(chatbot: HelpdeskChatbot, vector_store) -> HelpdeskChatbot:
+    """Enable the optional features selected by environment variables.
+
+    Shared by the web app and the CLI so both entry points serve the same
+    configuration. `vector_store` may be a VectorStore or a RetrievalClient;
+    features needing the local store are skipped for the latter.
+    """
+    # Rendered context messages kept per retrieved chunk set (0 disables)
+    if os.getenv('CONTEXT_CACHE_SIZE'):
+        chatbot.context_cache.max_entries = int(os.getenv('CONTEXT_CACHE_SIZE'))
+
+    # Optional conversation-aware query rewriting: QUERY_REWRITE=heuristic|llm
+    rewrite_mode = os.getenv('QUERY_REWRITE', '').lower()
+    if rewrite_mode in ('heuristic', 'llm'):
+        chatbot.query_rewriter = QueryRewriter(client=chatbot.client, use_llm=rewrite_mode == 'llm')
+        print(f"Query rewriting enabled ({rewrite_mode})")
+
+    # Optional cross-encoder reranking: RERANK=1
+    if _flag('RERANK'):
+        chatbot.reranker = Reranker(
+            model_name=os.getenv('RERANK_MODEL', 'cross-encoder/ms-marco-MiniLM-L-6-v2'),
+            latency_budget=float(os.getenv('RERANK_BUDGET_MS', '150')) / 1000
+        )
+        print("Reranking enabled")
+
+    # Optional FAQ fast path: FAQ_FAST_PATH=1 (needs the local vector store)
+    if _flag('FAQ_FAST_PATH') and getattr(vector_store, 'chroma_client', None) is not None:
+        chatbot.faq_index = FAQIndex(vector_store, threshold=float(os.getenv('FAQ_THRESHOLD', '0.85')))
+        print(f"FAQ fast path enabled ({len(chatbot.faq_index)} questions)")
+
+    # Optional local intent routing: INTENT_ROUTER=1 (needs the local embedding model)
+    if _flag('INTENT_ROUTER') and hasattr(vector_store, 'encode'):
+        chatbot.intent_router = IntentRouter(vector_store, threshold=float(os.getenv('INTENT_THRESHOLD', '0.6')))
+        print("Intent routing enabled")
+
+    # Optional load shedding: ADMISSION_MAX_CONCURRENT=<LLM calls at once>
+    if int(os.getenv('ADMISSION_MAX_CONCURRENT', '0')) > 0:
+        chatbot.admission = AdmissionController(
+            max_concurrent=int(os.getenv('ADMISSION_MAX_CONCURRENT')),
+            max_queue=int(os.getenv('ADMISSION_MAX_QUEUE', '16')),
+            queue_timeout=float(os.getenv('ADMISSION_QUEUE_TIMEOUT', '10'))
+        )
+        print(f"Admission control: {chatbot.admission.max_concurrent} concurrent LLM calls, "
+              f"{chatbot.admission.max_queue} queued for up to {chatbot.admission.queue_timeout:.0f}s")
+
+    # Optional structured product answers: PRODUCT_CATALOG=1 (built by ingest_data.py)
+    if _flag('PRODUCT_CATALOG'):
+        path = find_catalog(vector_store)
+        if path is not None:
+            chatbot.product_catalog = ProductCatalog.load(path)
+            print(f"Product catalog loaded ({len(chatbot.product_catalog)} products)")
+        else:
+            print("⚠ No product catalog found; run 'python src/ingest_data.py' to build it")
+
+    # Optional profiling: PROFILE_REQUESTS=<fraction of turns>, 0 = only turns asked for
+    # (X-Profile: 1 in the web app, '/profile <question>' in the CLI)
+    if os.getenv('PROFILE_REQUESTS'):
+        rate = float(os.getenv('PROFILE_REQUESTS'))
+        directory = os.getenv('PROFILE_DIR', profiling.PROFILE_DIR)
+        profiling.enable([(HelpdeskChatbot, 'chat'), (type(vector_store), 'search'),
+                          (type(vector_store), 'add_documents')],
+                         rate=rate, directory=directory)
+        print(f"Profiling {rate:.1%} of requests to {directory}")
+
+    # Optional query log and cache prewarming from it: QUERY_LOG=./query_log.jsonl
+    if os.getenv('QUERY_LOG'):
+        log_path = os.getenv('QUERY_LOG')
+        frequent = top_queries(log_path, n=int(os.getenv('PREWARM_TOP_N', '200')))
+        chatbot.query_log = QueryLog(log_path, embedding_lookup=getattr(vector_store, 'cached_embedding', None))
+        if frequent:
+            print(f"Prewarming caches with the {len(frequent)} most frequent logged queries...")
+            Prewarmer(chatbot, frequent).start()
+
+    return chatbot
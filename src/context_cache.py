@@ -0,0 +1,110 @@
+"""
+Cache of formatted prompt context blocks.
+Popular questions retrieve the same chunks over and over, so the rendered
+"[Source i: ...]" block, the context system message wrapping it and its token
+count are kept per ordered tuple of chunk ids. Chunk ids are hashes of source
+and content, so an entry can never go stale. Prompts are laid out as the fixed
+system prompt, then the context message, then product facts and the
+conversation, so a repeated chunk set gives a byte-identical prompt prefix
+that the upstream API's prefix cache can serve.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Callable, NamedTuple, Tuple
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # optional dependency (ImportError, or no cached encoding offline)
+    _encoding = None
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count of text (tiktoken's cl100k when installed, else ~4 bytes per token)."""
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return (len(text.encode('utf-8')) + 3) // 4
+
+
+def chunk_key(results: List[Dict]) -> Tuple[str, ...]:
+    """Ordered chunk-id tuple for retrieved chunks (content hash for chunks without an id)."""
+    return tuple(
+        doc.get('id') or hashlib.md5(f"{doc['source']}:{doc['content']}".encode()).hexdigest()
+        for doc in results
+    )
+
+
+class ContextBlock(NamedTuple):
+    """A rendered context block and the prompt message built from it."""
+    text: str
+    message: Dict[str, str]
+    tokens: int
+
+
+class ContextCache:
+    """LRU cache of ContextBlocks keyed by ordered chunk-id tuple."""
+
+    def __init__(self, max_entries: int = 1024, prefix_tokens: int = 0):
+        """Initialize the cache.
+
+        Args:
+            max_entries: Blocks kept; 0 disables caching (blocks are still built).
+            prefix_tokens: Tokens of the fixed system prompt before the context,
+                counted towards the reusable prefix.
+        """
+        self.max_entries = max_entries
+        self.prefix_tokens = prefix_tokens
+        self._blocks: "OrderedDict[Tuple[str, ...], ContextBlock]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {
+            'lookups': 0,
+            'hits': 0,
+            'bytes_saved': 0,
+            'prefix_tokens_reused': 0,
+            'prefix_tokens_total': 0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    def get(self, results: List[Dict], build: Callable[[List[Dict]], Tuple[str, Dict[str, str]]]) -> ContextBlock:
+        """Return the block for these chunks, calling `build(results) -> (text, message)` on a miss."""
+        key = chunk_key(results)
+        with self._lock:
+            self.stats['lookups'] += 1
+            block = self._blocks.get(key)
+            if block is not None:
+                self._blocks.move_to_end(key)
+                self.stats['hits'] += 1
+                # Formatting of the context message skipped (it wraps block.text, so count it once)
+                self.stats['bytes_saved'] += len(block.message['content'].encode('utf-8'))
+                self.stats['prefix_tokens_reused'] += self.prefix_tokens + block.tokens
+                self.stats['prefix_tokens_total'] += self.prefix_tokens + block.tokens
+                return block
+
+        text, message = build(results)
+        block = ContextBlock(text, message, estimate_tokens(message['content']))
+        with self._lock:
+            self.stats['prefix_tokens_total'] += self.prefix_tokens + block.tokens
+            if self.max_entries > 0:
+                self._blocks[key] = block
+                while len(self._blocks) > self.max_entries:
+                    self._blocks.popitem(last=False)
+        return block
+
+    def clear(self):
+        with self._lock:
+            self._blocks.clear()
+
+    def get_stats(self) -> Dict:
+        """Return hit counts, prefix reuse rate and bytes/tokens saved."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._blocks)
+        lookups = stats['lookups']
+        stats['prefix_reuse_rate'] = stats['hits'] / lookups if lookups else 0.0
+        total = stats['prefix_tokens_total']
+        stats['prefix_token_reuse_rate'] = stats['prefix_tokens_reused'] / total if total else 0.0
+        return stats
@@ -0,0 +1,254 @@
+"""
+Concurrent site crawler for knowledge base ingestion.
+Starts from seed pages and/or sitemaps, stays on the seeds' hosts, respects
+robots.txt, and yields one document per unique page as soon as it is fetched,
+so pages flow straight into chunking and embedding.
+"""
+
+import hashlib
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Iterator, Optional, Tuple
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+from .text_extraction import extract_page
+
+DEFAULT_USER_AGENT = "FluffyAI-Helpdesk-Crawler/1.0"
+
+# Query parameters that never change page content: prefixes, and exact names
+# (so "ref" is dropped but "refund_id" is kept)
+_TRACKING_PREFIXES = ('utm_',)
+_TRACKING_PARAMS = {'fbclid', 'gclid', 'msclkid', 'ref', 'sessionid'}
+
+# Links to files we can't turn into text
+_SKIP_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.ico', '.css', '.js',
+                    '.zip', '.gz', '.mp3', '.mp4', '.woff', '.woff2', '.pdf')
+
+
+def normalize_url(url: str, base: Optional[str] = None) -> Optional[str]:
+    """Canonical form of an http(s) URL for dedup, or None if it isn't crawlable."""
+    if base:
+        url = urljoin(base, url)
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    if scheme not in ('http', 'https') or not parts.hostname:
+        return None
+
+    host = parts.hostname.lower()
+    port = parts.port
+    netloc = host if port is None or (scheme, port) in (('http', 80), ('https', 443)) else f"{host}:{port}"
+    path = parts.path or '/'
+    if path.lower().endswith(_SKIP_EXTENSIONS):
+        return None
+
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(_TRACKING_PREFIXES) and key.lower() not in _TRACKING_PARAMS
+    ))
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+def parse_sitemap(xml_text) -> Tuple[List[str], List[str]]:
+    """Return (page URLs, nested sitemap URLs) from a sitemap or sitemap index."""
+    root = ET.fromstring(xml_text)
+    locs = [el.text.strip() for el in root.iter() if el.tag.endswith('loc') and el.text]
+    if root.tag.endswith('sitemapindex'):
+        return [], locs
+    return locs, []
+
+
+class Crawler:
+    """Breadth-first crawler with bounded concurrency.
+
+    Pages are fetched by a thread pool with a keep-alive session per thread.
+    URLs are normalized and deduplicated before fetching, and page text is
+    deduplicated by content hash so mirrored pages are only yielded once.
+    """
+
+    def __init__(self, seeds: List[str], sitemaps: Optional[List[str]] = None, max_pages: int = 500,
+                 max_depth: int = 3, concurrency: int = 8, timeout: float = 10.0,
+                 respect_robots: bool = True, user_agent: str = DEFAULT_USER_AGENT):
+        """Initialize the crawler.
+
+        Args:
+            seeds: Start pages (depth 0).
+            sitemaps: Sitemap or sitemap-index URLs whose pages are also seeds.
+            max_pages: Maximum number of pages fetched.
+            max_depth: Maximum link distance from a seed (0 fetches only the seeds).
+            concurrency: Pages fetched in parallel.
+            timeout: Per-request timeout in seconds.
+            respect_robots: Skip URLs disallowed by each host's robots.txt.
+            user_agent: User-Agent header, also used for robots.txt rules.
+        """
+        self.seeds = seeds
+        self.sitemaps = sitemaps or []
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.respect_robots = respect_robots
+        self.user_agent = user_agent
+
+        self.allowed_hosts = {urlsplit(normalize_url(u) or '').netloc for u in self.seeds + self.sitemaps}
+        self.allowed_hosts.discard('')
+
+        self._local = threading.local()
+        self._robots: Dict[str, Optional[RobotFileParser]] = {}
+        self._robots_lock = threading.Lock()
+
+        self.stats = {
+            'fetched': 0,
+            'yielded': 0,
+            'duplicates': 0,
+            'robots_blocked': 0,
+            'out_of_scope': 0,
+            'errors': 0,
+            'elapsed': 0.0,
+        }
+
+    # HTTP ----------------------------------------------------------------
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers['User-Agent'] = self.user_agent
+            self._local.session = session
+        return session
+
+    def _get(self, url: str):
+        return self._session().get(url, timeout=self.timeout)
+
+    def _allowed(self, url: str) -> bool:
+        """Whether robots.txt for the URL's host allows fetching it."""
+        if not self.respect_robots:
+            return True
+        parts = urlsplit(url)
+        with self._robots_lock:
+            if parts.netloc not in self._robots:
+                parser = None
+                try:
+                    response = self._get(f"{parts.scheme}://{parts.netloc}/robots.txt")
+                    if response.status_code == 200:
+                        parser = RobotFileParser()
+                        parser.parse(response.text.splitlines())
+                except requests.RequestException:
+                    pass
+                self._robots[parts.netloc] = parser
+            parser = self._robots[parts.netloc]
+        return parser is None or parser.can_fetch(self.user_agent, url)
+
+    def _fetch(self, url: str) -> Optional[Tuple[str, str, List[str]]]:
+        """Fetch one page; returns (final URL, text, links) for HTML pages."""
+        response = self._get(url)
+        if response.status_code != 200:
+            return None
+        if 'html' not in response.headers.get('Content-Type', 'text/html'):
+            return None
+        text, links = extract_page(response.content)
+        return response.url, text, links
+
+    # Crawl -----------------------------------------------------------------
+
+    def _sitemap_urls(self) -> List[str]:
+        urls = []
+        pending = list(self.sitemaps)
+        seen = set()
+        while pending:
+            sitemap_url = pending.pop()
+            if sitemap_url in seen:
+                continue
+            seen.add(sitemap_url)
+            try:
+                response = self._get(sitemap_url)
+                response.raise_for_status()
+                pages, nested = parse_sitemap(response.content)
+            except (requests.RequestException, ET.ParseError) as e:
+                print(f"Error loading sitemap {sitemap_url}: {e}")
+                self.stats['errors'] += 1
+                continue
+            urls.extend(pages)
+            pending.extend(nested)
+        return urls
+
+    def _in_scope(self, url: str) -> bool:
+        return urlsplit(url).netloc in self.allowed_hosts
+
+    def crawl(self) -> Iterator[Dict[str, str]]:
+        """Yield {'content', 'source', 'type'} documents as pages are fetched."""
+        start = time.perf_counter()
+        seen = set()
+        content_hashes = set()
+        frontier = []  # (url, depth)
+
+        for url in self.seeds + self._sitemap_urls():
+            url = normalize_url(url)
+            if url and url not in seen and self._in_scope(url):
+                seen.add(url)
+                frontier.append((url, 0))
+
+        submitted = 0
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            in_flight = {}
+            while frontier or in_flight:
+                # Keep the pool busy without queueing more than it can run
+                while frontier and len(in_flight) < self.concurrency and submitted < self.max_pages:
+                    url, depth = frontier.pop(0)
+                    if not self._allowed(url):
+                        self.stats['robots_blocked'] += 1
+                        continue
+                    in_flight[pool.submit(self._fetch, url)] = (url, depth)
+                    submitted += 1
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, depth = in_flight.pop(future)
+                    try:
+                        page = future.result()
+                    except Exception as e:
+                        # One bad page (network error, unparseable body, ...) never ends the crawl
+                        print(f"Error fetching {url}: {e}")
+                        self.stats['errors'] += 1
+                        continue
+                    self.stats['fetched'] += 1
+                    if page is None:
+                        continue
+
+                    final_url, text, links = page
+                    final_url = normalize_url(final_url) or url
+                    if not self._in_scope(final_url):
+                        # Redirected off the seeds' hosts
+                        self.stats['out_of_scope'] += 1
+                        continue
+                    seen.add(final_url)
+
+                    if depth < self.max_depth:
+                        for link in links:
+                            link = normalize_url(link, base=final_url)
+                            if link and link not in seen and self._in_scope(link):
+                                seen.add(link)
+                                frontier.append((link, depth + 1))
+
+                    digest = hashlib.sha1(' '.join(text.split()).lower().encode('utf-8')).hexdigest()
+                    if not text or digest in content_hashes:
+                        self.stats['duplicates'] += 1
+                        continue
+                    content_hashes.add(digest)
+
+                    self.stats['yielded'] += 1
+                    yield {'content': text, 'source': final_url, 'type': 'webpage'}
+
+        self.stats['elapsed'] = time.perf_counter() - start
+
+    def get_stats(self) -> Dict:
+        """Return crawl counters and pages/second."""
+        stats = dict(self.stats)
+        stats['pages_per_second'] = stats['fetched'] / stats['elapsed'] if stats['elapsed'] else 0.0
+        return stats
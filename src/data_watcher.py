@@ -0,0 +1,234 @@
+"""
+Live watcher for the data directory.
+Detects created, changed and deleted documents (inotify via watchdog when it is
+installed, polling otherwise), debounces bursts of events, and re-embeds only the
+affected files' chunks in the live vector store from a background thread.
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # optional dependency
+    Observer = None
+    FileSystemEventHandler = object
+
+SUPPORTED_SUFFIXES = ('.md', '.pdf', '.txt')
+
+
+class _EventHandler(FileSystemEventHandler):
+    """Forwards watchdog events for files to the watcher."""
+
+    def __init__(self, watcher: "DataWatcher"):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        self.watcher.notify(event.src_path)
+        dest_path = getattr(event, 'dest_path', None)
+        if dest_path:
+            self.watcher.notify(dest_path)
+
+
+class DataWatcher:
+    """Keeps the vector store in sync with files under a data directory.
+
+    Events for a file are collected until it has been quiet for `debounce`
+    seconds, then its chunks are replaced in one step: unchanged chunks keep
+    their embeddings, so an edit costs only the chunks it touched.
+    """
+
+    def __init__(self, vector_store, data_dir: str, processor=None, debounce: float = 1.0,
+                 poll_interval: float = 2.0, chunk_size: int = 800, overlap: int = 150,
+                 use_inotify: bool = True, on_change: Optional[Callable[[str, Optional[Dict]], None]] = None):
+        """Initialize the watcher.
+
+        Args:
+            vector_store: VectorStore whose live collection is updated.
+            data_dir: Directory to watch (recursively).
+            processor: DocumentProcessor used to parse files (created if omitted).
+            debounce: Seconds a file must be quiet before it is re-embedded.
+            poll_interval: Seconds between directory scans when polling.
+            chunk_size: Chunk size, matching ingestion.
+            overlap: Chunk overlap, matching ingestion.
+            use_inotify: Use watchdog's native observer when it is installed.
+            on_change: Called as on_change(source, document) after a file's chunks were
+                replaced (document is None for deleted files and PDFs), so side indexes
+                such as the FAQ fast path and product catalog follow the same edit.
+        """
+        if processor is None:
+            from .document_processor import DocumentProcessor
+
+            processor = DocumentProcessor()
+        self.vector_store = vector_store
+        self.data_dir = data_dir
+        self.processor = processor
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.on_change = on_change
+        self.backend = "inotify" if use_inotify and Observer is not None else "polling"
+
+        self._pending: Dict[str, float] = {}  # source path -> time of its last event
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._threads = []
+        self._observer = None
+        self._mtimes: Dict[str, Tuple[int, int]] = {}
+
+        self.stats = {
+            'events': 0,
+            'files_updated': 0,
+            'files_removed': 0,
+            'chunks_added': 0,
+            'chunks_removed': 0,
+            'errors': 0,
+        }
+        self.last_latency = 0.0
+
+    # Event collection ----------------------------------------------------
+
+    def _source_path(self, path: str) -> str:
+        """Map an event path to the source string ingestion stores for that file."""
+        relative = os.path.relpath(os.path.abspath(path), os.path.abspath(self.data_dir))
+        return str(Path(self.data_dir) / relative)
+
+    def notify(self, path: str):
+        """Record a change to `path`; it is processed once events for it settle."""
+        if Path(path).suffix.lower() not in SUPPORTED_SUFFIXES:
+            return
+        with self._condition:
+            self._pending[self._source_path(path)] = time.monotonic()
+            self.stats['events'] += 1
+            self._condition.notify()
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        mtimes = {}
+        for file_path in Path(self.data_dir).rglob('*'):
+            if file_path.suffix.lower() not in SUPPORTED_SUFFIXES:
+                continue
+            try:
+                stat = file_path.stat()
+            except FileNotFoundError:
+                continue
+            mtimes[str(file_path)] = (stat.st_mtime_ns, stat.st_size)
+        return mtimes
+
+    def _poll_loop(self):
+        while not self._stopped.wait(self.poll_interval):
+            current = self._scan()
+            for path in current.keys() | self._mtimes.keys():
+                if current.get(path) != self._mtimes.get(path):
+                    self.notify(path)
+            self._mtimes = current
+
+    # Applying changes ----------------------------------------------------
+
+    def _due_paths(self):
+        """Block until some pending path has been quiet for `debounce` seconds."""
+        with self._condition:
+            while not self._stopped.is_set():
+                now = time.monotonic()
+                due = [p for p, t in self._pending.items() if now - t >= self.debounce]
+                if due:
+                    for path in due:
+                        del self._pending[path]
+                    return due
+                wait = min(self._pending.values()) + self.debounce - now if self._pending else None
+                self._condition.wait(wait)
+            return []
+
+    def _worker_loop(self):
+        while not self._stopped.is_set():
+            due = self._due_paths()
+            for path in due:
+                try:
+                    self.sync_path(path, persist=False)
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    print(f"⚠ Could not update {path}: {e}")
+            if due:
+                # One index save per settled batch of changes, not one per file
+                try:
+                    self.vector_store.save_index()
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    print(f"⚠ Could not save the vector index: {e}")
+
+    def sync_path(self, path: str, persist: bool = True) -> Dict[str, int]:
+        """Re-parse one file and replace its chunks (removes them if the file is gone).
+
+        With persist=False the vector index is not saved; the worker saves once per batch.
+        """
+        start = time.perf_counter()
+        exists = os.path.isfile(path)
+        doc = None
+        documents = []
+        if exists and path.lower().endswith('.pdf'):
+            # Streamed page by page; chunks carry their page number
+            documents = list(self.processor.iter_pdf_chunks(path, chunk_size=self.chunk_size,
+                                                            overlap=self.overlap))
+        elif exists:
+            doc = self.processor.load_file(path)
+            documents = [
+                {'content': chunk, 'source': doc['source'], 'type': doc['type']}
+                for chunk in self.processor.chunk_text(doc['content'], chunk_size=self.chunk_size,
+                                                       overlap=self.overlap)
+            ]
+
+        counts = self.vector_store.replace_source(path, documents, persist=persist)
+        if self.on_change is not None:
+            self.on_change(path, doc)
+        self.stats['files_updated' if exists else 'files_removed'] += 1
+        self.stats['chunks_added'] += counts['added']
+        self.stats['chunks_removed'] += counts['removed']
+        self.last_latency = time.perf_counter() - start
+        print(f"Synced {path}: +{counts['added']} / -{counts['removed']} chunks "
+              f"in {self.last_latency * 1000:.0f} ms")
+        return counts
+
+    # Lifecycle -------------------------------------------------------------
+
+    def start(self):
+        """Start watching in background threads."""
+        self._stopped.clear()
+        if self.backend == "inotify":
+            self._observer = Observer()
+            self._observer.schedule(_EventHandler(self), self.data_dir, recursive=True)
+            self._observer.start()
+        else:
+            self._mtimes = self._scan()
+            self._threads.append(threading.Thread(target=self._poll_loop, name="data-watcher-poll", daemon=True))
+
+        self._threads.append(threading.Thread(target=self._worker_loop, name="data-watcher", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        print(f"Watching {self.data_dir} for changes ({self.backend})")
+
+    def stop(self):
+        """Stop watching; pending changes that haven't settled are dropped."""
+        self._stopped.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def get_stats(self) -> Dict:
+        """Return event and re-embedding counters."""
+        stats = dict(self.stats)
+        stats['backend'] = self.backend
+        stats['pending'] = len(self._pending)
+        return stats
@@ -0,0 +1,184 @@
+"""
+Near-duplicate chunk elimination with MinHash signatures and LSH banding.
+Chunks are streamed through the filter at ingest time; the first chunk of each
+near-duplicate group is kept (canonical) and the sources of the others are
+recorded as its aliases. Incremental updates seed a filter with the live chunks,
+forget the ones they delete and keep the alias lists in step.
+"""
+
+import re
+import time
+import zlib
+from collections import defaultdict
+from typing import List, Dict, Iterable, Iterator, Callable, Optional, Tuple
+
+import numpy as np
+
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+_WORD = re.compile(r'\w+')
+
+
+def shingles(text: str, size: int = 5) -> List[int]:
+    """32-bit hashes of the text's overlapping word `size`-grams (lowercased)."""
+    words = _WORD.findall(text.lower())
+    if len(words) <= size:
+        return [zlib.crc32(' '.join(words).encode('utf-8'))]
+    return list({zlib.crc32(' '.join(words[i:i + size]).encode('utf-8'))
+                 for i in range(len(words) - size + 1)})
+
+
+def choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """(bands, rows) with bands * rows == num_perm for an LSH threshold just below `threshold`.
+
+    Two signatures become candidates with probability 1 - (1 - s^rows)^bands at
+    Jaccard similarity s; its steepest point is about (1 / bands) ** (1 / rows).
+    Erring low favours recall: candidates are verified on the full signature.
+    """
+    pairs = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    below = [p for p in pairs if (1.0 / p[0]) ** (1.0 / p[1]) <= threshold]
+    return max(below or pairs[-1:], key=lambda p: (1.0 / p[0]) ** (1.0 / p[1]))
+
+
+class MinHasher:
+    """MinHash signatures using multiply-shift hashing over 32-bit shingle hashes."""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self._a = rng.integers(1, 2 ** 63, num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+
+    def signature(self, hashes: List[int]) -> np.ndarray:
+        values = np.asarray(hashes, dtype=np.uint64)
+        # uint64 overflow wraps around, which is what multiply-shift relies on
+        with np.errstate(over='ignore'):
+            permuted = (self._a[:, None] * values[None, :] + self._b[:, None]) >> np.uint64(32)
+        return (permuted & _MAX_HASH).min(axis=1).astype(np.uint32)
+
+
+class NearDuplicateFilter:
+    """Streaming near-duplicate filter over chunk dicts ({'content', 'source', ...})."""
+
+    def __init__(self, threshold: float = 0.9, num_perm: int = 128, shingle_size: int = 5,
+                 id_fn: Optional[Callable[[Dict], str]] = None):
+        """Initialize the filter.
+
+        Args:
+            threshold: Estimated Jaccard similarity at which chunks count as duplicates.
+            num_perm: MinHash permutations (signature length).
+            shingle_size: Words per shingle.
+            id_fn: Maps a chunk to the id it is stored under (keys `aliases`);
+                defaults to its position in the stream.
+        """
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.hasher = MinHasher(num_perm)
+        self.bands, self.rows = choose_bands(num_perm, threshold)
+        self.id_fn = id_fn
+
+        self._buckets: List[Dict[bytes, List[int]]] = [defaultdict(list) for _ in range(self.bands)]
+        self._signatures: List[np.ndarray] = []
+        self._canonical_ids: List[str] = []
+        self._canonical_sources: List[str] = []
+        self._positions: Dict[str, int] = {}  # canonical id -> position
+        self._forgotten = set()  # positions of canonical chunks that were deleted
+
+        # Canonical chunk id -> sources of the near-duplicates dropped in its favour
+        self.aliases: Dict[str, List[str]] = defaultdict(list)
+        self.stats = {'chunks_in': 0, 'chunks_kept': 0, 'duplicates': 0, 'candidates_checked': 0,
+                      'dedup_time': 0.0}
+
+    def _find_duplicate(self, signature: np.ndarray, band_keys: List[bytes]) -> Optional[int]:
+        checked = set()
+        for band, key in enumerate(band_keys):
+            for candidate in self._buckets[band].get(key, ()):
+                if candidate in checked or candidate in self._forgotten:
+                    continue
+                checked.add(candidate)
+                self.stats['candidates_checked'] += 1
+                if np.mean(self._signatures[candidate] == signature) >= self.threshold:
+                    return candidate
+        return None
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def _keep(self, doc_id: str, source: str, signature: np.ndarray, band_keys: List[bytes]):
+        position = len(self._signatures)
+        self._signatures.append(signature)
+        self._canonical_ids.append(doc_id)
+        self._canonical_sources.append(source)
+        self._positions[doc_id] = position
+        for band, key in enumerate(band_keys):
+            self._buckets[band][key].append(position)
+
+    def canonical_id(self, doc: Dict) -> Optional[str]:
+        """Id of the kept chunk this one duplicates (recording its source as an alias),
+        or None if the chunk is kept as a new canonical one."""
+        start = time.perf_counter()
+        self.stats['chunks_in'] += 1
+
+        signature = self.hasher.signature(shingles(doc['content'], self.shingle_size))
+        band_keys = self._band_keys(signature)
+        match = self._find_duplicate(signature, band_keys)
+
+        canonical = None
+        if match is not None:
+            self.stats['duplicates'] += 1
+            canonical = self._canonical_ids[match]
+            self.add_aliases(canonical, [doc['source']])
+        else:
+            self._keep(self.id_fn(doc) if self.id_fn else str(len(self._signatures)), doc['source'],
+                       signature, band_keys)
+            self.stats['chunks_kept'] += 1
+
+        self.stats['dedup_time'] += time.perf_counter() - start
+        return canonical
+
+    def is_duplicate(self, doc: Dict) -> bool:
+        """Check one chunk; canonical chunks are remembered, duplicates become aliases."""
+        return self.canonical_id(doc) is not None
+
+    def add_aliases(self, canonical_id: str, sources: Iterable[str]):
+        """Record sources as aliases of a kept chunk (its own source and repeats are skipped)."""
+        own_source = self._canonical_sources[self._positions[canonical_id]] if canonical_id in self._positions else None
+        aliases = self.aliases[canonical_id]
+        for source in sources:
+            if source != own_source and source not in aliases:
+                aliases.append(source)
+
+    def remember(self, doc_id: str, content: str, source: str, aliases: Iterable[str] = ()):
+        """Add an already-stored chunk as canonical without checking it (seeds a filter with live chunks)."""
+        signature = self.hasher.signature(shingles(content, self.shingle_size))
+        self._keep(doc_id, source, signature, self._band_keys(signature))
+        if aliases:
+            self.add_aliases(doc_id, aliases)
+
+    def forget(self, doc_id: str) -> List[str]:
+        """Stop matching a deleted canonical chunk; returns the aliases it stood for."""
+        position = self._positions.pop(doc_id, None)
+        if position is not None:
+            self._forgotten.add(position)
+        return self.aliases.pop(doc_id, [])
+
+    def drop_alias(self, source: str) -> List[str]:
+        """Remove a source from every alias list; returns the canonical ids that listed it."""
+        changed = []
+        for canonical_id, aliases in self.aliases.items():
+            if source in aliases:
+                aliases.remove(source)
+                changed.append(canonical_id)
+        return changed
+
+    def filter(self, documents: Iterable[Dict]) -> Iterator[Dict]:
+        """Yield only canonical chunks, in order."""
+        for doc in documents:
+            if not self.is_duplicate(doc):
+                yield doc
+
+    def get_stats(self) -> Dict:
+        """Return dedup counters, the share of chunks removed and time spent."""
+        stats = dict(self.stats)
+        stats['removed_ratio'] = stats['duplicates'] / stats['chunks_in'] if stats['chunks_in'] else 0.0
+        stats['bands'], stats['rows'] = self.bands, self.rows
+        return stats
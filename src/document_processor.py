@@ -4,19 +4,38 @@ Supports: Markdown, PDF, TXT, and web pages.
 """
 
 import os
-from typing import List, Dict
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Iterable, Iterator, Tuple
 from pathlib import Path
 import requests
 from bs4 import BeautifulSoup
 from pypdf import PdfReader
 import markdown
 
+from .text_extraction import markdown_to_text, html_to_text
+
+# Pages per process-pool task when extracting PDFs in parallel
+PDF_PAGES_PER_TASK = 8
+
+
+def _extract_pages(file_path: str, first: int, last: int) -> List[Tuple[int, str]]:
+    """Extract text for pages [first, last) of a PDF (runs in worker processes)."""
+    reader = PdfReader(file_path)
+    return [(number + 1, reader.pages[number].extract_text() or "") for number in range(first, last)]
+
 
 class DocumentProcessor:
     """Handles loading and processing of various document types."""
 
-    def __init__(self):
+    def __init__(self, fast_extraction: bool = True):
+        """Initialize the processor.
+
+        Args:
+            fast_extraction: Strip Markdown/HTML with the fast extractors in
+                text_extraction; False renders and parses with BeautifulSoup.
+        """
         self.documents = []
+        self.fast_extraction = fast_extraction
 
     def load_markdown(self, file_path: str) -> Dict[str, str]:
         """Load and parse markdown file."""
@@ -24,9 +43,12 @@ class DocumentProcessor:
             content = f.read()
 
         # Convert to plain text (removing markdown syntax for better embedding)
-        html = markdown.markdown(content)
-        soup = BeautifulSoup(html, 'html.parser')
-        text = soup.get_text()
+        if self.fast_extraction:
+            text = markdown_to_text(content)
+        else:
+            html = markdown.markdown(content)
+            soup = BeautifulSoup(html, 'html.parser')
+            text = soup.get_text()
 
         return {
             'content': text,
@@ -34,13 +56,9 @@ class DocumentProcessor:
             'type': 'markdown'
         }
 
-    def load_pdf(self, file_path: str) -> Dict[str, str]:
+    def load_pdf(self, file_path: str, workers: int = 1) -> Dict[str, str]:
         """Load and extract text from PDF."""
-        reader = PdfReader(file_path)
-        text = ""
-
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
+        text = "\n".join(page_text for _, page_text in self.iter_pdf_pages(file_path, workers))
 
         return {
             'content': text.strip(),
@@ -48,6 +66,37 @@ class DocumentProcessor:
             'type': 'pdf'
         }
 
+    def iter_pdf_pages(self, file_path: str, workers: int = 1) -> Iterator[Tuple[int, str]]:
+        """Yield (page number, text) in page order without holding the whole document.
+
+        With workers > 1, page ranges are extracted in a process pool; only a
+        few ranges are in flight at a time, so memory stays bounded.
+        """
+        page_count = len(PdfReader(file_path).pages)
+        if workers <= 1:
+            reader = PdfReader(file_path)
+            for number in range(page_count):
+                yield number + 1, reader.pages[number].extract_text() or ""
+            return
+
+        ranges = [(first, min(first + PDF_PAGES_PER_TASK, page_count))
+                  for first in range(0, page_count, PDF_PAGES_PER_TASK)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            in_flight = []
+            for first, last in ranges:
+                in_flight.append(pool.submit(_extract_pages, file_path, first, last))
+                if len(in_flight) >= 2 * workers:
+                    yield from in_flight.pop(0).result()
+            for future in in_flight:
+                yield from future.result()
+
+    def iter_pdf_chunks(self, file_path: str, chunk_size: int = 1000, overlap: int = 200,
+                        workers: int = 1) -> Iterator[Dict]:
+        """Stream chunks of a PDF, each tagged with the page it starts on."""
+        pages = self.iter_pdf_pages(file_path, workers)
+        for chunk, page in self.iter_chunks(pages, chunk_size, overlap):
+            yield {'content': chunk, 'source': file_path, 'type': 'pdf', 'page': page}
+
     def load_text(self, file_path: str) -> Dict[str, str]:
         """Load plain text file."""
         with open(file_path, 'r', encoding='utf-8') as f:
@@ -59,11 +108,24 @@ class DocumentProcessor:
             'type': 'text'
         }
 
-    def load_webpage(self, url: str) -> Dict[str, str]:
-        """Fetch and extract text from webpage."""
+    def load_webpage(self, url: str, allow_redirects: bool = True) -> Dict[str, str]:
+        """Fetch and extract text from webpage.
+
+        With allow_redirects=False a redirect is an error, so a page on a vetted
+        host cannot send the fetch on to another host.
+        """
         try:
-            response = requests.get(url, timeout=10)
+            response = requests.get(url, timeout=10, allow_redirects=allow_redirects)
             response.raise_for_status()
+            if response.is_redirect:
+                raise ValueError(f"redirected to {response.headers.get('location')}")
+
+            if self.fast_extraction:
+                return {
+                    'content': html_to_text(response.content),
+                    'source': url,
+                    'type': 'webpage'
+                }
 
             soup = BeautifulSoup(response.content, 'html.parser')
 
@@ -87,24 +149,32 @@ class DocumentProcessor:
             print(f"Error loading webpage {url}: {e}")
             return None
 
-    def load_directory(self, directory_path: str) -> List[Dict[str, str]]:
-        """Recursively load all supported files from a directory."""
+    def load_file(self, file_path: str) -> Optional[Dict[str, str]]:
+        """Load one file by extension (None for unsupported types)."""
+        suffix = Path(file_path).suffix.lower()
+        if suffix == '.md':
+            return self.load_markdown(file_path)
+        if suffix == '.pdf':
+            return self.load_pdf(file_path)
+        if suffix == '.txt':
+            return self.load_text(file_path)
+        return None
+
+    def load_directory(self, directory_path: str, include_pdfs: bool = True) -> List[Dict[str, str]]:
+        """Recursively load all supported files from a directory.
+
+        Pass include_pdfs=False to skip PDFs, e.g. to stream them with iter_pdf_chunks.
+        """
         documents = []
         directory = Path(directory_path)
 
         for file_path in directory.rglob('*'):
             if file_path.is_file():
-                suffix = file_path.suffix.lower()
-
+                if not include_pdfs and file_path.suffix.lower() == '.pdf':
+                    continue
                 try:
-                    if suffix == '.md':
-                        doc = self.load_markdown(str(file_path))
-                        documents.append(doc)
-                    elif suffix == '.pdf':
-                        doc = self.load_pdf(str(file_path))
-                        documents.append(doc)
-                    elif suffix == '.txt':
-                        doc = self.load_text(str(file_path))
+                    doc = self.load_file(str(file_path))
+                    if doc:
                         documents.append(doc)
                 except Exception as e:
                     print(f"Error processing {file_path}: {e}")
@@ -113,15 +183,42 @@ class DocumentProcessor:
 
     def chunk_text(self, text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
         """Split text into overlapping chunks for better retrieval."""
-        chunks = []
+        return [chunk for chunk, _ in self.iter_chunks([(None, text)], chunk_size, overlap)]
+
+    def iter_chunks(self, pieces: Iterable[Tuple[Optional[int], str]], chunk_size: int = 1000,
+                    overlap: int = 200) -> Iterator[Tuple[str, Optional[int]]]:
+        """Chunk a stream of (page, text) pieces, yielding (chunk, page of its first character).
+
+        Produces the same chunks as chunk_text over the pieces joined with
+        newlines, but only buffers about one chunk of text at a time.
+        """
+        buffer = ""
+        page_starts: List[Tuple[int, Optional[int]]] = []  # (offset in buffer, page)
         start = 0
+        pieces = iter(pieces)
+        exhausted = False
+
+        while True:
+            # Read ahead until a full chunk (plus one character) is buffered
+            while not exhausted and len(buffer) <= start + chunk_size:
+                piece = next(pieces, None)
+                if piece is None:
+                    exhausted = True
+                    break
+                page, text = piece
+                if page_starts:
+                    buffer += "\n"
+                page_starts.append((len(buffer), page))
+                buffer += text
+
+            if start >= len(buffer):
+                break
 
-        while start < len(text):
             end = start + chunk_size
-            chunk = text[start:end]
+            chunk = buffer[start:end]
 
             # Try to break at sentence boundary
-            if end < len(text):
+            if end < len(buffer):
                 last_period = chunk.rfind('.')
                 last_newline = chunk.rfind('\n')
                 break_point = max(last_period, last_newline)
@@ -130,7 +227,14 @@ class DocumentProcessor:
                     chunk = chunk[:break_point + 1]
                     end = start + break_point + 1
 
-            chunks.append(chunk.strip())
+            page = next((p for offset, p in reversed(page_starts) if offset <= start), None)
+            yield chunk.strip(), page
             start = end - overlap
 
-        return chunks
+            # Drop consumed text so memory stays bounded
+            if start > chunk_size:
+                buffer = buffer[start:]
+                page_starts = [(offset - start, p) for offset, p in page_starts]
+                first = max(i for i, (offset, _) in enumerate(page_starts) if offset <= 0)
+                page_starts = page_starts[first:]
+                start = 0
@@ -0,0 +1,185 @@
+"""
+FAQ fast path: an index of embedded FAQ questions mapped to canonical answers.
+Built at ingest time from Q/A-style sources (e.g. data/business_info/faq.txt) so
+that close matches can be answered directly, without retrieval or an LLM call.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from typing import List, Dict, Optional
+
+import numpy as np
+
+from .ann_index import ExactIndex
+
+# FAQ questions live in this collection, tagged with the chunk collection's version
+FAQ_COLLECTION = "helpdesk_faq"
+
+# "Q: question" followed by "A: answer" (answer runs until the next Q: or end of text)
+_QA_PATTERN = re.compile(r'^\s*Q:\s*(.+?)\s*\n\s*A:\s*(.+?)(?=\n\s*Q:|\Z)', re.MULTILINE | re.DOTALL)
+
+
+def parse_faq(text: str) -> List[Dict[str, str]]:
+    """Extract question/answer pairs from FAQ-style text."""
+    return [
+        {'question': ' '.join(q.split()), 'answer': a.strip()}
+        for q, a in _QA_PATTERN.findall(text)
+    ]
+
+
+def faq_collection_name(vector_store, collection_name: Optional[str] = None) -> str:
+    """FAQ collection built with a chunk collection version (the live one by default)."""
+    return FAQ_COLLECTION + vector_store.version_suffix(collection_name)
+
+
+def faq_entries(text: str, source: str) -> List[Dict[str, str]]:
+    """FAQ entries of one document; a single Q/A-looking pair is not an FAQ."""
+    pairs = parse_faq(text)
+    return [dict(pair, source=source) for pair in pairs] if len(pairs) >= 2 else []
+
+
+class FAQIndex:
+    """Matches user questions against FAQ questions by embedding similarity."""
+
+    TONE_TEMPLATES = [
+        "Great question! {answer}",
+        "Happy to help! {answer}",
+        "{answer}",
+    ]
+
+    def __init__(self, vector_store, collection_name: Optional[str] = None,
+                 threshold: float = 0.85, tone_wrapper: bool = True):
+        """Initialize the FAQ index.
+
+        Args:
+            vector_store: VectorStore providing the embedding model and ChromaDB client.
+            collection_name: ChromaDB collection holding the FAQ questions; defaults to
+                the one built with the live chunk collection.
+            threshold: Minimum cosine similarity for a direct answer.
+            tone_wrapper: Prefix answers with a short friendly phrase.
+        """
+        self.vector_store = vector_store
+        self.threshold = threshold
+        self.tone_wrapper = tone_wrapper
+        self.collection_name = collection_name or faq_collection_name(vector_store)
+        self.collection = vector_store.chroma_client.get_or_create_collection(name=self.collection_name)
+
+        self._index: Optional[ExactIndex] = None
+        self._entries: Dict[str, Dict[str, str]] = {}
+        self._load()
+
+        # Guards stats: matches run concurrently on the web app's worker threads
+        self._lock = threading.Lock()
+        self.stats = {
+            'lookups': 0,
+            'hits': 0,
+            'lookup_time': 0.0,
+            'latency_saved': 0.0,
+        }
+        self.last_latency = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _load(self):
+        """Load all FAQ questions into an in-memory matrix for microsecond matching."""
+        stored = self.collection.get(include=['embeddings', 'documents', 'metadatas'])
+        entries = {
+            doc_id: {'question': question, 'answer': metadata['answer'], 'source': metadata['source']}
+            for doc_id, question, metadata in zip(stored['ids'], stored['documents'], stored['metadatas'])
+        }
+        index = None
+        if entries:
+            embeddings = np.asarray(stored['embeddings'], dtype=np.float32)
+            index = ExactIndex(embeddings.shape[1])
+            index.add(list(stored['ids']), embeddings)
+        # Built aside, then swapped in for matches running on other threads
+        self._entries, self._index = entries, index
+
+    def _add(self, entries: List[Dict[str, str]]):
+        # Ids are content hashes, so an id always names the same question and answer
+        by_id = {
+            hashlib.md5(f"{e['source']}\n{e['question']}\n{e['answer']}".encode()).hexdigest(): e
+            for e in entries
+        }
+        if not by_id:
+            return
+        questions = [e['question'] for e in by_id.values()]
+        embeddings = self.vector_store.encode(questions)
+        self.vector_store.add_embedded(
+            self.collection,
+            ids=[f"faq-{doc_id}" for doc_id in by_id],
+            embeddings=embeddings,
+            documents=questions,
+            metadatas=[{'answer': e['answer'], 'source': e['source']} for e in by_id.values()]
+        )
+
+    def build(self, entries: List[Dict[str, str]]):
+        """Replace the index with new FAQ entries ({'question', 'answer', 'source'})."""
+        chroma_client = self.vector_store.chroma_client
+        chroma_client.delete_collection(name=self.collection_name)
+        self.collection = chroma_client.create_collection(name=self.collection_name)
+        self._add(entries)
+        self._load()
+
+    def use_version(self, chunk_collection: str):
+        """Switch to the FAQ questions built with another chunk collection (after a swap)."""
+        name = faq_collection_name(self.vector_store, chunk_collection)
+        collection = self.vector_store.chroma_client.get_or_create_collection(name=name)
+        self.collection_name, self.collection = name, collection
+        self._load()
+
+    def replace_source(self, source: str, text: Optional[str]):
+        """Re-parse the FAQ entries of one changed source (None removes them)."""
+        self.collection.delete(where={'source': source})
+        self._add(faq_entries(text, source) if text else [])
+        self._load()
+
+    def match(self, query: str) -> Optional[Dict]:
+        """Return the best FAQ entry (with 'score') if it clears the threshold."""
+        start = time.perf_counter()
+
+        result = None
+        if self._index is not None:
+            embedding = self.vector_store.encode_queries([query])
+            hits = self._index.search(embedding, 1)[0]
+            if hits:
+                doc_id, distance = hits[0]
+                # Embeddings are normalized, so squared L2 = 2 - 2 * cosine
+                score = 1.0 - distance / 2.0
+                entry = self._entries.get(doc_id)  # None if replace_source() just reloaded
+                if score >= self.threshold and entry is not None:
+                    result = dict(entry, score=score)
+
+        self.last_latency = time.perf_counter() - start
+        with self._lock:
+            self.stats['lookups'] += 1
+            if result is not None:
+                self.stats['hits'] += 1
+            self.stats['lookup_time'] += self.last_latency
+        return result
+
+    def format_answer(self, entry: Dict) -> str:
+        """Return the canonical answer, optionally wrapped in a friendly template."""
+        if not self.tone_wrapper:
+            return entry['answer']
+        with self._lock:
+            hits = self.stats['hits']
+        template = self.TONE_TEMPLATES[hits % len(self.TONE_TEMPLATES)]
+        return template.format(answer=entry['answer'])
+
+    def record_saving(self, seconds: float):
+        """Record how much latency a direct answer saved versus a full RAG + LLM turn."""
+        with self._lock:
+            self.stats['latency_saved'] += max(seconds, 0.0)
+
+    def get_stats(self) -> Dict:
+        """Return hit rate and latency figures."""
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats['lookups']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['avg_lookup_ms'] = stats['lookup_time'] / lookups * 1000 if lookups else 0.0
+        return stats
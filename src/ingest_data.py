@@ -3,36 +3,54 @@ Script to ingest all documents from the data directory into the vector store.
 Run this once to set up the knowledge base, or whenever you update documents.
 """
 
+import itertools
 import os
 import sys
+from pathlib import Path
 from dotenv import load_dotenv
 
 # Add parent directory to Python path so imports work when run directly
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
+from src.crawler import Crawler
+from src.dedup import NearDuplicateFilter
 from src.document_processor import DocumentProcessor
+from src.faq_index import FAQIndex, faq_collection_name, faq_entries
+from src.product_catalog import ProductCatalog, catalog_path
 from src.vector_store import VectorStore
 
 
-def main():
-    """Ingest all documents from data directory."""
-    print("=" * 50)
-    print("FluffyAI Helpdesk - Document Ingestion")
-    print("=" * 50)
+# Chunker settings (also recorded in exported snapshots)
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 150
 
-    # Initialize components (no API key needed for local embeddings!)
-    processor = DocumentProcessor()
-    vector_store = VectorStore()
+# Processes used to extract PDF pages in parallel
+PDF_WORKERS = max(1, (os.cpu_count() or 1) // 2)
 
-    # Clear existing data (optional - comment out to append instead)
-    print("\nClearing existing vector store...")
-    vector_store.clear_collection()
 
-    # Load all documents from data directory
-    data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
+# Site crawl limits for data/business_info/crawl_seeds.txt
+CRAWL_MAX_PAGES = 2000
+CRAWL_MAX_DEPTH = 3
+CRAWL_CONCURRENCY = 8
+
+# Chunks at least this similar (estimated Jaccard over word 5-grams) are stored once
+DEDUP_THRESHOLD = 0.9
+
+# Queries a freshly built collection must answer before it goes live
+SMOKE_QUERIES = [
+    "What products do you sell?",
+    "What is your return policy?",
+]
+
+
+def load_documents(processor: DocumentProcessor, data_dir: str):
+    """Load documents from the data directory plus any URLs in urls.txt.
+
+    PDFs are skipped here; chunk_documents streams them page by page.
+    """
     print(f"\nLoading documents from: {data_dir}")
 
-    documents = processor.load_directory(data_dir)
+    documents = processor.load_directory(data_dir, include_pdfs=False)
     print(f"Loaded {len(documents)} documents")
 
     # Load URLs from urls.txt if it exists
@@ -42,39 +60,134 @@ def main():
         with open(urls_file, 'r', encoding='utf-8') as f:
             urls = [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
 
-        for url in urls:
-            print(f"  Fetching: {url}")
-            doc = processor.load_webpage(url)
-            if doc:
-                documents.append(doc)
-                print(f"    ✓ Loaded successfully")
-            else:
-                print(f"    ✗ Failed to load")
+        # Fetched concurrently; only the listed pages, no link following
+        crawler = Crawler(urls, max_pages=len(urls), max_depth=0, concurrency=CRAWL_CONCURRENCY)
+        pages = list(crawler.crawl())
+        documents.extend(pages)
 
-        print(f"Loaded {len(urls)} URLs")
+        print(f"Loaded {len(pages)} of {len(urls)} URLs")
     else:
         print(f"\nNo urls.txt found, skipping web page ingestion")
 
     print(f"\nTotal documents loaded: {len(documents)}")
-
-    # Chunk documents for better retrieval
-    chunked_docs = []
-    for doc in documents:
-        chunks = processor.chunk_text(doc['content'], chunk_size=800, overlap=150)
+    return documents
+
+
+def crawl_site(data_dir: str):
+    """Yield pages crawled from the seeds in crawl_seeds.txt (URLs ending in .xml are sitemaps)."""
+    seeds_file = os.path.join(data_dir, 'business_info', 'crawl_seeds.txt')
+    if not os.path.exists(seeds_file):
+        return
+
+    with open(seeds_file, 'r', encoding='utf-8') as f:
+        lines = [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+    sitemaps = [url for url in lines if url.lower().endswith('.xml')]
+    seeds = [url for url in lines if url not in sitemaps]
+
+    print(f"\nCrawling {len(seeds)} seed(s) and {len(sitemaps)} sitemap(s) from: {seeds_file}")
+    crawler = Crawler(seeds, sitemaps=sitemaps, max_pages=CRAWL_MAX_PAGES, max_depth=CRAWL_MAX_DEPTH,
+                      concurrency=CRAWL_CONCURRENCY)
+    yield from crawler.crawl()
+
+    stats = crawler.get_stats()
+    print(f"Crawled {stats['fetched']} pages ({stats['pages_per_second']:.1f}/s), "
+          f"{stats['yielded']} unique, {stats['duplicates']} duplicates, "
+          f"{stats['robots_blocked']} blocked by robots.txt")
+
+
+def build_side_indexes(vector_store: VectorStore, documents, collection_name: str):
+    """Build the FAQ fast-path index and the structured product catalog for a collection version.
+
+    Both are written under that version's tag, so the live ones are untouched
+    until the version is swapped in.
+    """
+    # Index FAQ-style question/answer pairs for the direct-answer fast path
+    entries = [entry for doc in documents for entry in faq_entries(doc['content'], doc['source'])]
+    FAQIndex(vector_store, collection_name=faq_collection_name(vector_store, collection_name)).build(entries)
+    print(f"Indexed {len(entries)} FAQ questions")
+
+    # Extract the structured product catalog from product markdown
+    markdown_files = [doc['source'] for doc in documents if doc['type'] == 'markdown']
+    catalog = ProductCatalog.from_markdown_files(markdown_files)
+    path = catalog_path(vector_store, collection_name)
+    catalog.save(path)
+    print(f"Extracted {len(catalog)} products into {path}")
+
+
+def chunk_documents(processor: DocumentProcessor, documents, data_dir: str, web_pages=()):
+    """Yield overlapping chunks for retrieval.
+
+    PDFs under data_dir are streamed page by page, and web_pages (e.g. a
+    running crawl) are chunked as they arrive.
+    """
+    for doc in itertools.chain(documents, web_pages):
+        chunks = processor.chunk_text(doc['content'], chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP)
         for chunk in chunks:
-            chunked_docs.append({
+            yield {
                 'content': chunk,
                 'source': doc['source'],
                 'type': doc['type']
-            })
+            }
+
+    for pdf_path in sorted(Path(data_dir).rglob('*.pdf')):
+        print(f"Streaming PDF: {pdf_path}")
+        try:
+            yield from processor.iter_pdf_chunks(str(pdf_path), chunk_size=CHUNK_SIZE,
+                                                 overlap=CHUNK_OVERLAP, workers=PDF_WORKERS)
+        except Exception as e:
+            print(f"Error processing {pdf_path}: {e}")
 
-    print(f"Created {len(chunked_docs)} chunks from documents")
 
-    # Add to vector store
-    print("\nGenerating embeddings locally (no API costs!)...")
-    vector_store.add_documents(chunked_docs)
+def reindex_knowledge_base(vector_store: VectorStore, data_dir: str) -> str:
+    """Rebuild the knowledge base into a new collection and swap it in.
+
+    Searches keep being served from the current collection until the new one
+    has been built and validated. Returns the name of the new live collection.
+    """
+    processor = DocumentProcessor()
+    # Ingest jobs and the data watcher wait, so their updates are not written to the old version
+    with vector_store.exclusive_writes():
+        documents = load_documents(processor, data_dir)
+        chunked_docs = chunk_documents(processor, documents, data_dir, web_pages=crawl_site(data_dir))
+
+        # Drop near-duplicate chunks (boilerplate, mirrored pages) before they are embedded
+        dedup = NearDuplicateFilter(threshold=DEDUP_THRESHOLD, id_fn=vector_store.chunk_id)
+
+        print("\nGenerating embeddings locally (no API costs!)...")
+        # Side indexes are built only once the new chunks validate, and go live with them
+        collection_name = vector_store.reindex(
+            dedup.filter(chunked_docs), smoke_queries=SMOKE_QUERIES,
+            before_swap=lambda name: build_side_indexes(vector_store, documents, name))
+        vector_store.set_aliases(dedup.aliases)
+
+    stats = dedup.get_stats()
+    print(f"Dedup: kept {stats['chunks_kept']} of {stats['chunks_in']} chunks "
+          f"({stats['removed_ratio']:.1%} smaller index) in {stats['dedup_time'] * 1000:.0f} ms")
+    return collection_name
+
+
+def main():
+    """Ingest all documents from data directory."""
+    print("=" * 50)
+    print("FluffyAI Helpdesk - Document Ingestion")
+    print("=" * 50)
+
+    # Optional profiling of the whole run: PROFILE_REQUESTS=1
+    if os.getenv('PROFILE_REQUESTS'):
+        from src import profiling
+
+        profiling.enable([(VectorStore, 'reindex'), (VectorStore, 'add_documents')], rate=1.0,
+                         directory=os.getenv('PROFILE_DIR', profiling.PROFILE_DIR))
+
+    # Initialize components (no API key needed for local embeddings!)
+    vector_store = VectorStore()
+    vector_store.use_bulk_threads()
+
+    # Build into a fresh collection; a running chatbot switches over once it's validated
+    data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
+    collection_name = reindex_knowledge_base(vector_store, data_dir)
 
-    print(f"\n✓ Successfully ingested documents!")
+    print(f"\n✓ Successfully ingested documents into {collection_name}!")
     print(f"Total chunks in database: {vector_store.get_collection_count()}")
     print("\nYou can now run the chatbot with: python src/main.py")
 
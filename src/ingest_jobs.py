@@ -0,0 +1,328 @@
+"""
+Background ingestion jobs inside the running server.
+Paths, directories, URLs or uploaded files are ingested by one low-priority
+worker thread that shares the server's VectorStore (and so its already-loaded
+embedding model). Between embedding batches the worker waits while user
+queries are running, so searches keep their latency. Each batch is searchable
+as soon as it commits, and jobs report progress and throughput while they run.
+Files must live under the data directory and URLs on allowlisted hosts; both
+are therefore part of the next full reindex too.
+"""
+
+import itertools
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Iterable, List, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from .data_watcher import SUPPORTED_SUFFIXES
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when it has been cancelled."""
+
+
+class IngestJob:
+    """One submitted ingest: its sources and live progress counters."""
+
+    def __init__(self, job_id: int, sources: List[str]):
+        self.id = job_id
+        self.sources = sources
+        self.status = QUEUED
+        self.current_source: Optional[str] = None
+        self.errors: List[str] = []
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancel = threading.Event()
+        self.stats = {
+            'files_total': 0,
+            'files_done': 0,
+            'chunks_seen': 0,
+            'chunks_added': 0,
+            'chunks_removed': 0,
+            'yield_time': 0.0,
+        }
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def progress(self) -> Dict:
+        """Status, counters, elapsed time and embedding throughput (chunks/s)."""
+        stats = dict(self.stats)
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        working = max(elapsed - stats['yield_time'], 1e-9)
+        stats.update(
+            id=self.id,
+            status=self.status,
+            current_source=self.current_source,
+            errors=list(self.errors),
+            elapsed=elapsed,
+            chunks_per_second=stats['chunks_added'] / working if elapsed else 0.0,
+        )
+        return stats
+
+
+class IngestJobs:
+    """Queue of ingest jobs run one at a time on a low-priority background thread."""
+
+    def __init__(self, vector_store, data_dir: str, processor=None, chunk_size: int = 800, overlap: int = 150,
+                 batch_size: Optional[int] = None, yield_grace: float = 0.05, max_yield: float = 2.0,
+                 nice: int = 10, keep_finished: int = 50, allowed_hosts: Iterable[str] = (),
+                 on_change: Optional[Callable[[str, Optional[Dict]], None]] = None):
+        """Initialize the job queue and start its worker.
+
+        Args:
+            vector_store: The server's VectorStore; its model embeds the new chunks.
+            data_dir: The knowledge base directory. File and directory sources must be
+                inside it (relative paths are taken from it), and ingested URLs are
+                added to its business_info/urls.txt, so a full reindex keeps both.
+            processor: DocumentProcessor used to parse files and pages (created if omitted).
+            chunk_size: Chunk size, matching ingestion.
+            overlap: Chunk overlap, matching ingestion.
+            batch_size: Chunks embedded per batch; smaller batches yield to queries sooner.
+            yield_grace: Seconds after the last user query before the next batch starts.
+            max_yield: Longest wait per batch, so ingestion still progresses under
+                constant traffic.
+            nice: Niceness added to the worker thread (Linux), so parsing and
+                chunking also give way to request threads.
+            keep_finished: Finished jobs kept for status queries.
+            allowed_hosts: Hosts URLs may be fetched from; URLs are refused if empty.
+            on_change: Called as on_change(source, document) after a file's or page's
+                chunks were replaced (document is None for PDFs), like the data
+                watcher's callback, so the FAQ fast path and product catalog follow.
+        """
+        if processor is None:
+            from .document_processor import DocumentProcessor
+
+            processor = DocumentProcessor()
+        self.vector_store = vector_store
+        self.data_dir = data_dir
+        self.urls_file = os.path.join(data_dir, 'business_info', 'urls.txt')
+        self.allowed_hosts = {host.strip().lower() for host in allowed_hosts if host.strip()}
+        self.processor = processor
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.batch_size = batch_size
+        self.yield_grace = yield_grace
+        self.max_yield = max_yield
+        self.nice = nice
+        self.keep_finished = keep_finished
+        self.on_change = on_change
+
+        self._jobs: "OrderedDict[int, IngestJob]" = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[IngestJob]]" = queue.Queue()
+        self._worker = threading.Thread(target=self._worker_loop, name="ingest-jobs", daemon=True)
+        self._worker.start()
+
+    # Job API ---------------------------------------------------------------
+
+    def _resolve(self, source: str) -> str:
+        """Validate a source; paths come back in the form ingestion and the data watcher store."""
+        if source.startswith(('http://', 'https://')):
+            host = (urlparse(source).hostname or '').lower()
+            if host not in self.allowed_hosts:
+                raise ValueError(f"{source}: host {host!r} is not in the allowed ingest hosts")
+            return source
+        root = os.path.realpath(self.data_dir)
+        path = os.path.realpath(os.path.join(self.data_dir, source))  # absolute paths stay as they are
+        if os.path.commonpath([root, path]) != root:
+            raise ValueError(f"{source}: only files under {self.data_dir} can be ingested")
+        relative = os.path.relpath(path, root)
+        return self.data_dir if relative == '.' else str(Path(self.data_dir) / relative)
+
+    def submit(self, sources: List[str]) -> IngestJob:
+        """Queue an ingest of file paths, directories and http(s) URLs; returns the job.
+
+        Raises ValueError, before anything is queued, for paths outside the data
+        directory and URLs on hosts that are not allowed.
+        """
+        sources = [self._resolve(source.strip()) for source in sources if source and source.strip()]
+        if not sources:
+            raise ValueError("Nothing to ingest")
+        with self._lock:
+            job = IngestJob(next(self._ids), sources)
+            self._jobs[job.id] = job
+            finished = [j for j in self._jobs.values() if j.status in (DONE, FAILED, CANCELLED)]
+            for old in finished[:max(0, len(finished) - self.keep_finished)]:
+                del self._jobs[old.id]
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id: int) -> Optional[IngestJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> List[IngestJob]:
+        """All known jobs, oldest first."""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancel a queued or running job; a running one stops after its current batch."""
+        job = self.get(job_id)
+        if job is None or job.status not in (QUEUED, RUNNING):
+            return False
+        job.cancel()
+        if job.status == QUEUED:
+            job.status = CANCELLED
+        return True
+
+    def stop(self):
+        """Stop the worker after the current job."""
+        self._queue.put(None)
+        self._worker.join()
+
+    # Worker ------------------------------------------------------------------
+
+    def _lower_priority(self):
+        """Raise this thread's niceness (Linux schedules threads individually)."""
+        if not self.nice or not hasattr(os, 'setpriority') or not hasattr(threading, 'get_native_id'):
+            return
+        try:
+            tid = threading.get_native_id()
+            os.setpriority(os.PRIO_PROCESS, tid, os.getpriority(os.PRIO_PROCESS, tid) + self.nice)
+        except OSError:
+            pass
+
+    def _worker_loop(self):
+        self._lower_priority()
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            if job.cancelled:
+                job.status = CANCELLED
+                continue
+            self.run(job)
+
+    def _expand(self, source: str) -> List[str]:
+        """Files under a directory; files and URLs as given."""
+        if os.path.isdir(source):
+            return sorted(str(path) for path in Path(source).rglob('*')
+                          if path.is_file() and path.suffix.lower() in SUPPORTED_SUFFIXES)
+        return [source]
+
+    def _chunks(self, source: str) -> Tuple[Optional[Dict], List[Dict]]:
+        """Parse and chunk one file or URL: (parsed document or None for PDFs, chunks to store)."""
+        if source.startswith(('http://', 'https://')):
+            doc = self.processor.load_webpage(source, allow_redirects=False)
+            if doc is None:
+                raise RuntimeError("page could not be fetched")
+        elif not os.path.isfile(source):
+            raise FileNotFoundError(source)
+        elif source.lower().endswith('.pdf'):
+            return None, list(self.processor.iter_pdf_chunks(source, chunk_size=self.chunk_size,
+                                                             overlap=self.overlap))
+        else:
+            doc = self.processor.load_file(source)
+            if doc is None:
+                raise ValueError(f"unsupported file type: {Path(source).suffix}")
+        return doc, [
+            {'content': chunk, 'source': doc['source'], 'type': doc['type']}
+            for chunk in self.processor.chunk_text(doc['content'], chunk_size=self.chunk_size, overlap=self.overlap)
+        ]
+
+    def _yield_to_queries(self, job: IngestJob):
+        """Wait (up to max_yield) while user queries are using the model."""
+        busy = getattr(self.vector_store, 'busy', None)
+        if busy is None:
+            return
+        start = time.monotonic()
+        while busy(self.yield_grace) and time.monotonic() - start < self.max_yield and not job.cancelled:
+            time.sleep(self.yield_grace / 2)
+        job.stats['yield_time'] += time.monotonic() - start
+
+    def _remember_url(self, url: str):
+        """List an ingested URL in urls.txt, which a full reindex fetches again."""
+        listed = set()
+        if os.path.exists(self.urls_file):
+            with open(self.urls_file, 'r', encoding='utf-8') as f:
+                listed = {line.strip() for line in f}
+        if url in listed:
+            return
+        os.makedirs(os.path.dirname(self.urls_file), exist_ok=True)
+        with open(self.urls_file, 'a', encoding='utf-8') as f:
+            f.write(f"{url}\n")
+
+    def _notify(self, job: IngestJob, path: str, doc: Optional[Dict]):
+        """Pass a committed source on to on_change; its failures do not undo the chunks."""
+        try:
+            self.on_change(path, doc)
+        except Exception as e:
+            job.errors.append(f"{path}: updating side indexes: {e}")
+            print(f"⚠ Ingest job {job.id} could not update side indexes for {path}: {e}")
+
+    def _after_batch(self, job: IngestJob, count: int):
+        job.stats['chunks_added'] += count
+        if job.cancelled:
+            raise JobCancelled()
+        self._yield_to_queries(job)
+
+    def run(self, job: IngestJob):
+        """Run one job on the calling thread (the worker calls this for queued jobs)."""
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            files = [path for source in job.sources for path in self._expand(source)]
+            job.stats['files_total'] = len(files)
+            for path in files:
+                if job.cancelled:
+                    raise JobCancelled()
+                job.current_source = path
+                added_before = job.stats['chunks_added']
+                try:
+                    doc, documents = self._chunks(path)
+                    if path.startswith(('http://', 'https://')):
+                        # Listed before writing, so a reindex starting meanwhile fetches it too
+                        self._remember_url(path)
+                    job.stats['chunks_seen'] += len(documents)
+                    self._yield_to_queries(job)
+                    counts = self.vector_store.replace_source(path, documents, batch_size=self.batch_size,
+                                                              on_batch=lambda n: self._after_batch(job, n),
+                                                              persist=False)
+                    job.stats['chunks_removed'] += counts['removed']
+                    if self.on_change is not None:
+                        self._notify(job, path, doc)
+                except JobCancelled:
+                    # replace_source rolled this file back to its previous chunks
+                    job.stats['chunks_added'] = added_before
+                    raise
+                except Exception as e:
+                    job.stats['chunks_added'] = added_before
+                    job.errors.append(f"{path}: {e}")
+                    print(f"⚠ Ingest job {job.id} could not ingest {path}: {e}")
+                job.stats['files_done'] += 1
+            job.status = FAILED if files and len(job.errors) == len(files) else DONE
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.errors.append(str(e))
+            job.status = FAILED
+        finally:
+            job.current_source = None
+            # The index is saved once per job rather than once per file
+            if job.stats['chunks_added'] or job.stats['chunks_removed']:
+                try:
+                    self.vector_store.save_index()
+                except Exception as e:
+                    job.errors.append(f"saving the vector index: {e}")
+            job.finished_at = time.time()
+
+        progress = job.progress()
+        print(f"Ingest job {job.id} {job.status}: {progress['files_done']}/{progress['files_total']} files, "
+              f"+{progress['chunks_added']} / -{progress['chunks_removed']} chunks "
+              f"({progress['chunks_per_second']:.1f} chunks/s, {progress['yield_time']:.1f}s yielded to queries)")
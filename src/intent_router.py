@@ -0,0 +1,188 @@
+"""
+Local intent routing in front of the RAG pipeline.
+Each message is embedded once with the vector store's model and compared with
+a handful of intent centroids (mean embeddings of example phrases). Greetings,
+thanks, goodbyes and small talk are answered from templates, off-topic requests
+are politely declined, and only support questions go on to retrieval and the LLM.
+"""
+
+import re
+import threading
+import time
+from typing import List, Dict, Optional
+
+import numpy as np
+
+SUPPORT = 'support'
+
+# Example phrases per intent; each intent's centroid is the mean of their embeddings
+INTENT_EXAMPLES: Dict[str, List[str]] = {
+    'greeting': [
+        "hi", "hello", "hey there", "good morning", "good afternoon", "good evening",
+        "hi, anyone there?", "hello, is this the helpdesk?", "howdy", "yo",
+    ],
+    'thanks': [
+        "thanks", "thank you", "thanks a lot", "thank you so much", "cheers",
+        "great, thanks for the help", "perfect, thank you", "appreciate it", "that helped, thanks",
+    ],
+    'goodbye': [
+        "bye", "goodbye", "see you", "see you later", "have a nice day", "that's all, bye",
+        "talk to you later", "I'm done, thanks bye",
+    ],
+    'small_talk': [
+        "how are you?", "who are you?", "are you a bot?", "are you human?", "what's your name?",
+        "tell me a joke", "what can you do?", "you're funny", "nice to meet you", "lol",
+    ],
+    'off_topic': [
+        "what's the weather like today?", "who won the football game last night?",
+        "write me a python script", "what is the capital of France?", "give me a recipe for pasta",
+        "what do you think about the election?", "solve this math equation", "recommend a good movie",
+        "what's the stock price of Apple?", "translate this sentence into Spanish",
+    ],
+    SUPPORT: [
+        "where is my order?", "how long does shipping take?", "can I return my plush toy?",
+        "how long does the battery last?", "how much does Buddy Bear cost?", "my toy won't turn on",
+        "how do I connect the toy to wifi?", "what languages does it speak?", "do you ship internationally?",
+        "is it safe for a three year old?", "how do I wash it?", "what's the warranty?",
+        "which toy is best for learning?", "I want a refund", "how do I update the firmware?",
+    ],
+}
+
+REPLY_TEMPLATES: Dict[str, List[str]] = {
+    'greeting': [
+        "Hi there! 🧸 I'm the FluffyAI helpdesk. What can I help you with today?",
+        "Hello! Ask me anything about our AI plush toys, orders, shipping or returns.",
+    ],
+    'thanks': [
+        "You're very welcome! Anything else I can help with?",
+        "Happy to help! Let me know if anything else comes up.",
+    ],
+    'goodbye': [
+        "Thanks for chatting! Have a fluffy day! 🧸",
+        "Goodbye! Come back any time you have a question.",
+    ],
+    'small_talk': [
+        "I'm FluffyAI's helpdesk assistant, here to answer questions about our plush toys, orders and policies. What would you like to know?",
+        "I'm doing great, thanks for asking! Is there anything about FluffyAI products I can help with?",
+    ],
+    'off_topic': [
+        "I'm afraid that's outside what I can help with. I can answer questions about FluffyAI products, orders, shipping and returns.",
+        "Sorry, I can only help with FluffyAI topics, like our plush toys, orders and policies. Is there anything along those lines I can do for you?",
+    ],
+}
+
+# Exact messages answered without embedding at all
+_EXACT = {
+    'hi': 'greeting', 'hello': 'greeting', 'hey': 'greeting',
+    'thanks': 'thanks', 'thank you': 'thanks', 'thx': 'thanks', 'ty': 'thanks',
+    'bye': 'goodbye', 'goodbye': 'goodbye',
+}
+_PUNCTUATION = re.compile(r'[^\w\s]')
+
+
+class IntentRouter:
+    """Nearest-centroid intent classifier over the retrieval embedding model."""
+
+    def __init__(self, encoder, threshold: float = 0.6, margin: float = 0.05,
+                 max_words: int = 12, examples: Optional[Dict[str, List[str]]] = None):
+        """Initialize the router.
+
+        Args:
+            encoder: Object with `encode(texts) -> normalized float32 matrix`, usually
+                the VectorStore, so no second model is loaded.
+            threshold: Minimum cosine similarity to a non-support centroid before a
+                message is answered locally.
+            margin: How much closer than the support centroid it must also be.
+            max_words: Longer messages always go to retrieval.
+            examples: Example phrases per intent; must include 'support'.
+        """
+        self.encoder = encoder
+        self.threshold = threshold
+        self.margin = margin
+        self.max_words = max_words
+
+        examples = examples or INTENT_EXAMPLES
+        self.intents = list(examples)
+        centroids = []
+        for intent in self.intents:
+            centroid = encoder.encode(examples[intent]).mean(axis=0)
+            centroids.append(centroid / np.linalg.norm(centroid))
+        self._centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self._support = self.intents.index(SUPPORT)
+        # The vector store's cached query path, so retrieval reuses the same embedding
+        self._encode_query = getattr(encoder, 'encode_queries', encoder.encode)
+
+        # Guards stats; turns are routed concurrently
+        self._lock = threading.Lock()
+        self.stats = {
+            'routed': 0,
+            'shortcuts': 0,
+            'intents': {intent: 0 for intent in self.intents},
+            'embed_time': 0.0,
+            'route_time': 0.0,
+            'latency_saved': 0.0,
+        }
+        self.last_latency = 0.0
+
+    def route(self, message: str) -> Dict:
+        """Classify a message.
+
+        Returns {'intent', 'score', 'reply', 'embedding', 'latency'}: reply is
+        None for support, and embedding is the query embedding (when one was
+        computed) so retrieval doesn't encode the message again.
+        """
+        start = time.perf_counter()
+        embedding: Optional[np.ndarray] = None
+        embed_time = route_time = 0.0
+
+        normalized = ' '.join(_PUNCTUATION.sub(' ', message.lower()).split())
+        intent, score = _EXACT.get(normalized), 1.0
+        if intent is None and len(normalized.split()) > self.max_words:
+            intent, score = SUPPORT, 0.0
+        elif intent is None:
+            embedding = self._encode_query([message])[0]
+            routed_at = time.perf_counter()
+            embed_time = routed_at - start
+
+            scores = self._centroids @ embedding
+            best = int(np.argmax(scores))
+            score = float(scores[best])
+            if best != self._support and score >= self.threshold and \
+                    score - scores[self._support] >= self.margin:
+                intent = self.intents[best]
+            else:
+                intent = SUPPORT
+            route_time = time.perf_counter() - routed_at
+
+        with self._lock:
+            self.stats['routed'] += 1
+            self.stats['embed_time'] += embed_time
+            self.stats['route_time'] += route_time
+            self.stats['intents'][intent] += 1
+            seen = self.stats['intents'][intent]
+            if intent != SUPPORT:
+                self.stats['shortcuts'] += 1
+        reply = None
+        if intent != SUPPORT:
+            templates = REPLY_TEMPLATES[intent]
+            reply = templates[seen % len(templates)]
+
+        latency = time.perf_counter() - start
+        self.last_latency = latency
+        return {'intent': intent, 'score': score, 'reply': reply, 'embedding': embedding, 'latency': latency}
+
+    def record_saving(self, seconds: float):
+        """Record how much latency a local reply saved versus a full RAG + LLM turn."""
+        with self._lock:
+            self.stats['latency_saved'] += max(seconds, 0.0)
+
+    def get_stats(self) -> Dict:
+        """Return per-intent counts, shortcut rate and routing latency."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['intents'] = dict(self.stats['intents'])
+        routed = stats['routed']
+        stats['shortcut_rate'] = stats['shortcuts'] / routed if routed else 0.0
+        stats['avg_route_ms'] = stats['route_time'] / routed * 1000 if routed else 0.0
+        stats['avg_embed_ms'] = stats['embed_time'] / routed * 1000 if routed else 0.0
+        return stats
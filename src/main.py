@@ -9,7 +9,8 @@ from dotenv import load_dotenv
 # Add parent directory to Python path so imports work when run directly
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from src.chatbot import HelpdeskChatbot
+from src import profiling
+from src.chatbot import HelpdeskChatbot, configure_chatbot
 from src.vector_store import VectorStore
 
 
@@ -21,9 +22,40 @@ def print_header():
     print("Welcome! I'm here to help with questions about our AI plush toys.")
     print("Type 'quit' or 'exit' to end the conversation.")
     print("Type 'reset' to start a new conversation.")
+    if profiling.enabled():
+        print("Type '/profile <question>' to profile one turn.")
     print("=" * 60 + "\n")
 
 
+def print_session_stats(chatbot):
+    """Print intent routing, prompt context reuse, FAQ, reranking and query rewriting counters for the session."""
+    if chatbot.intent_router is not None:
+        stats = chatbot.intent_router.get_stats()
+        counts = ", ".join(f"{intent}: {count}" for intent, count in stats['intents'].items() if count)
+        print(f"Intent routing: {stats['shortcuts']}/{stats['routed']} answered locally "
+              f"({counts or 'no messages'}), {stats['avg_route_ms']:.3f} ms avg routing")
+
+    stats = chatbot.context_cache.get_stats()
+    if stats['lookups']:
+        print(f"Prompt context: {stats['hits']}/{stats['lookups']} prompts reused a cached context prefix "
+              f"({stats['prefix_reuse_rate']:.0%}), {stats['bytes_saved'] / 1024:.1f} KiB of formatting skipped")
+
+    if chatbot.faq_index is not None:
+        stats = chatbot.faq_index.get_stats()
+        print(f"FAQ fast path: {stats['hits']}/{stats['lookups']} answered directly ({stats['hit_rate']:.0%}), "
+              f"{stats['latency_saved']:.1f} s latency saved")
+    if chatbot.reranker is not None:
+        stats = chatbot.reranker.get_stats()
+        print(f"Reranking: {stats['avg_latency_ms']:.1f} ms avg over {stats['queries']} queries, "
+              f"{stats['fallbacks']} cut short by the latency budget, "
+              f"{stats['cache_hits']} cached pair scores")
+    if chatbot.query_rewriter is not None:
+        stats = chatbot.query_rewriter.get_stats()
+        print(f"Query rewriting: {stats['rewritten']}/{stats['queries']} queries rewritten, "
+              f"{stats['llm_calls']} LLM calls, {stats['cache_hits']} cache hits, "
+              f"{stats['avg_latency_ms']:.1f} ms avg")
+
+
 def main():
     """Run the interactive chatbot."""
     # Load environment variables
@@ -49,7 +81,7 @@ def main():
 
     print(f"Loaded vector store with {doc_count} document chunks")
 
-    chatbot = HelpdeskChatbot(openai_api_key, vector_store)
+    chatbot = configure_chatbot(HelpdeskChatbot(openai_api_key, vector_store), vector_store)
 
     print_header()
 
@@ -65,6 +97,7 @@ def main():
             # Check for exit commands
             if user_input.lower() in ['quit', 'exit', 'bye', 'goodbye']:
                 print("\nChatbot: Thanks for chatting! Have a fluffy day! 🧸")
+                print_session_stats(chatbot)
                 break
 
             # Check for reset command
@@ -73,12 +106,17 @@ def main():
                 print("\n✓ Conversation reset. Starting fresh!\n")
                 continue
 
-            # Generate response
-            response = chatbot.chat(user_input)
+            # Generate response ('/profile <question>' profiles this turn)
+            if profiling.enabled() and user_input.startswith('/profile '):
+                with profiling.force():
+                    response = chatbot.chat(user_input[len('/profile '):].strip())
+            else:
+                response = chatbot.chat(user_input)
             print(f"\nChatbot: {response}\n")
 
         except KeyboardInterrupt:
             print("\n\nChatbot: Thanks for chatting! Have a fluffy day! 🧸")
+            print_session_stats(chatbot)
             break
         except Exception as e:
             print(f"\n⚠️  Error: {e}")
@@ -0,0 +1,302 @@
+"""
+Structured product catalog extracted from product markdown at ingest time.
+Answers attribute questions (price, ages, battery, ...) and comparisons from an
+in-memory table, and provides compact product rows to ground LLM answers.
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import List, Dict, Optional
+
+# Catalogs are saved per collection version (see catalog_path); this is where
+# catalogs built before versioning, or without a local vector store, live
+DEFAULT_CATALOG_PATH = "./product_catalog.json"
+CATALOG_FILENAME = "product_catalog.json"
+
+# Attribute -> words that signal a question about it
+ATTRIBUTE_KEYWORDS = {
+    'price': ['price', 'prices', 'priced', 'cost', 'costs', 'how much', 'expensive', 'cheap', 'cheaper',
+              'cheapest', '$'],
+    'ages': ['age', 'ages', 'year old', 'years old', 'year-old', 'old is', 'toddler', 'kids aged'],
+    'battery': ['battery', 'charge', 'charging', 'how long does it last', 'runtime'],
+    'features': ['feature', 'features', 'what can', 'what does', 'do?'],
+    'colors': ['color', 'colors', 'colour', 'colours'],
+    'height': ['height', 'tall', 'how big', 'size'],
+    'weight': ['weight', 'heavy', 'weigh'],
+    'materials': ['material', 'materials', 'made of', 'fabric'],
+    'connectivity': ['wifi', 'wi-fi', 'bluetooth', 'connectivity', 'connect'],
+    'rating': ['rating', 'reviews', 'rated', 'stars'],
+}
+
+ATTRIBUTE_LABELS = {
+    'price': "Price",
+    'ages': "Ages",
+    'battery': "Battery",
+    'features': "Features",
+    'colors': "Colors",
+    'height': "Height",
+    'weight': "Weight",
+    'materials': "Materials",
+    'connectivity': "Connectivity",
+    'rating': "Rating",
+}
+
+# Queries longer than this probably ask more than a single fact
+_MAX_DIRECT_ANSWER_WORDS = 14
+
+# Words that may surround product names and attribute keywords in a plain fact
+# question; anything else means the question asks more than the catalog knows
+_QUESTION_WORDS = {
+    'a', 'an', 'the', 'is', 'are', 'was', 'does', 'do', 'did', 'what', 'whats', 'which', 'how',
+    'of', 'for', 'to', 'in', 'on', 'and', 'or', 'vs', 'versus', 'between', 'compare', 'with',
+    'it', 'its', 's', 'they', 'their', 'there', 'me', 'my', 'i', 'please', 'tell', 'can', 'you',
+    'your', 'toy', 'toys', 'product', 'products', 'plush', 'plushie', 'plushies', 'all', 'each',
+    'every', 'best', 'good', 'great', 'suitable', 'fit', 'right', 'kid', 'kids', 'child',
+    'children', 'old', 'come', 'available', 'much', 'many', 'long', 'big', 'get', 'have', 'has',
+    'last', 'lasts', 'more', 'less', 'most',
+}
+
+
+def _keyword_pattern(words: List[str]) -> "re.Pattern":
+    """Match any keyword as whole words ("age" must not match "language" or "package")."""
+    alternatives = []
+    for word in sorted(words, key=len, reverse=True):
+        start = r'(?<![a-z0-9])' if word[0].isalnum() else ''
+        end = r'(?![a-z0-9])' if word[-1].isalnum() else ''
+        alternatives.append(start + re.escape(word) + end)
+    return re.compile('|'.join(alternatives))
+
+
+_ATTRIBUTE_PATTERNS = {attr: _keyword_pattern(words) for attr, words in ATTRIBUTE_KEYWORDS.items()}
+
+_SPEC_PATTERN = re.compile(r'^-\s*(Height|Weight|Materials|Battery|Connectivity|Colors):\s*(.+)$', re.MULTILINE)
+_FEATURE_PATTERN = re.compile(r'^-\s*\*\*(.+?)\*\*:\s*(.+)$', re.MULTILINE)
+_AGES_PATTERN = re.compile(r'\b(?:ages?|aged)\s+(\d+)\s*[-–]\s*(\d+)', re.IGNORECASE)
+_PRICE_PATTERN = re.compile(r'Price:\s*\$([\d,]+(?:\.\d{2})?)')
+_RATING_PATTERN = re.compile(r'\(([\d.]+)/5 stars from ([\d,]+) reviews\)')
+_AGE_QUERY_PATTERN = re.compile(r'\b(\d{1,2})[\s-]*(?:year|yr)s?[\s-]*old\b', re.IGNORECASE)
+
+
+def extract_product(markdown_text: str, source: str = "") -> Optional[Dict]:
+    """Extract a product record from product markdown (None if it isn't a product page)."""
+    price = _PRICE_PATTERN.search(markdown_text)
+    title = re.search(r'^#\s+(.+)$', markdown_text, re.MULTILINE)
+    if not price or not title:
+        return None
+
+    name, _, tagline = title.group(1).partition(' - ')
+    product = {
+        'name': name.strip(),
+        'tagline': tagline.strip(),
+        'price': float(price.group(1).replace(',', '')),
+        'source': source,
+        'features': [f"{label}: {desc.strip()}" for label, desc in _FEATURE_PATTERN.findall(markdown_text)],
+    }
+
+    for key, value in _SPEC_PATTERN.findall(markdown_text):
+        product[key.lower()] = value.strip()
+    if 'colors' in product:
+        product['colors'] = [c.strip() for c in product['colors'].split(',')]
+
+    ages = _AGES_PATTERN.search(markdown_text)
+    if ages:
+        product['min_age'], product['max_age'] = int(ages.group(1)), int(ages.group(2))
+
+    rating = _RATING_PATTERN.search(markdown_text)
+    if rating:
+        product['rating'] = float(rating.group(1))
+        product['reviews'] = int(rating.group(2).replace(',', ''))
+
+    return product
+
+
+def catalog_path(vector_store, collection_name: Optional[str] = None) -> str:
+    """Catalog file of a chunk collection version (the live one by default)."""
+    side_index_path = getattr(vector_store, 'side_index_path', None)
+    if side_index_path is None:
+        return DEFAULT_CATALOG_PATH
+    return side_index_path(CATALOG_FILENAME, collection_name)
+
+
+def find_catalog(vector_store, collection_name: Optional[str] = None) -> Optional[str]:
+    """Existing catalog for a collection version, falling back to DEFAULT_CATALOG_PATH."""
+    for path in (catalog_path(vector_store, collection_name), DEFAULT_CATALOG_PATH):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+class ProductCatalog:
+    """In-memory product table with name/alias lookup and attribute answers."""
+
+    def __init__(self, products: Optional[List[Dict]] = None):
+        self.products: List[Dict] = []
+        self._by_alias: Dict[str, int] = {}
+        for product in products or []:
+            self.add(product)
+
+        self.path: Optional[str] = None  # file it was loaded from, rewritten by with_source()
+        self.stats = {'lookups': 0, 'direct_answers': 0, 'grounded': 0}
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def add(self, product: Dict):
+        """Add a product and index its full name and distinctive name words."""
+        idx = len(self.products)
+        self.products.append(product)
+        name = product['name'].lower()
+        self._by_alias[name] = idx
+        for word in name.split():
+            # "Buddy Bear" is also found by "buddy" and "bear"
+            self._by_alias.setdefault(word, idx)
+
+    # Persistence -------------------------------------------------------
+
+    @classmethod
+    def from_markdown_files(cls, paths: List[str]) -> "ProductCatalog":
+        """Build a catalog from markdown files, skipping non-product pages."""
+        catalog = cls()
+        for path in paths:
+            text = Path(path).read_text(encoding='utf-8')
+            product = extract_product(text, source=str(path))
+            if product:
+                catalog.add(product)
+        return catalog
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.products, f, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "ProductCatalog":
+        with open(path, 'r', encoding='utf-8') as f:
+            catalog = cls(json.load(f))
+        catalog.path = path
+        return catalog
+
+    def with_source(self, source: str, markdown_text: Optional[str]) -> "ProductCatalog":
+        """Copy of the catalog with one source's product re-extracted (None removes it).
+
+        The copy shares this catalog's stats and is saved to its path, so callers
+        swap it in where the old catalog was referenced.
+        """
+        products = [product for product in self.products if product.get('source') != source]
+        product = extract_product(markdown_text, source=source) if markdown_text else None
+        if product:
+            products.append(product)
+        catalog = ProductCatalog(products)
+        catalog.stats = self.stats
+        catalog.path = self.path
+        if catalog.path:
+            catalog.save(catalog.path)
+        return catalog
+
+    # Query understanding -----------------------------------------------
+
+    def find_products(self, query: str) -> List[Dict]:
+        """Products mentioned in the query, in order of first mention."""
+        found = []
+        for word in re.findall(r"[a-z]+", query.lower()):
+            idx = self._by_alias.get(word)
+            if idx is not None and self.products[idx] not in found:
+                found.append(self.products[idx])
+
+        if not found and re.search(r'\b(all|each|every|your|which|compare)\b.*\b(toys?|products?|plush(ies)?)\b',
+                                   query.lower()):
+            found = list(self.products)
+        return found
+
+    @staticmethod
+    def detect_attributes(query: str) -> List[str]:
+        """Attributes the query asks about (keywords matched as whole words)."""
+        lowered = query.lower()
+        return [attr for attr, pattern in _ATTRIBUTE_PATTERNS.items() if pattern.search(lowered)]
+
+    def is_plain_fact_question(self, query: str) -> bool:
+        """True if the query is only product names, attribute keywords and question words.
+
+        Anything else ("Does it charge wirelessly?", "Is it too expensive for a
+        gift?") goes to retrieval and the LLM instead of a canned answer.
+        """
+        lowered = _AGE_QUERY_PATTERN.sub(' ', query.lower())
+        for pattern in _ATTRIBUTE_PATTERNS.values():
+            lowered = pattern.sub(' ', lowered)
+        return all(word in self._by_alias or word in _QUESTION_WORDS for word in re.findall(r"[a-z]+", lowered))
+
+    def products_for_age(self, age: int) -> List[Dict]:
+        return [p for p in self.products if p.get('min_age', 0) <= age <= p.get('max_age', 99)]
+
+    # Answers -------------------------------------------------------------
+
+    @staticmethod
+    def format_attribute(product: Dict, attribute: str) -> Optional[str]:
+        if attribute == 'price':
+            return f"${product['price']:.2f}"
+        if attribute == 'ages':
+            return f"{product['min_age']}-{product['max_age']}" if 'min_age' in product else None
+        if attribute == 'features':
+            return "; ".join(product.get('features', [])) or None
+        if attribute == 'colors':
+            return ", ".join(product['colors']) if product.get('colors') else None
+        if attribute == 'rating':
+            return f"{product['rating']}/5 from {product['reviews']:,} reviews" if 'rating' in product else None
+        return product.get(attribute)
+
+    def format_row(self, product: Dict, attributes: Optional[List[str]] = None) -> str:
+        """Compact one-line description of a product for prompts."""
+        attributes = attributes or ['price', 'ages', 'battery', 'colors']
+        parts = [product['name']]
+        for attr in attributes:
+            value = self.format_attribute(product, attr)
+            if value:
+                parts.append(f"{ATTRIBUTE_LABELS[attr]}: {value}")
+        return " | ".join(parts)
+
+    def answer(self, query: str) -> Optional[str]:
+        """Directly answer simple attribute or comparison questions, else None."""
+        self.stats['lookups'] += 1
+        if len(query.split()) > _MAX_DIRECT_ANSWER_WORDS or not self.is_plain_fact_question(query):
+            return None
+
+        age_match = _AGE_QUERY_PATTERN.search(query)
+        products = self.find_products(query)
+        attributes = [a for a in self.detect_attributes(query) if a != 'features']
+
+        # "for a 6-year-old" without naming a specific toy
+        if age_match and len(products) != 1:
+            age = int(age_match.group(1))
+            suitable = self.products_for_age(age)
+            if not suitable:
+                return None
+            lines = [f"- {self.format_row(p, ['price', 'ages'])}" for p in suitable]
+            self.stats['direct_answers'] += 1
+            return f"For a {age}-year-old, these toys are a great fit:\n" + "\n".join(lines)
+
+        if not products or not attributes:
+            return None
+
+        if len(products) == 1 and len(attributes) == 1:
+            value = self.format_attribute(products[0], attributes[0])
+            if not value:
+                return None
+            self.stats['direct_answers'] += 1
+            return f"{products[0]['name']} — {ATTRIBUTE_LABELS[attributes[0]].lower()}: {value}."
+
+        lines = [f"- {self.format_row(p, attributes)}" for p in products]
+        self.stats['direct_answers'] += 1
+        return "Here's how they compare:\n" + "\n".join(lines)
+
+    def context_rows(self, query: str) -> List[str]:
+        """Rows for the products a query mentions, to ground the LLM."""
+        products = self.find_products(query)
+        if not products:
+            return []
+        attributes = self.detect_attributes(query) or ['price', 'ages', 'battery']
+        self.stats['grounded'] += 1
+        return [self.format_row(p, attributes) for p in products]
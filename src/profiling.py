@@ -0,0 +1,214 @@
+"""
+Opt-in per-request profiling.
+`enable()` wraps selected methods (chat turns, searches, ingest batches) so
+that a sample of calls -- or calls inside `force()`, e.g. for requests sent with
+an `X-Profile: 1` header -- run under a stack-sampling profiler and tracemalloc.
+Each profiled call writes a speedscope file, a collapsed-stack file for
+flamegraph.pl, and a top-allocations report. Nothing is wrapped unless
+`enable()` is called, so disabled profiling costs nothing.
+"""
+
+import contextvars
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+from typing import List, Dict, Optional, Tuple
+
+PROFILE_DIR = "./profiles"
+
+Frame = Tuple[str, str, int]  # (function, file, first line)
+
+# Set while a profiled call is running in this context, so nested calls aren't profiled twice
+_active = contextvars.ContextVar('profiling_active', default=False)
+# Set by `force()` to profile calls regardless of the sample rate
+_forced = contextvars.ContextVar('profiling_forced', default=False)
+
+_originals: Dict[Tuple[type, str], object] = {}
+_counter = itertools.count(1)
+_config = {'rate': 0.0, 'interval': 0.001, 'directory': PROFILE_DIR, 'trace_memory': True}
+
+
+class SamplingProfiler:
+    """Samples one thread's Python stack at a fixed interval from a background thread."""
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.samples: Counter = Counter()  # stack (root first) -> seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.duration = 0.0
+
+    def start(self, thread_id: Optional[int] = None):
+        target = thread_id or threading.get_ident()
+        self._stop.clear()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, args=(target,), daemon=True, name="profiler")
+        self._thread.start()
+
+    def _run(self, target: int):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(target)
+            now = time.perf_counter()
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            # Weight each sample by the real time since the previous one
+            self.samples[tuple(reversed(stack))] += now - last
+            last = now
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self._started
+        return self.samples
+
+
+def write_speedscope(path: str, name: str, samples: Counter):
+    """Write samples in speedscope's 'sampled' file format (https://www.speedscope.app)."""
+    frames: List[Frame] = []
+    frame_index: Dict[Frame, int] = {}
+    stacks, weights = [], []
+    for stack, seconds in samples.items():
+        indexes = []
+        for frame in stack:
+            if frame not in frame_index:
+                frame_index[frame] = len(frames)
+                frames.append(frame)
+            indexes.append(frame_index[frame])
+        stacks.append(indexes)
+        weights.append(seconds * 1000)
+
+    document = {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'shared': {'frames': [{'name': f, 'file': file, 'line': line} for f, file, line in frames]},
+        'profiles': [{
+            'type': 'sampled',
+            'name': name,
+            'unit': 'milliseconds',
+            'startValue': 0,
+            'endValue': sum(weights),
+            'samples': stacks,
+            'weights': weights,
+        }],
+        'name': name,
+        'exporter': 'fluffyai-helpdesk',
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f)
+
+
+def write_collapsed(path: str, samples: Counter):
+    """Write 'frame;frame;frame microseconds' lines for flamegraph.pl / inferno."""
+    with open(path, 'w', encoding='utf-8') as f:
+        for stack, seconds in samples.most_common():
+            names = ';'.join(f"{name} ({os.path.basename(file)}:{line})" for name, file, line in stack)
+            f.write(f"{names} {max(1, round(seconds * 1e6))}\n")
+
+
+def write_allocations(path: str, snapshot: tracemalloc.Snapshot, top: int = 25):
+    """Write the lines that allocated the most memory still live at the end of the call."""
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ])
+    stats = snapshot.statistics('lineno')
+    with open(path, 'w', encoding='utf-8') as f:
+        total = sum(stat.size for stat in stats)
+        f.write(f"Live allocations traced during the call: {total / 1024:.1f} KiB in {len(stats)} lines\n")
+        f.write("(tracemalloc is process-wide; concurrent requests are included)\n\n")
+        for stat in stats[:top]:
+            frame = stat.traceback[0]
+            f.write(f"{stat.size / 1024:10.1f} KiB {stat.count:8d} blocks  {frame.filename}:{frame.lineno}\n")
+
+
+def _record(name: str, fn, args, kwargs):
+    """Run one call under the profiler and write its reports."""
+    directory = _config['directory']
+    os.makedirs(directory, exist_ok=True)
+    stem = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_counter)}-{name}")
+
+    started_tracing = False
+    if _config['trace_memory'] and not tracemalloc.is_tracing():
+        tracemalloc.start(10)
+        started_tracing = True
+    profiler = SamplingProfiler(_config['interval'])
+    profiler.start()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        samples = profiler.stop()
+        write_speedscope(f"{stem}.speedscope.json", name, samples)
+        write_collapsed(f"{stem}.collapsed.txt", samples)
+        if tracemalloc.is_tracing():
+            write_allocations(f"{stem}.alloc.txt", tracemalloc.take_snapshot())
+            if started_tracing:
+                tracemalloc.stop()
+        print(f"Profiled {name} ({profiler.duration * 1000:.1f} ms) -> {stem}.*")
+
+
+def _wrap(name: str, fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if _active.get() or not (_forced.get() or random.random() < _config['rate']):
+            return fn(*args, **kwargs)
+        token = _active.set(True)
+        try:
+            return _record(name, fn, args, kwargs)
+        finally:
+            _active.reset(token)
+    return wrapper
+
+
+def enable(targets: List[Tuple[type, str]], rate: float = 0.0, interval: float = 0.001,
+           directory: str = PROFILE_DIR, trace_memory: bool = True):
+    """Wrap `cls.method` for each target so sampled or forced calls are profiled.
+
+    Args:
+        targets: (class, method name) pairs; missing methods are skipped.
+        rate: Fraction of calls profiled (0 profiles only calls inside `force()`).
+        interval: Seconds between stack samples.
+        directory: Where profile files are written.
+        trace_memory: Also record top allocations with tracemalloc (slower).
+    """
+    _config.update(rate=rate, interval=interval, directory=directory, trace_memory=trace_memory)
+    for cls, method in targets:
+        if (cls, method) in _originals or not hasattr(cls, method):
+            continue
+        original = getattr(cls, method)
+        _originals[(cls, method)] = original
+        setattr(cls, method, _wrap(f"{cls.__name__}.{method}", original))
+
+
+def disable():
+    """Restore every wrapped method."""
+    for (cls, method), original in _originals.items():
+        setattr(cls, method, original)
+    _originals.clear()
+
+
+def enabled() -> bool:
+    return bool(_originals)
+
+
+@contextmanager
+def force(on: bool = True):
+    """Profile wrapped calls made inside this block (e.g. for a request that asked for it)."""
+    token = _forced.set(on)
+    try:
+        yield
+    finally:
+        _forced.reset(token)
@@ -0,0 +1,189 @@
+"""
+Append-only query log and startup cache prewarming.
+Each answered question is recorded as one compact JSON line (normalized query,
+embedding hash, retrieved chunk ids, stage latencies) by a background writer,
+so logging never blocks `chat`. On startup the most frequent logged queries
+are replayed in the background to warm the query embedding, retrieval result
+and reranker caches before real traffic needs them.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+from typing import List, Dict, Callable, Optional, Sequence
+
+import numpy as np
+
+DEFAULT_LOG_PATH = "./query_log.jsonl"
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a query, used as the cache and log key.
+
+    The default embedding model (all-MiniLM-L6-v2) is uncased, so queries
+    that normalize alike also embed alike.
+    """
+    return ' '.join(query.lower().split())
+
+
+def embedding_hash(embedding: np.ndarray) -> str:
+    """Short, stable fingerprint of a query embedding."""
+    return hashlib.blake2b(np.ascontiguousarray(embedding, dtype=np.float32).tobytes(), digest_size=8).hexdigest()
+
+
+class QueryLog:
+    """Buffered, append-only JSONL log of answered queries."""
+
+    def __init__(self, path: str = DEFAULT_LOG_PATH, flush_interval: float = 1.0, max_pending: int = 10000,
+                 embedding_lookup: Optional[Callable[[str], Optional[np.ndarray]]] = None):
+        """Initialize the log and start its writer thread.
+
+        Args:
+            path: JSONL file appended to.
+            flush_interval: Seconds between background writes.
+            max_pending: Records buffered before new ones are dropped (the log
+                never applies back-pressure to chat turns).
+            embedding_lookup: Returns the cached embedding of a normalized query,
+                if any; used to record embedding hashes without re-embedding.
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.embedding_lookup = embedding_lookup
+
+        self._pending: List[Dict] = []
+        self._pending_lock = threading.Lock()
+        self.stats = {'recorded': 0, 'written': 0, 'dropped': 0}
+
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._writer = threading.Thread(target=self._write_loop, name="query-log-writer", daemon=True)
+        self._writer.start()
+
+    def record(self, query: str, chunk_ids: Sequence[str] = (), timings: Optional[Dict[str, float]] = None,
+               route: Optional[str] = None):
+        """Queue one answered query; returns immediately."""
+        entry = {'t': round(time.time(), 3), 'q': query, 'c': list(chunk_ids),
+                 'ms': {stage: round(seconds * 1000, 2) for stage, seconds in (timings or {}).items()}}
+        if route is not None:
+            entry['r'] = route
+        with self._pending_lock:
+            if len(self._pending) >= self.max_pending:
+                self.stats['dropped'] += 1
+                return
+            self._pending.append(entry)
+            self.stats['recorded'] += 1
+
+    def flush(self):
+        """Write buffered records (normalizing and hashing them here, off the request path)."""
+        with self._pending_lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        lines = []
+        for entry in pending:
+            entry['q'] = normalize_query(entry['q'])
+            embedding = self.embedding_lookup(entry['q']) if self.embedding_lookup else None
+            if embedding is not None:
+                entry['e'] = embedding_hash(embedding)
+            lines.append(json.dumps(entry, ensure_ascii=False, separators=(',', ':')))
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+            self.stats['written'] += len(lines)
+        except OSError as e:
+            print(f"⚠ Failed to write {len(lines)} query log records: {e}")
+            self.stats['dropped'] += len(lines)
+
+    def close(self):
+        self._stopped.set()
+        self._wakeup.set()
+        self._writer.join(timeout=5)
+        self.flush()
+
+    def _write_loop(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+def top_queries(path: str = DEFAULT_LOG_PATH, n: int = 200, max_bytes: int = 32 * 1024 * 1024,
+                routes: Sequence[str] = ('support',)) -> List[str]:
+    """Most frequent normalized queries in the newest `max_bytes` of the log.
+
+    Only queries that went through retrieval (`routes`, or unrouted records)
+    are returned, since small talk doesn't warm anything useful.
+    """
+    if not os.path.exists(path):
+        return []
+    counts: Counter = Counter()
+    with open(path, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(0, size - max_bytes))
+        if size > max_bytes:
+            f.readline()  # skip the partial first line
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get('r', 'support') in routes and entry.get('q'):
+                counts[entry['q']] += 1
+    return [query for query, _ in counts.most_common(n)]
+
+
+class Prewarmer:
+    """Replays frequent queries through retrieval on a background thread."""
+
+    def __init__(self, chatbot, queries: List[str], pause: float = 0.005):
+        """Initialize the prewarmer.
+
+        Args:
+            chatbot: HelpdeskChatbot whose retrieval (vector store, reranker) is warmed.
+            queries: Queries to replay, most frequent first.
+            pause: Seconds to sleep between queries so live traffic keeps priority.
+        """
+        self.chatbot = chatbot
+        self.queries = queries
+        self.pause = pause
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {'queries': len(queries), 'warmed': 0, 'errors': 0, 'elapsed': 0.0}
+
+    def _run(self):
+        start = time.perf_counter()
+        for query in self.queries:
+            if self._stopped.is_set():
+                break
+            try:
+                # Same path as a chat turn: embedding, search and rerank caches all fill
+                self.chatbot._retrieve(query, top_k=self.chatbot.top_k)
+                self.stats['warmed'] += 1
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"⚠ Prewarm failed for {query!r}: {e}")
+            self._stopped.wait(self.pause)
+        self.stats['elapsed'] = time.perf_counter() - start
+        print(f"✓ Prewarmed {self.stats['warmed']}/{self.stats['queries']} frequent queries "
+              f"in {self.stats['elapsed']:.1f}s")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="prewarm", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def join(self, timeout: Optional[float] = None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats)
@@ -0,0 +1,180 @@
+"""
+Conversation-aware query rewriting for retrieval.
+Turns follow-up messages like "how much is it?" into standalone search queries.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Tuple
+
+
+class QueryRewriter:
+    """Builds a standalone retrieval query from the latest message and recent turns.
+
+    A cheap local heuristic runs first: if the message looks like a follow-up
+    (short, pronoun-heavy, "what about ..."), salient terms from the previous
+    user turns are folded into the query. Optionally, follow-ups can instead be
+    rewritten by a fast LLM call, with results cached by conversation tail.
+    """
+
+    FOLLOW_UP_WORDS = {
+        'it', 'its', 'it\'s', 'that', 'this', 'those', 'these', 'they', 'them',
+        'their', 'one', 'ones', 'he', 'she', 'him', 'her', 'same', 'also', 'too',
+    }
+
+    FOLLOW_UP_PREFIXES = ('and ', 'what about', 'how about', 'also ', 'or ', 'then ')
+
+    STOPWORDS = {
+        'a', 'an', 'the', 'is', 'are', 'was', 'were', 'be', 'do', 'does', 'did',
+        'i', 'me', 'my', 'we', 'our', 'you', 'your', 'to', 'of', 'in', 'on', 'for',
+        'and', 'or', 'but', 'with', 'about', 'what', 'how', 'which', 'who', 'when',
+        'where', 'why', 'can', 'could', 'would', 'should', 'will', 'have', 'has',
+        'much', 'many', 'tell', 'please', 'thanks', 'hi', 'hello', 'there', 'any',
+        'some', 'get', 'want', 'like', 'know', 'need', 'if', 'so', 'at', 'by',
+    } | FOLLOW_UP_WORDS
+
+    REWRITE_PROMPT = """Rewrite the customer's last message as a standalone search query for a helpdesk knowledge base.
+Resolve pronouns using the conversation. Reply with the query only, no explanation."""
+
+    def __init__(self, client=None, model: str = "moonshot-v1-8k", use_llm: bool = False,
+                 max_turns: int = 4, max_terms: int = 6, cache_size: int = 512):
+        """Initialize the rewriter.
+
+        Args:
+            client: OpenAI-compatible client used when use_llm is enabled.
+            model: Model name for LLM rewriting (pick a fast one).
+            use_llm: Rewrite follow-ups with an LLM call instead of the heuristic.
+            max_turns: Number of recent history messages considered.
+            max_terms: Maximum number of context terms folded into a query.
+            cache_size: Number of LLM rewrites kept in the LRU cache.
+        """
+        self.client = client
+        self.model = model
+        self.use_llm = use_llm and client is not None
+        self.max_turns = max_turns
+        self.max_terms = max_terms
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, ...], str]" = OrderedDict()
+        # Guards the cache and stats; rewrite() runs on concurrent chat turns
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'queries': 0,
+            'rewritten': 0,
+            'llm_calls': 0,
+            'cache_hits': 0,
+            'total_time': 0.0,
+        }
+        self.last_latency = 0.0
+
+    def _tokenize(self, text: str) -> List[str]:
+        return re.findall(r"[A-Za-z0-9$][A-Za-z0-9'$.-]*", text)
+
+    def is_follow_up(self, query: str) -> bool:
+        """Return True if the query probably depends on earlier turns."""
+        lowered = query.lower().strip()
+        if lowered.startswith(self.FOLLOW_UP_PREFIXES):
+            return True
+
+        words = [w.lower().strip(".'") for w in self._tokenize(query)]
+        if any(w in self.FOLLOW_UP_WORDS for w in words):
+            return True
+
+        # Very short messages with no content words ("price?", "and kids?")
+        content = [w for w in words if w not in self.STOPWORDS]
+        return len(words) <= 3 and len(content) <= 1
+
+    def _salient_terms(self, history: List[Dict[str, str]], query: str) -> List[str]:
+        """Pick content terms from recent user turns, most recent first."""
+        query_words = {w.lower() for w in self._tokenize(query)}
+        terms: List[str] = []
+        seen = set()
+
+        recent_user = [m['content'] for m in history[-self.max_turns:] if m.get('role') == 'user']
+        for message in reversed(recent_user):
+            for word in self._tokenize(message):
+                key = word.lower().strip(".'")
+                if len(key) < 3 or key in self.STOPWORDS or key in query_words or key in seen:
+                    continue
+                seen.add(key)
+                terms.append(word.strip(".'"))
+                if len(terms) >= self.max_terms:
+                    return terms
+
+        return terms
+
+    def _heuristic_rewrite(self, query: str, history: List[Dict[str, str]]) -> str:
+        terms = self._salient_terms(history, query)
+        if not terms:
+            return query
+        return f"{' '.join(terms)} {query}"
+
+    def _llm_rewrite(self, query: str, history: List[Dict[str, str]]) -> str:
+        tail = history[-self.max_turns:]
+        key = tuple(f"{m['role']}:{m['content']}" for m in tail) + (query,)
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.stats['cache_hits'] += 1
+                return cached
+
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in tail)
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": self.REWRITE_PROMPT},
+                    {"role": "user", "content": f"{transcript}\nuser: {query}"},
+                ],
+                temperature=0,
+                max_tokens=64,
+            )
+            rewritten = (response.choices[0].message.content or "").strip() or query
+        except Exception as e:
+            print(f"Query rewrite failed, using heuristic: {e}")
+            return self._heuristic_rewrite(query, history)
+
+        with self._lock:
+            self.stats['llm_calls'] += 1
+            self._cache[key] = rewritten
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return rewritten
+
+    def rewrite(self, query: str, history: List[Dict[str, str]]) -> str:
+        """Return a standalone retrieval query.
+
+        Args:
+            query: The latest user message.
+            history: Conversation turns *before* the latest message.
+        """
+        start = time.perf_counter()
+        rewritten = query
+        if history and self.is_follow_up(query):
+            if self.use_llm:
+                rewritten = self._llm_rewrite(query, history)
+            else:
+                rewritten = self._heuristic_rewrite(query, history)
+
+        latency = time.perf_counter() - start
+        with self._lock:
+            self.stats['queries'] += 1
+            if rewritten != query:
+                self.stats['rewritten'] += 1
+            self.stats['total_time'] += latency
+        self.last_latency = latency
+        return rewritten
+
+    def get_stats(self) -> Dict:
+        """Return rewrite counters, LLM cache hit rate and average latency."""
+        with self._lock:
+            stats = dict(self.stats)
+        stats['avg_latency_ms'] = (stats['total_time'] / stats['queries'] * 1000) if stats['queries'] else 0.0
+        lookups = stats['llm_calls'] + stats['cache_hits']
+        stats['cache_hit_rate'] = stats['cache_hits'] / lookups if lookups else 0.0
+        stats['rewrite_rate'] = stats['rewritten'] / stats['queries'] if stats['queries'] else 0.0
+        return stats
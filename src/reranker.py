@@ -0,0 +1,167 @@
+"""
+Cross-encoder reranking of retrieved chunks.
+Over-fetched candidates from the vector store are scored as (query, chunk) pairs
+in one batched forward pass, and only the best few are kept for the prompt.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Tuple
+
+
+class Reranker:
+    """Batched CPU cross-encoder reranker with a score cache and a latency budget.
+
+    If scoring all uncached candidates is expected to take longer than the
+    budget, only the top vector hits that fit are scored and the rest keep
+    their vector-search order. If scoring still runs past the budget, the
+    remaining batches are skipped and the candidates are returned in plain
+    vector order.
+    """
+
+    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+                 latency_budget: float = 0.15, cache_size: int = 20000, batch_size: int = 32,
+                 device: str = "cpu", model=None):
+        """Initialize the reranker.
+
+        Args:
+            model_name: sentence-transformers CrossEncoder model (~90MB for MiniLM-L-6).
+            latency_budget: Seconds allowed for reranking before falling back to vector order.
+            cache_size: Number of (query, chunk) scores kept in the LRU cache.
+            batch_size: Pairs per forward pass.
+            device: Torch device for the cross-encoder.
+            model: Already-loaded model with a CrossEncoder-style `predict`
+                  (skips loading model_name).
+        """
+        if model is None:
+            from sentence_transformers import CrossEncoder
+
+            print(f"Loading reranker model: {model_name}")
+            model = CrossEncoder(model_name, device=device)
+        self.model = model
+        self.latency_budget = latency_budget
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        # Guards the cache, the latency estimate and stats across concurrent turns
+        self._lock = threading.Lock()
+
+        # Moving average of seconds per scored pair, used to predict budget overruns
+        self._seconds_per_pair = 0.0
+
+        self.stats = {
+            'queries': 0,
+            'pairs_scored': 0,
+            'cache_hits': 0,
+            'fallbacks': 0,
+            'over_budget': 0,
+            'total_time': 0.0,
+        }
+        self.last_latency = 0.0
+
+    @staticmethod
+    def _chunk_id(doc: Dict) -> str:
+        doc_id = doc.get('id')
+        if doc_id:
+            return doc_id
+        return hashlib.md5(f"{doc['source']}:{doc['content']}".encode()).hexdigest()
+
+    def _cache_put(self, key: Tuple[str, str], score: float):
+        # Caller holds self._lock
+        self._cache[key] = score
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def rerank(self, query: str, documents: List[Dict], top_n: int = 3) -> List[Dict]:
+        """Return the top_n documents by cross-encoder score (each gets a 'rerank_score').
+
+        Falls back to vector order if scoring runs past the latency budget.
+        """
+        start = time.perf_counter()
+
+        if len(documents) <= 1:
+            self._finish(start)
+            return documents[:top_n]
+
+        query_hash = hashlib.sha1(query.strip().lower().encode()).hexdigest()
+        keys = [(query_hash, self._chunk_id(doc)) for doc in documents]
+
+        scores = {}
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                score = self._cache.get(key)
+                if score is not None:
+                    self._cache.move_to_end(key)
+                    scores[i] = score
+                    self.stats['cache_hits'] += 1
+                else:
+                    missing.append(i)
+
+            seconds_per_pair = self._seconds_per_pair
+            if missing and seconds_per_pair * len(missing) > self.latency_budget:
+                # Only score as many of the best vector hits as the budget allows
+                affordable = int(self.latency_budget / seconds_per_pair)
+                missing = missing[:affordable]
+                self.stats['fallbacks'] += 1
+                # Decay the estimate so a transient slowdown doesn't disable reranking for good
+                self._seconds_per_pair *= 0.9
+
+        # Score in batches and stop once the budget is spent; scores computed so
+        # far are still cached for the next query
+        deadline = start + self.latency_budget
+        over_budget = False
+        for offset in range(0, len(missing), self.batch_size):
+            if time.perf_counter() >= deadline:
+                over_budget = True
+                break
+            batch = missing[offset:offset + self.batch_size]
+            score_start = time.perf_counter()
+            predicted = self.model.predict([(query, documents[i]['content']) for i in batch],
+                                           batch_size=self.batch_size, show_progress_bar=False)
+            per_pair = (time.perf_counter() - score_start) / len(batch)
+
+            with self._lock:
+                self._seconds_per_pair = per_pair if not self._seconds_per_pair else \
+                    0.8 * self._seconds_per_pair + 0.2 * per_pair
+                self.stats['pairs_scored'] += len(batch)
+                for i, score in zip(batch, predicted):
+                    scores[i] = float(score)
+                    self._cache_put(keys[i], float(score))
+
+        if over_budget or not scores:
+            self._finish(start, fallback=over_budget)
+            return documents[:top_n]
+
+        # Scored candidates by score, then any unscored ones in vector order
+        scored = sorted(scores, key=lambda i: scores[i], reverse=True)
+        unscored = [i for i in range(len(documents)) if i not in scores]
+        reranked = [dict(documents[i], rerank_score=scores[i]) for i in scored[:top_n]]
+        reranked.extend(documents[i] for i in unscored[:top_n - len(reranked)])
+
+        self._finish(start)
+        return reranked
+
+    def _finish(self, start: float, fallback: bool = False):
+        latency = time.perf_counter() - start
+        with self._lock:
+            self.stats['queries'] += 1
+            self.stats['total_time'] += latency
+            if fallback:
+                self.stats['fallbacks'] += 1
+            if latency > self.latency_budget:
+                self.stats['over_budget'] += 1
+        self.last_latency = latency
+
+    def get_stats(self) -> Dict:
+        """Return reranking counters, cache hit rate and average latency."""
+        with self._lock:
+            stats = dict(self.stats)
+        queries = stats['queries']
+        stats['avg_latency_ms'] = (stats['total_time'] / queries * 1000) if queries else 0.0
+        lookups = stats['cache_hits'] + stats['pairs_scored']
+        stats['cache_hit_rate'] = stats['cache_hits'] / lookups if lookups else 0.0
+        stats['fallback_rate'] = stats['fallbacks'] / queries if queries else 0.0
+        return stats
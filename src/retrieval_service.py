@@ -0,0 +1,278 @@
+"""
+Shared retrieval service for multi-worker serving.
+One process owns the embedding model and ChromaDB index and answers batched
+search requests over a Unix socket; chat workers use RetrievalClient instead of
+loading their own VectorStore.
+
+Run the service with:
+    python src/retrieval_service.py --socket /tmp/helpdesk_retrieval.sock
+"""
+
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Dict, Optional
+
+DEFAULT_SOCKET_PATH = "/tmp/helpdesk_retrieval.sock"
+
+# Messages are a 4-byte big-endian length followed by a UTF-8 JSON body
+_HEADER = struct.Struct("!I")
+
+
+def _send_message(sock: socket.socket, payload: Dict):
+    body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(body)) + body)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            return None
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def _recv_message(sock: socket.socket) -> Optional[Dict]:
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    (length,) = _HEADER.unpack(header)
+    body = _recv_exact(sock, length)
+    if body is None:
+        return None
+    return json.loads(body.decode('utf-8'))
+
+
+class _SearchBatcher:
+    """Collects concurrent search requests and runs them as one batched search.
+
+    Requests that arrive within `max_wait` of each other (up to `max_batch`
+    queries) share a single encode pass and a single ChromaDB query.
+    """
+
+    def __init__(self, vector_store, max_batch: int = 64, max_wait: float = 0.002):
+        self.vector_store = vector_store
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._requests: "queue.Queue" = queue.Queue()
+        self.stats = {'requests': 0, 'batches': 0, 'queries': 0}
+        self._thread = threading.Thread(target=self._run, name="search-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, queries: List[str], top_k: int) -> Future:
+        future: Future = Future()
+        self._requests.put((queries, top_k, future))
+        return future
+
+    def _run(self):
+        while True:
+            pending = [self._requests.get()]
+            n_queries = len(pending[0][0])
+            deadline = time.perf_counter() + self.max_wait
+
+            while n_queries < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                pending.append(item)
+                n_queries += len(item[0])
+
+            self._execute(pending)
+
+    def _execute(self, pending):
+        queries = [q for item in pending for q in item[0]]
+        top_k = max(item[1] for item in pending)
+
+        try:
+            results = self.vector_store.search_batch(queries, top_k=top_k)
+        except Exception as e:
+            for _, _, future in pending:
+                future.set_exception(e)
+            return
+
+        self.stats['requests'] += len(pending)
+        self.stats['batches'] += 1
+        self.stats['queries'] += len(queries)
+
+        offset = 0
+        for item_queries, item_top_k, future in pending:
+            item_results = results[offset:offset + len(item_queries)]
+            offset += len(item_queries)
+            future.set_result([docs[:item_top_k] for docs in item_results])
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    """Serves one client connection; each connection may send many requests."""
+
+    def handle(self):
+        server: RetrievalServer = self.server
+        while True:
+            try:
+                request = _recv_message(self.request)
+            except (ConnectionError, ValueError):
+                return
+            if request is None:
+                return
+
+            try:
+                op = request.get('op')
+                if op == 'search':
+                    future = server.batcher.submit(request['queries'], int(request.get('top_k', 3)))
+                    response = {'results': future.result()}
+                elif op == 'count':
+                    response = {'count': server.vector_store.get_collection_count()}
+                elif op == 'stats':
+                    response = {'stats': dict(server.batcher.stats)}
+                elif op == 'side_index_path':
+                    response = {'path': server.vector_store.side_index_path(request['filename'])}
+                else:
+                    response = {'error': f"Unknown op: {op}"}
+            except Exception as e:
+                response = {'error': str(e)}
+
+            try:
+                _send_message(self.request, response)
+            except (BrokenPipeError, ConnectionError):
+                return
+
+
+class RetrievalServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server exposing a VectorStore to local chat workers."""
+
+    daemon_threads = True
+    # socketserver's default backlog of 5 makes Unix socket connects fail with
+    # EAGAIN when several workers connect at once
+    request_queue_size = 128
+
+    def __init__(self, vector_store, socket_path: str = DEFAULT_SOCKET_PATH,
+                 max_batch: int = 64, max_wait: float = 0.002):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self.vector_store = vector_store
+        self.batcher = _SearchBatcher(vector_store, max_batch=max_batch, max_wait=max_wait)
+        super().__init__(socket_path, _RequestHandler)
+        os.chmod(socket_path, 0o660)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+class RetrievalClient:
+    """Drop-in replacement for VectorStore.search in chat workers.
+
+    Holds one persistent connection per thread to the retrieval service.
+    """
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, timeout: float = 30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, 'sock', None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _call(self, payload: Dict) -> Dict:
+        for attempt in range(2):
+            sock = self._connection()
+            try:
+                _send_message(sock, payload)
+                response = _recv_message(sock)
+                if response is None:
+                    raise ConnectionError("Retrieval service closed the connection")
+                break
+            except (ConnectionError, OSError):
+                sock.close()
+                self._local.sock = None
+                if attempt == 1:
+                    raise
+
+        if 'error' in response:
+            raise RuntimeError(f"Retrieval service error: {response['error']}")
+        return response
+
+    def search(self, query: str, top_k: int = 3) -> List[Dict]:
+        """Search for relevant documents using semantic similarity."""
+        return self._call({'op': 'search', 'queries': [query], 'top_k': top_k})['results'][0]
+
+    def search_batch(self, queries: List[str], top_k: int = 3) -> List[List[Dict]]:
+        """Search for several queries in one request."""
+        return self._call({'op': 'search', 'queries': queries, 'top_k': top_k})['results']
+
+    def get_collection_count(self) -> int:
+        """Get the number of documents in the collection."""
+        return self._call({'op': 'count'})['count']
+
+    def get_stats(self) -> Dict:
+        """Get batching statistics from the service."""
+        return self._call({'op': 'stats'})['stats']
+
+    def side_index_path(self, filename: str, collection_name: Optional[str] = None) -> str:
+        """Path of a side index file (e.g. the product catalog) of the service's live collection."""
+        return self._call({'op': 'side_index_path', 'filename': filename})['path']
+
+
+def main():
+    """Run the retrieval service in the foreground."""
+    parser = argparse.ArgumentParser(description="FluffyAI shared retrieval service")
+    parser.add_argument('--socket', default=os.getenv('RETRIEVAL_SOCKET', DEFAULT_SOCKET_PATH),
+                        help="Unix socket path to listen on")
+    parser.add_argument('--max-batch', type=int, default=64, help="Maximum queries per batched search")
+    parser.add_argument('--max-wait-ms', type=float, default=2.0, help="How long to wait to fill a batch")
+    parser.add_argument('--watch', action='store_true', help="Re-embed files under data/ as they change")
+    args = parser.parse_args()
+
+    # Add parent directory to Python path so imports work when run directly
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+    from src.vector_store import VectorStore
+
+    vector_store = VectorStore()
+    print(f"Loaded vector store with {vector_store.get_collection_count()} document chunks")
+
+    watcher = None
+    if args.watch and vector_store.snapshot is not None:
+        print("⚠ --watch is ignored when serving a read-only snapshot")
+    elif args.watch:
+        from src.data_watcher import DataWatcher
+        from src.ingest_data import CHUNK_SIZE, CHUNK_OVERLAP
+
+        watcher = DataWatcher(vector_store, os.path.join(os.path.dirname(__file__), '..', 'data'),
+                              chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP)
+        watcher.start()
+
+    server = RetrievalServer(vector_store, args.socket, max_batch=args.max_batch,
+                             max_wait=args.max_wait_ms / 1000)
+    print(f"✓ Retrieval service listening on {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down retrieval service")
+    finally:
+        server.server_close()
+        if watcher is not None:
+            watcher.stop()
+
+
+if __name__ == "__main__":
+    main()
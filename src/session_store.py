@@ -0,0 +1,356 @@
+"""
+Pluggable conversation session stores.
+Keeps per-session chat histories in memory, a SQLite file, or a Redis-compatible server,
+serialized compactly (msgpack/zstd when installed, JSON/zlib otherwise).
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+
+# One header byte records how a blob was encoded so stores stay readable
+# after optional packages are installed or removed.
+_FORMAT_JSON = 0x00
+_FORMAT_MSGPACK = 0x01
+_COMPRESS_NONE = 0x00
+_COMPRESS_ZLIB = 0x10
+_COMPRESS_ZSTD = 0x20
+
+# Histories shorter than this are not worth compressing
+_COMPRESS_MIN_BYTES = 256
+
+
+def serialize_history(history: List[Dict[str, str]]) -> bytes:
+    """Encode a conversation history into a compact byte string."""
+    pairs = [[m['role'], m['content']] for m in history]
+
+    if msgpack is not None:
+        fmt, payload = _FORMAT_MSGPACK, msgpack.packb(pairs, use_bin_type=True)
+    else:
+        fmt, payload = _FORMAT_JSON, json.dumps(pairs, separators=(',', ':')).encode('utf-8')
+
+    compression = _COMPRESS_NONE
+    if len(payload) >= _COMPRESS_MIN_BYTES:
+        if zstandard is not None:
+            compression, payload = _COMPRESS_ZSTD, zstandard.ZstdCompressor(level=3).compress(payload)
+        else:
+            compression, payload = _COMPRESS_ZLIB, zlib.compress(payload, 6)
+
+    return bytes([fmt | compression]) + payload
+
+
+def deserialize_history(blob: bytes) -> List[Dict[str, str]]:
+    """Decode a byte string produced by serialize_history."""
+    header, payload = blob[0], blob[1:]
+    compression, fmt = header & 0xF0, header & 0x0F
+
+    if compression == _COMPRESS_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Session was stored with zstd; install 'zstandard' to read it")
+        payload = zstandard.ZstdDecompressor().decompress(payload)
+    elif compression == _COMPRESS_ZLIB:
+        payload = zlib.decompress(payload)
+
+    if fmt == _FORMAT_MSGPACK:
+        if msgpack is None:
+            raise RuntimeError("Session was stored with msgpack; install 'msgpack' to read it")
+        pairs = msgpack.unpackb(payload, raw=False)
+    else:
+        pairs = json.loads(payload.decode('utf-8'))
+
+    return [{"role": role, "content": content} for role, content in pairs]
+
+
+class SessionStore:
+    """Base interface for conversation session storage."""
+
+    def load(self, session_id: str) -> List[Dict[str, str]]:
+        """Return the history for a session (empty list if unknown)."""
+        raise NotImplementedError
+
+    def save(self, session_id: str, history: List[Dict[str, str]]):
+        """Store the history for a session."""
+        raise NotImplementedError
+
+    def delete(self, session_id: str):
+        """Forget a session."""
+        raise NotImplementedError
+
+    def flush(self):
+        """Persist any buffered writes."""
+
+    def close(self):
+        """Flush and release resources."""
+        self.flush()
+
+
+class MemorySessionStore(SessionStore):
+    """In-process LRU session store (lost on restart)."""
+
+    def __init__(self, max_sessions: int = 1000):
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, List[Dict[str, str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, session_id: str) -> List[Dict[str, str]]:
+        with self._lock:
+            history = self._sessions.get(session_id)
+            if history is None:
+                return []
+            self._sessions.move_to_end(session_id)
+            return list(history)
+
+    def save(self, session_id: str, history: List[Dict[str, str]]):
+        with self._lock:
+            self._sessions[session_id] = list(history)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+class _WriteBehindStore(SessionStore):
+    """Session store with a hot LRU cache and batched background persistence.
+
+    `save` only updates memory and marks the session dirty; a background thread
+    writes dirty sessions in batches, so persistence never blocks `chat`.
+    The backend may be shared by several workers, so a cached history is only
+    served while the backend still holds the version it was read or written
+    as; otherwise the session is read again.
+    """
+
+    _DELETED = object()
+
+    def __init__(self, cache_size: int = 1000, flush_interval: float = 1.0, batch_size: int = 128):
+        self.cache_size = cache_size
+        # session_id -> (history, backend version or None if unknown)
+        self._cache: "OrderedDict[str, Tuple[List[Dict[str, str]], object]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._pending: Dict[str, object] = {}
+        # The batch being written by flush(), still served by load() until it commits
+        self._inflight: Dict[str, object] = {}
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._writer = threading.Thread(target=self._write_loop, name="session-writer", daemon=True)
+        self._writer.start()
+
+    # Backend hooks -----------------------------------------------------
+
+    def _read(self, session_id: str, known_version: object = None) -> Optional[Tuple[Optional[bytes], object]]:
+        """Return (blob, version), (None, version) if known_version is still current, or None if unknown.
+
+        Backends without cheap versions return a None version, which is never
+        trusted, so their sessions are always read again.
+        """
+        raise NotImplementedError
+
+    def _write_batch(self, upserts: Dict[str, bytes], deletes: List[str]) -> Dict[str, object]:
+        """Write a batch; returns the backend version of each upserted session (if any)."""
+        raise NotImplementedError
+
+    # Local cache -------------------------------------------------------
+
+    def _cache_put(self, session_id: str, history: List[Dict[str, str]], version: object = None):
+        with self._cache_lock:
+            self._cache[session_id] = (list(history), version)
+            self._cache.move_to_end(session_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _cache_set_version(self, session_id: str, history: List[Dict[str, str]], version: object):
+        """Record the version a flushed history was written as, unless it changed since."""
+        with self._cache_lock:
+            entry = self._cache.get(session_id)
+            if entry is not None and entry[0] == history:
+                self._cache[session_id] = (entry[0], version)
+
+    # SessionStore API --------------------------------------------------
+
+    def load(self, session_id: str) -> List[Dict[str, str]]:
+        with self._pending_lock:
+            pending = self._pending.get(session_id, self._inflight.get(session_id))
+        if pending is self._DELETED:
+            return []
+        if pending is not None:
+            return list(pending)
+
+        with self._cache_lock:
+            entry = self._cache.get(session_id)
+        known_version = entry[1] if entry is not None else None
+
+        row = self._read(session_id, known_version)
+        if row is None:
+            with self._cache_lock:
+                self._cache.pop(session_id, None)
+            return []
+        blob, version = row
+        if blob is None and entry is not None:
+            with self._cache_lock:
+                if session_id in self._cache:
+                    self._cache.move_to_end(session_id)
+            return list(entry[0])
+
+        history = deserialize_history(blob)
+        self._cache_put(session_id, history, version)
+        return list(history)
+
+    def save(self, session_id: str, history: List[Dict[str, str]]):
+        self._cache_put(session_id, history)
+        with self._pending_lock:
+            self._pending[session_id] = list(history)
+            if len(self._pending) >= self.batch_size:
+                self._wakeup.set()
+
+    def delete(self, session_id: str):
+        with self._cache_lock:
+            self._cache.pop(session_id, None)
+        with self._pending_lock:
+            self._pending[session_id] = self._DELETED
+
+    def flush(self):
+        with self._flush_lock:
+            with self._pending_lock:
+                pending, self._pending = self._pending, {}
+                self._inflight = pending
+            if not pending:
+                return
+
+            upserts = {sid: serialize_history(h) for sid, h in pending.items() if h is not self._DELETED}
+            deletes = [sid for sid, h in pending.items() if h is self._DELETED]
+            try:
+                versions = self._write_batch(upserts, deletes) or {}
+            except Exception as e:
+                print(f"⚠ Failed to persist {len(pending)} sessions: {e}")
+                # Put them back unless a newer version arrived meanwhile
+                with self._pending_lock:
+                    for sid, h in pending.items():
+                        self._pending.setdefault(sid, h)
+                    self._inflight = {}
+                return
+
+            for sid, version in versions.items():
+                self._cache_set_version(sid, pending[sid], version)
+            with self._pending_lock:
+                self._inflight = {}
+
+    def close(self):
+        self._stopped.set()
+        self._wakeup.set()
+        self._writer.join(timeout=5)
+        self.flush()
+
+    def _write_loop(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+class SQLiteSessionStore(_WriteBehindStore):
+    """Session store backed by a single SQLite file, shareable between workers."""
+
+    def __init__(self, path: str = "./sessions.db", **kwargs):
+        self.path = path
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, history BLOB NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        super().__init__(**kwargs)
+
+    def _read(self, session_id: str, known_version: object = None) -> Optional[Tuple[Optional[bytes], object]]:
+        # updated_at doubles as the version; the blob is skipped while it is unchanged
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT CASE WHEN updated_at = ? THEN NULL ELSE history END, updated_at "
+                "FROM sessions WHERE session_id = ?", (known_version, session_id)
+            ).fetchone()
+        if row is None:
+            return None
+        return (bytes(row[0]) if row[0] is not None else None), row[1]
+
+    def _write_batch(self, upserts: Dict[str, bytes], deletes: List[str]) -> Dict[str, object]:
+        now = time.time()
+        with self._db_lock, self._conn:
+            if upserts:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO sessions (session_id, history, updated_at) VALUES (?, ?, ?)",
+                    [(sid, blob, now) for sid, blob in upserts.items()]
+                )
+            if deletes:
+                self._conn.executemany("DELETE FROM sessions WHERE session_id = ?", [(sid,) for sid in deletes])
+        return {sid: now for sid in upserts}
+
+    def close(self):
+        super().close()
+        with self._db_lock:
+            self._conn.close()
+
+
+class RedisSessionStore(_WriteBehindStore):
+    """Session store for a Redis-compatible server (Redis, Valkey, KeyDB, ...) on localhost."""
+
+    def __init__(self, url: str = "redis://localhost:6379/0", prefix: str = "helpdesk:session:",
+                 ttl: Optional[int] = 7 * 24 * 3600, **kwargs):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("RedisSessionStore requires the 'redis' package: pip install redis")
+
+        self.prefix = prefix
+        self.ttl = ttl
+        self._client = redis.Redis.from_url(url)
+        super().__init__(**kwargs)
+
+    def _read(self, session_id: str, known_version: object = None) -> Optional[Tuple[Optional[bytes], object]]:
+        # A version check would cost the same round trip as the GET, so always read
+        blob = self._client.get(self.prefix + session_id)
+        return (blob, None) if blob is not None else None
+
+    def _write_batch(self, upserts: Dict[str, bytes], deletes: List[str]) -> Dict[str, object]:
+        pipe = self._client.pipeline(transaction=False)
+        for sid, blob in upserts.items():
+            pipe.set(self.prefix + sid, blob, ex=self.ttl)
+        for sid in deletes:
+            pipe.delete(self.prefix + sid)
+        pipe.execute()
+        return {}
+
+
+def create_session_store(kind: str = "memory", **kwargs) -> SessionStore:
+    """Create a session store by name: 'memory', 'sqlite' or 'redis'."""
+    kind = kind.lower()
+    if kind == "memory":
+        return MemorySessionStore(**kwargs)
+    if kind == "sqlite":
+        return SQLiteSessionStore(**kwargs)
+    if kind == "redis":
+        return RedisSessionStore(**kwargs)
+    raise ValueError(f"Unknown session store: {kind}")
@@ -0,0 +1,290 @@
+"""
+Single-file index snapshots for fast cold start and distribution.
+Packs the embedding matrix, chunk texts, ids, metadata and a manifest into one
+versioned file that VectorStore can memory-map (pages are shared between
+processes), so the store is built once and shipped as an artifact.
+
+Usage:
+    python src/snapshot.py export helpdesk.snap     # from ./chroma_db
+    python src/snapshot.py import helpdesk.snap     # into ./chroma_db, no re-embedding
+    python src/snapshot.py info helpdesk.snap
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from typing import List, Dict, Optional
+
+import numpy as np
+
+MAGIC = b"HDSNAP\x00\x01"
+FORMAT_VERSION = 1
+_ALIGN = 64
+
+# Fixed prefix: magic, then the manifest length
+_PREFIX = struct.Struct("<8sQ")
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _pack_strings(values: List[str]):
+    """UTF-8 blob plus uint64 offsets (len(values) + 1 entries)."""
+    encoded = [v.encode('utf-8') for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return offsets, b"".join(encoded)
+
+
+def write_snapshot(path: str, ids: List[str], embeddings: np.ndarray, texts: List[str],
+                   metadatas: List[Dict], model_name: str, chunker: Optional[Dict] = None):
+    """Write a snapshot file from in-memory arrays."""
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    count, dims = embeddings.shape
+    norms = np.einsum('ij,ij->i', embeddings, embeddings).astype(np.float32)
+
+    id_offsets, id_blob = _pack_strings(ids)
+    text_offsets, text_blob = _pack_strings(texts)
+    meta_offsets, meta_blob = _pack_strings([json.dumps(m, separators=(',', ':')) for m in metadatas])
+
+    sections = [
+        ('embeddings', embeddings.tobytes()),
+        ('norms', norms.tobytes()),
+        ('id_offsets', id_offsets.tobytes()),
+        ('ids', id_blob),
+        ('text_offsets', text_offsets.tobytes()),
+        ('texts', text_blob),
+        ('meta_offsets', meta_offsets.tobytes()),
+        ('metadata', meta_blob),
+    ]
+
+    checksum = hashlib.sha256()
+    for _, data in sections:
+        checksum.update(data)
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'model_name': model_name,
+        'dims': dims,
+        'count': count,
+        'chunker': chunker or {},
+        'created_at': time.time(),
+        'sha256': checksum.hexdigest(),
+        'sections': {},
+    }
+
+    # Section offsets depend on the manifest size, which depends on the offsets:
+    # reserve generous space for the manifest and pad.
+    manifest_space = _aligned(len(json.dumps(manifest)) + 64 * len(sections) + 256)
+    offset = _aligned(_PREFIX.size + manifest_space)
+    for name, data in sections:
+        manifest['sections'][name] = [offset, len(data)]
+        offset = _aligned(offset + len(data))
+
+    manifest_bytes = json.dumps(manifest).encode('utf-8')
+    assert len(manifest_bytes) <= manifest_space
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREFIX.pack(MAGIC, len(manifest_bytes)))
+        f.write(manifest_bytes)
+        for name, data in sections:
+            f.seek(manifest['sections'][name][0])
+            f.write(data)
+        f.truncate(offset)
+    os.replace(tmp_path, path)
+
+
+class Snapshot:
+    """Read-only, memory-mapped view of a snapshot file.
+
+    Opening only parses the manifest; embeddings and strings are read lazily
+    from the shared page cache.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, manifest_len = _PREFIX.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a helpdesk snapshot")
+        self.manifest = json.loads(self._mmap[_PREFIX.size:_PREFIX.size + manifest_len])
+        if self.manifest['format_version'] > FORMAT_VERSION:
+            raise ValueError(f"Snapshot format {self.manifest['format_version']} is newer than supported")
+
+        self.count = self.manifest['count']
+        self.dims = self.manifest['dims']
+        self.model_name = self.manifest['model_name']
+
+        self.embeddings = self._array('embeddings', np.float32).reshape(self.count, self.dims)
+        self.norms = self._array('norms', np.float32)
+        self._id_offsets = self._array('id_offsets', np.uint64)
+        self._text_offsets = self._array('text_offsets', np.uint64)
+        self._meta_offsets = self._array('meta_offsets', np.uint64)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _section(self, name: str):
+        offset, length = self.manifest['sections'][name]
+        return offset, length
+
+    def _array(self, name: str, dtype) -> np.ndarray:
+        offset, length = self._section(name)
+        return np.frombuffer(self._mmap, dtype=dtype, count=length // np.dtype(dtype).itemsize, offset=offset)
+
+    def _string(self, section: str, offsets: np.ndarray, i: int) -> str:
+        base, _ = self._section(section)
+        start, end = int(offsets[i]), int(offsets[i + 1])
+        return self._mmap[base + start:base + end].decode('utf-8')
+
+    def get_id(self, i: int) -> str:
+        return self._string('ids', self._id_offsets, i)
+
+    def get_text(self, i: int) -> str:
+        return self._string('texts', self._text_offsets, i)
+
+    def get_metadata(self, i: int) -> Dict:
+        return json.loads(self._string('metadata', self._meta_offsets, i))
+
+    def verify(self) -> bool:
+        """Check the data sections against the manifest checksum."""
+        checksum = hashlib.sha256()
+        for name in self.manifest['sections']:
+            offset, length = self._section(name)
+            checksum.update(self._mmap[offset:offset + length])
+        return checksum.hexdigest() == self.manifest['sha256']
+
+    def search(self, query_embeddings: np.ndarray, top_k: int = 3) -> List[List[Dict]]:
+        """Exact search over the mapped matrix; results match VectorStore.search."""
+        query_embeddings = np.asarray(query_embeddings, dtype=np.float32).reshape(-1, self.dims)
+        if self.count == 0:
+            return [[] for _ in range(len(query_embeddings))]
+
+        k = min(top_k, self.count)
+        query_norms = np.einsum('ij,ij->i', query_embeddings, query_embeddings)
+        distances = query_norms[:, None] + self.norms[None, :] - 2.0 * (query_embeddings @ self.embeddings.T)
+
+        batch = []
+        for row in distances:
+            top = np.argpartition(row, k - 1)[:k] if k < len(row) else np.arange(len(row))
+            top = top[np.argsort(row[top])]
+            documents = []
+            for i in top:
+                metadata = self.get_metadata(int(i))
+                documents.append({
+                    'id': self.get_id(int(i)),
+                    'content': self.get_text(int(i)),
+                    'source': metadata['source'],
+                    'type': metadata['type'],
+                    'distance': float(max(row[i], 0.0))
+                })
+            batch.append(documents)
+        return batch
+
+    def iter_batches(self, batch_size: int = 1000):
+        """Yield (ids, embeddings, texts, metadatas) batches, e.g. to load into ChromaDB."""
+        for start in range(0, self.count, batch_size):
+            end = min(start + batch_size, self.count)
+            yield (
+                [self.get_id(i) for i in range(start, end)],
+                np.array(self.embeddings[start:end]),
+                [self.get_text(i) for i in range(start, end)],
+                [self.get_metadata(i) for i in range(start, end)],
+            )
+
+    def close(self):
+        # Drop array views before closing the map they point into
+        self.embeddings = self.norms = None
+        self._id_offsets = self._text_offsets = self._meta_offsets = None
+        self._mmap.close()
+        self._file.close()
+
+
+def export_snapshot(vector_store, path: str, chunker: Optional[Dict] = None, page_size: int = 5000):
+    """Export a VectorStore's ChromaDB collection into a snapshot file."""
+    ids, texts, metadatas, embeddings = [], [], [], []
+    count = vector_store.get_collection_count()
+    for offset in range(0, count, page_size):
+        page = vector_store.collection.get(include=['embeddings', 'documents', 'metadatas'],
+                                           offset=offset, limit=page_size)
+        ids.extend(page['ids'])
+        texts.extend(page['documents'])
+        metadatas.extend(page['metadatas'])
+        embeddings.append(np.asarray(page['embeddings'], dtype=np.float32))
+
+    matrix = np.vstack(embeddings) if embeddings else \
+        np.empty((0, vector_store.model.get_sentence_embedding_dimension()), dtype=np.float32)
+    write_snapshot(path, ids, matrix, texts, metadatas, vector_store.model_name, chunker)
+    return len(ids)
+
+
+def _snapshot_chunks(snapshot: Snapshot, batch_size: int):
+    """Chunks of a snapshot as documents for VectorStore, with their stored embeddings."""
+    for ids, embeddings, texts, metadatas in snapshot.iter_batches(batch_size):
+        for text, embedding, metadata in zip(texts, embeddings, metadatas):
+            yield dict(metadata, content=text, embedding=embedding)
+
+
+def import_snapshot(path: str, vector_store, batch_size: int = 1000) -> str:
+    """Load a snapshot into a new version of a VectorStore without re-embedding.
+
+    The file is checked against its checksum first. The import goes through
+    `reindex`, so the current collection keeps serving until the imported one
+    is complete and validated, and is left untouched if anything fails.
+    Returns the name of the new live collection.
+    """
+    snapshot = Snapshot(path)
+    try:
+        if not snapshot.verify():
+            raise ValueError(f"{path} does not match its checksum; not importing it")
+        if snapshot.model_name != vector_store.model_name:
+            raise ValueError(f"Snapshot was built with {snapshot.model_name}, "
+                             f"vector store uses {vector_store.model_name}")
+        return vector_store.reindex(_snapshot_chunks(snapshot, batch_size), batch_size=batch_size)
+    finally:
+        snapshot.close()
+
+
+def main():
+    """Export, import or inspect snapshot files."""
+    parser = argparse.ArgumentParser(description="FluffyAI helpdesk index snapshots")
+    parser.add_argument('command', choices=['export', 'import', 'info'])
+    parser.add_argument('path', help="Snapshot file")
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        start = time.perf_counter()
+        snapshot = Snapshot(args.path)
+        elapsed = (time.perf_counter() - start) * 1000
+        manifest = {k: v for k, v in snapshot.manifest.items() if k != 'sections'}
+        print(json.dumps(manifest, indent=2))
+        print(f"Opened in {elapsed:.1f} ms, checksum {'OK' if snapshot.verify() else 'MISMATCH'}")
+        snapshot.close()
+        return
+
+    # Add parent directory to Python path so imports work when run directly
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+    from src.ingest_data import CHUNK_SIZE, CHUNK_OVERLAP
+    from src.vector_store import VectorStore
+
+    vector_store = VectorStore()
+    if args.command == 'export':
+        count = export_snapshot(vector_store, args.path,
+                                chunker={'chunk_size': CHUNK_SIZE, 'overlap': CHUNK_OVERLAP})
+        print(f"✓ Exported {count} chunks to {args.path}")
+    else:
+        name = import_snapshot(args.path, vector_store)
+        print(f"✓ Imported {vector_store.get_collection_count()} chunks from {args.path} into {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Fast text extraction for Markdown and HTML.
+Markdown is converted to text by a line tokenizer instead of rendering HTML and
+re-parsing it. HTML uses lxml when it is installed and otherwise a streaming
+extractor on the standard library parser (no tree is built). Headings and other
+blocks stay on their own lines so the chunker can break between sections.
+"""
+
+import codecs
+import re
+from html.parser import HTMLParser
+from typing import List, Tuple, Union
+
+try:
+    import lxml.etree
+    import lxml.html
+except ImportError:  # optional dependency
+    lxml = None
+
+# Elements whose text is never content
+SKIP_TAGS = {'script', 'style', 'nav', 'footer', 'header', 'noscript', 'template'}
+
+# Elements that start a new line of text
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt', 'fieldset',
+    'figcaption', 'figure', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'li', 'main',
+    'ol', 'p', 'pre', 'section', 'table', 'td', 'th', 'tr', 'ul',
+}
+
+_FENCE = re.compile(r'^\s*(```|~~~)')
+_HEADING = re.compile(r'^\s{0,3}#{1,6}\s+(.*?)(?:\s+#+)?\s*$')
+_RULE = re.compile(r'^\s{0,3}([-*_=])(?:\s*\1){2,}\s*$')
+_LIST_MARKER = re.compile(r'^\s*(?:[-*+]|\d+[.)])\s+')
+_BLOCKQUOTE = re.compile(r'^\s*(?:>\s?)+')
+_TABLE_RULE = re.compile(r'^\s*\|?\s*:?-+:?\s*(?:\|\s*:?-+:?\s*)*\|?\s*$')
+
+# <meta charset=...>, <meta http-equiv ... content="...; charset=..."> or <?xml encoding=...?>
+_DECLARED_CHARSET = re.compile(rb'(?:charset|encoding)\s*=\s*["\']?([A-Za-z0-9._:-]+)', re.IGNORECASE)
+
+_INLINE_RULES = [
+    (re.compile(r'!\[([^\]]*)\]\([^)]*\)'), r'\1'),        # images -> alt text
+    (re.compile(r'\[([^\]]+)\]\([^)]*\)'), r'\1'),         # links -> link text
+    (re.compile(r'\[([^\]]+)\]\[[^\]]*\]'), r'\1'),        # reference links
+    (re.compile(r'<(https?://[^>\s]+)>'), r'\1'),           # autolinks
+    (re.compile(r'<[^>\n]+>'), ''),                         # inline HTML tags
+    (re.compile(r'`([^`]*)`'), r'\1'),                      # inline code
+    (re.compile(r'(\*\*|__)(?=\S)(.+?)(?<=\S)\1'), r'\2'),  # bold
+    (re.compile(r'(?<![\w*])\*(?=\S)(.+?)(?<=\S)\*(?!\*)'), r'\1'),  # *italic*
+    (re.compile(r'(?<!\w)_(?=\S)(.+?)(?<=\S)_(?!\w)'), r'\1'),       # _italic_
+    (re.compile(r'~~(.+?)~~'), r'\1'),                      # strikethrough
+    (re.compile(r'\\([\\`*_{}\[\]()#+\-.!|>])'), r'\1'),   # backslash escapes
+]
+
+
+def _clean_lines(text: str) -> str:
+    """Collapse whitespace within lines and drop empty ones."""
+    lines = (' '.join(line.split()) for line in text.splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+def _strip_inline(text: str) -> str:
+    for pattern, replacement in _INLINE_RULES:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def markdown_to_text(markdown_text: str) -> str:
+    """Strip Markdown syntax, keeping headings, list items and paragraphs on their own lines."""
+    blocks = []   # text with inline syntax already stripped
+    prose = []    # lines awaiting inline stripping (done per run, not per line)
+    in_fence = False
+    for line in markdown_text.splitlines():
+        if _FENCE.match(line):
+            if not in_fence:
+                blocks.append(_strip_inline('\n'.join(prose)))
+                prose = []
+            in_fence = not in_fence
+            continue
+        if in_fence:
+            blocks.append(line)
+            continue
+
+        heading = _HEADING.match(line)
+        if heading:
+            line = heading.group(1)
+        elif _RULE.match(line) or _TABLE_RULE.match(line):
+            # Horizontal rules, setext underlines and table header separators
+            continue
+        else:
+            line = _BLOCKQUOTE.sub('', line)
+            line = _LIST_MARKER.sub('', line)
+            if '|' in line:
+                line = ' '.join(cell.strip() for cell in line.strip().strip('|').split('|'))
+        prose.append(line)
+
+    blocks.append(_strip_inline('\n'.join(prose)))
+    return _clean_lines('\n'.join(blocks))
+
+
+class _TextExtractor(HTMLParser):
+    """Collects text from an HTML stream, skipping non-content elements."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.links = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            # Links are collected even inside navigation, which is what a crawler follows
+            href = dict(attrs).get('href')
+            if href:
+                self.links.append(href)
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(self._skip_depth - 1, 0)
+        elif tag in BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+
+def _declared_charset(html: bytes) -> str:
+    """Charset declared near the start of an HTML document, else utf-8."""
+    match = _DECLARED_CHARSET.search(html[:2048])
+    if match:
+        charset = match.group(1).decode('ascii')
+        try:
+            return codecs.lookup(charset).name
+        except LookupError:
+            pass
+    return 'utf-8'
+
+
+def _parse_lxml(html: Union[str, bytes]):
+    if isinstance(html, bytes):
+        # Bytes go to lxml undecoded so its own charset handling applies; pages
+        # that declare nothing are read as utf-8 rather than libxml2's latin-1
+        parser = lxml.html.HTMLParser(encoding=_declared_charset(html))
+        tree = lxml.html.document_fromstring(html, parser=parser)
+    else:
+        tree = lxml.html.document_fromstring(html)
+    links = [href for href in tree.xpath('//a/@href') if href]
+    for element in list(tree.iter(*SKIP_TAGS)):
+        element.drop_tree()
+    for element in tree.iter(*BLOCK_TAGS):
+        element.text = '\n' + (element.text or '')
+        element.tail = '\n' + (element.tail or '')
+    return tree.text_content(), links
+
+
+def extract_page(html: Union[str, bytes]) -> Tuple[str, List[str]]:
+    """Extract visible text (one block per line) and raw link hrefs from HTML in one parse."""
+    if not html.strip():
+        return "", []
+
+    if lxml is not None:
+        try:
+            text, links = _parse_lxml(html)
+            return _clean_lines(text), links
+        except (ValueError, lxml.etree.LxmlError):
+            # e.g. str input with an XML encoding declaration, or markup lxml rejects
+            pass
+
+    if isinstance(html, bytes):
+        html = html.decode(_declared_charset(html), errors='replace')
+    extractor = _TextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return _clean_lines(''.join(extractor.parts)), extractor.links
+
+
+def html_to_text(html: Union[str, bytes]) -> str:
+    """Extract visible text from HTML (str or bytes), one block per line."""
+    return extract_page(html)[0]
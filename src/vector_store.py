@@ -4,25 +4,66 @@ Uses local sentence-transformers for embedding generation (no API costs!).
 """
 
 import os
+import shutil
+import threading
+import time
 import chromadb
 from chromadb.config import Settings
+from collections import OrderedDict
 from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Optional
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Iterable, Set, Tuple, Callable
 import hashlib
+import itertools
 import torch
 import numpy as np
 
+from .ann_index import ShardedIndex, VectorIndex, create_index, load_index
+from .autotune import DEFAULT_PROFILE, load_or_tune
+from .dedup import NearDuplicateFilter
+from .query_log import normalize_query
+from .snapshot import Snapshot
+
+CHROMA_DIR = "./chroma_db"
+
+
+def chroma_accepts_numpy(version: Optional[str] = None) -> bool:
+    """True if this ChromaDB release takes numpy embeddings (0.5 and later)."""
+    version = version or getattr(chromadb, '__version__', '')
+    try:
+        major, minor = (int(part) for part in version.split('.')[:2])
+    except ValueError:
+        return False
+    return (major, minor) >= (0, 5)
+
 
 class VectorStore:
     """Manages document embeddings and similarity search using ChromaDB and local sentence-transformers."""
 
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2", collection_name: str = "helpdesk_docs"):
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", collection_name: str = "helpdesk_docs",
+                 index_type: Optional[str] = None, index_path: str = "./ann_index",
+                 index_options: Optional[Dict] = None, snapshot_path: Optional[str] = None,
+                 dedup_threshold: float = 0.9):
         """Initialize vector store with local sentence-transformers embeddings.
 
         Args:
             model_name: Name of the sentence-transformers model to use.
                        Default is 'all-MiniLM-L6-v2' which is fast on CPU (~90MB).
             collection_name: Name of the ChromaDB collection.
+            index_type: Optional in-process index used for search instead of ChromaDB's
+                       query: 'hnsw' (approximate, for large corpora), 'int8' or 'pq'
+                       (compressed codes with exact re-scoring, for lower RAM), 'exact',
+                       or 'sharded' (several of these searched in parallel).
+                       ChromaDB still stores the chunk texts and metadata.
+                       Defaults to the VECTOR_INDEX environment variable; VECTOR_INDEX_SHARDS
+                       splits it into that many shards.
+            index_path: Directory where the index is persisted.
+            index_options: Extra index settings, e.g. {'ef_search': 64, 'm': 16} or {'rescore': 8}.
+            snapshot_path: Serve read-only from a memory-mapped snapshot file
+                          (see src/snapshot.py) instead of ChromaDB. The model named
+                          in the snapshot manifest is used. Defaults to VECTOR_SNAPSHOT.
+            dedup_threshold: Near-duplicate threshold applied by replace_source, matching
+                            the one full ingestion uses (ingest_data.DEDUP_THRESHOLD).
         """
         # Fix proxy URL if it uses 'socks://' instead of 'socks5://'
         for proxy_var in ['all_proxy', 'ALL_PROXY', 'http_proxy', 'https_proxy', 'HTTP_PROXY', 'HTTPS_PROXY']:
@@ -30,6 +71,14 @@ class VectorStore:
             if proxy_val and proxy_val.startswith('socks://'):
                 os.environ[proxy_var] = proxy_val.replace('socks://', 'socks5://')
 
+        self.snapshot: Optional[Snapshot] = None
+        snapshot_path = snapshot_path or os.getenv('VECTOR_SNAPSHOT')
+        if snapshot_path:
+            self.snapshot = Snapshot(snapshot_path)
+            model_name = self.snapshot.model_name
+            print(f"Mapped snapshot {snapshot_path} ({len(self.snapshot)} chunks)")
+
+        self.model_name = model_name
         print(f"Loading embedding model: {model_name}")
         self.model = SentenceTransformer(model_name)
 
@@ -50,103 +99,773 @@ class VectorStore:
         else:
             print("✓ Model loaded on CPU")
 
+        # Thread counts and batch sizes; tuned per host with EMBED_AUTOTUNE=1 (or 'force' to retune)
+        self.tuning = dict(DEFAULT_PROFILE)
+        autotune = os.getenv('EMBED_AUTOTUNE', '').lower()
+        if self.device == 'cpu' and autotune in ('1', 'true', 'yes', 'force'):
+            self.tuning = load_or_tune(self.model, model_name, workers=int(os.getenv('EMBED_WORKERS', '1')),
+                                       retune=autotune == 'force')
+            print(f"  Embedding threads: {self.tuning['query_threads']} per query, "
+                  f"{self.tuning['bulk_threads']} bulk (batch {self.tuning['encode_batch_size']})")
+            self._set_threads(self.tuning['query_threads'])
+
+        # Newer ChromaDB releases accept float32 arrays directly; older ones
+        # need Python lists
+        self._backend_accepts_numpy = chroma_accepts_numpy()
+        self.collection_name = collection_name
+        self.index: Optional[VectorIndex] = None
+        self.index_path = index_path
+        # Guards swapping the live (collection, index) pair during reindexing
+        self._swap_lock = threading.Lock()
+        # Held by reindex for the whole rebuild and by incremental writes, so a
+        # write never lands in a collection that is about to be swapped out
+        self._write_lock = threading.RLock()
+        # Users of each index still in flight; swapped-out indexes are closed when theirs reach 0
+        self._index_users: Dict[VectorIndex, int] = {}
+        self._retired_indexes: Set[VectorIndex] = set()
+        # Called with the new collection name after every swap (reindex or refresh)
+        self._swap_listeners: List[Callable[[str], None]] = []
+
+        # Near-duplicate filter over the live chunks for incremental updates, built on first use
+        self.dedup_threshold = dedup_threshold
+        self._dedup: Optional[NearDuplicateFilter] = None
+        self._dedup_collection: Optional[str] = None
+        self._dedup_lock = threading.Lock()
+
+        # Query-side LRU caches: normalized query -> embedding, and (embedding, top_k) ->
+        # results. Results are dropped whenever the live chunks change.
+        self.query_cache_size = int(os.getenv('QUERY_CACHE_SIZE', '4096'))
+        self._embedding_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._result_cache: "OrderedDict[Tuple[bytes, int], List[Dict]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_generation = 0
+        self.cache_stats = {'embedding_hits': 0, 'embedding_misses': 0, 'result_hits': 0, 'result_misses': 0}
+
+        # User queries in flight, so background ingestion can yield to them
+        self._activity_lock = threading.Lock()
+        self._queries_in_flight = 0
+        self._last_query_at = 0.0
+
+        if self.snapshot is not None:
+            # Read-only serving: no ChromaDB client, search runs on the mapped matrix
+            self.chroma_client = None
+            self.collection = None
+            return
+
         # Initialize ChromaDB (persistent storage)
         self.chroma_client = chromadb.Client(Settings(
             anonymized_telemetry=False,
             is_persistent=True,
-            persist_directory="./chroma_db"
+            persist_directory=CHROMA_DIR
         ))
 
+        # The live collection is a versioned one after a blue/green reindex
+        self._pointer_path = os.path.join(CHROMA_DIR, f"{collection_name}.live")
+        self._pointer_checked_at = time.monotonic()
+        live_name = self._read_live_pointer() or collection_name
+
         # Get or create collection
         try:
-            self.collection = self.chroma_client.get_collection(name=collection_name)
-            print(f"Loaded existing collection: {collection_name}")
+            self.collection = self.chroma_client.get_collection(name=live_name)
+            print(f"Loaded existing collection: {live_name}")
         except:
             self.collection = self.chroma_client.create_collection(name=collection_name)
             print(f"Created new collection: {collection_name}")
 
+        self.index_type = index_type or os.getenv('VECTOR_INDEX')
+        self.index_options = dict(index_options or {})
+        if os.getenv('VECTOR_INDEX_EF_SEARCH') and self.index_type == 'hnsw':
+            self.index_options.setdefault('ef_search', int(os.getenv('VECTOR_INDEX_EF_SEARCH')))
+        if os.getenv('VECTOR_INDEX_RESCORE') and self.index_type in ('int8', 'pq'):
+            self.index_options.setdefault('rescore', int(os.getenv('VECTOR_INDEX_RESCORE')))
+        shards = int(os.getenv('VECTOR_INDEX_SHARDS', '1'))
+        if shards > 1 and self.index_type != ShardedIndex.kind:
+            # Each shard is an index of the configured type
+            self.index_options.update(
+                shards=shards,
+                shard_kind=self.index_type or 'exact',
+                by=os.getenv('VECTOR_INDEX_SHARD_BY', 'id'),
+                processes=os.getenv('VECTOR_INDEX_SHARD_PROCESSES', '').lower() in ('1', 'true', 'yes'),
+            )
+            self.index_type = ShardedIndex.kind
+        if self.index_type:
+            self.index = self._open_index(self.collection)
+
+    def _index_dir(self, collection_name: str) -> str:
+        return os.path.join(self.index_path, collection_name)
+
+    def _open_index(self, collection) -> VectorIndex:
+        """Load the persisted index for a collection, or build it from ChromaDB."""
+        index_dir = self._index_dir(collection.name)
+        if os.path.exists(os.path.join(index_dir, "index.json")):
+            index = load_index(index_dir, processes=self.index_options.get('processes', False))
+            index.configure(**self.index_options)
+            print(f"Loaded {index.kind} index with {len(index)} vectors from {index_dir}")
+            return index
+
+        dim = self.model.get_sentence_embedding_dimension()
+        index = create_index(self.index_type, dim, **self.index_options)
+
+        # Backfill from existing ChromaDB data so the index matches the collection
+        count = collection.count()
+        page_size = 5000
+        for offset in range(0, count, page_size):
+            page = collection.get(include=['embeddings', 'metadatas'], offset=offset, limit=page_size)
+            self._index_add(index, page['ids'], np.asarray(page['embeddings'], dtype=np.float32),
+                            page['metadatas'])
+        if count:
+            index.save(index_dir)
+        print(f"Built {index.kind} index with {len(index)} vectors")
+        return index
+
+    def _read_live_pointer(self) -> Optional[str]:
+        try:
+            with open(self._pointer_path, 'r', encoding='utf-8') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _write_live_pointer(self, name: str):
+        tmp_path = self._pointer_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(name)
+        os.replace(tmp_path, self._pointer_path)
+
+    def _live(self):
+        """Return the (collection, index) pair searches should use, as one consistent read."""
+        with self._swap_lock:
+            return self.collection, self.index
+
+    @contextmanager
+    def _using_live(self):
+        """Yield the live (collection, index) pair, keeping the index open until the caller is done."""
+        with self._swap_lock:
+            collection, index = self.collection, self.index
+            if index is not None:
+                self._index_users[index] = self._index_users.get(index, 0) + 1
+        try:
+            yield collection, index
+        finally:
+            if index is not None:
+                self._release_index(index)
+
+    def _release_index(self, index: VectorIndex):
+        with self._swap_lock:
+            self._index_users[index] -= 1
+            if self._index_users[index]:
+                return
+            del self._index_users[index]
+            if index not in self._retired_indexes:
+                return
+            self._retired_indexes.discard(index)
+        index.close()
+
+    def _swap(self, collection, index: Optional[VectorIndex]):
+        with self._swap_lock:
+            old = self.index
+            self.collection, self.index = collection, index
+            retire = old is not None and old is not index
+            close_now = retire and not self._index_users.get(old)
+            if retire and not close_now:
+                # Searches still running on it close it when the last one finishes
+                self._retired_indexes.add(old)
+        self._invalidate_results()
+        if close_now:
+            old.close()
+        for listener in list(self._swap_listeners):
+            try:
+                listener(collection.name)
+            except Exception as e:
+                print(f"⚠ Could not switch side indexes to {collection.name}: {e}")
+
+    def add_swap_listener(self, listener: Callable[[str], None]):
+        """Call `listener(collection_name)` whenever a new collection goes live, so side
+        indexes built for that version (FAQ questions, product catalog) switch with it."""
+        self._swap_listeners.append(listener)
+
+    def version_suffix(self, collection_name: Optional[str] = None) -> str:
+        """Version tag of a collection (the live one by default): '_v<timestamp>_<pid>', or ''
+        for the unversioned base collection and for snapshots. Side indexes carry the same tag."""
+        if collection_name is None and self.snapshot is not None:
+            return ""
+        name = collection_name or self.collection.name
+        return name[len(self.collection_name):] if name.startswith(f"{self.collection_name}_v") else ""
+
+    def side_index_path(self, filename: str, collection_name: Optional[str] = None) -> str:
+        """Absolute path of a file-based side index of a collection version (the live one by
+        default), kept next to its vector index so it is removed along with that version.
+        A snapshot's side indexes live next to the snapshot file."""
+        if collection_name is None and self.snapshot is not None:
+            return os.path.join(os.path.dirname(os.path.abspath(self.snapshot.path)), filename)
+        return os.path.abspath(os.path.join(self._index_dir(collection_name or self.collection.name), filename))
+
+    def _invalidate_results(self):
+        """Forget cached search results after the live chunks changed."""
+        with self._cache_lock:
+            self._result_cache.clear()
+            self._cache_generation += 1
+
+    def refresh(self, interval: float = 5.0):
+        """Pick up a reindex published by another process (checked at most every `interval` s)."""
+        now = time.monotonic()
+        if self.snapshot is not None or now - self._pointer_checked_at < interval:
+            return
+        self._pointer_checked_at = now
+
+        live_name = self._read_live_pointer()
+        if not live_name or live_name == self.collection.name:
+            return
+        try:
+            collection = self.chroma_client.get_collection(name=live_name)
+        except Exception as e:
+            print(f"⚠ Could not switch to collection {live_name}: {e}")
+            return
+        index = self._open_index(collection) if self.index_type else None
+        self._swap(collection, index)
+        print(f"Switched to collection {live_name}")
+
+    @staticmethod
+    def _set_threads(threads: Optional[int]):
+        """Set torch's intra-op thread count (a no-op when untuned or unchanged)."""
+        if threads and torch.get_num_threads() != threads:
+            torch.set_num_threads(threads)
+
+    def use_bulk_threads(self):
+        """Switch torch to the tuned bulk thread count.
+
+        torch's thread count is process-wide, so this is for processes that
+        only ingest (ingest_data.py). Servers keep the query thread count set
+        at startup, including for background ingest jobs.
+        """
+        self._set_threads(self.tuning['bulk_threads'])
+
+    def encode(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """Embed texts into a contiguous, L2-normalized float32 matrix.
+
+        Normalization happens once here, so downstream code can use dot
+        products as cosine similarity without copying the vectors again.
+        """
+        batch_size = batch_size or self.tuning['encode_batch_size']
+        embeddings = self.model.encode(
+            texts,
+            batch_size=batch_size,
+            show_progress_bar=False,
+            device=self.device,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        )
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
+
+    def _call_backend(self, method, embeddings: np.ndarray, embeddings_arg: str, **kwargs):
+        """Hand embeddings to ChromaDB as an array, or as lists for releases that need them."""
+        if not self._backend_accepts_numpy:
+            embeddings = embeddings.tolist()
+        return method(**{embeddings_arg: embeddings}, **kwargs)
+
+    def add_embedded(self, collection, ids: List[str], embeddings: np.ndarray,
+                     documents: List[str], metadatas: List[Dict]):
+        """Add rows with precomputed embeddings to a side collection (e.g. FAQ questions).
+
+        Side collections live in this store's ChromaDB client but are not part
+        of the chunk index, so nothing else (caches, dedup, ANN index) changes.
+        """
+        self._call_backend(collection.add, np.asarray(embeddings, dtype=np.float32), 'embeddings',
+                           ids=ids, documents=documents, metadatas=metadatas)
+
     def _generate_id(self, text: str, source: str) -> str:
         """Generate unique ID for a document chunk."""
         content = f"{source}:{text}"
         return hashlib.md5(content.encode()).hexdigest()
 
-    def add_documents(self, documents: List[Dict[str, str]], batch_size: int = 10):
+    def chunk_id(self, doc: Dict[str, str]) -> str:
+        """ID a chunk dict ({'content', 'source', ...}) is stored under."""
+        return self._generate_id(doc['content'], doc['source'])
+
+    def set_aliases(self, aliases: Dict[str, List[str]], batch_size: int = 500):
+        """Record other sources of near-duplicate chunks in the canonical chunks' metadata.
+
+        Aliases are stored newline-separated under 'aliases' (ChromaDB metadata
+        values must be scalars).
+        """
+        if self.snapshot is not None:
+            raise RuntimeError("Vector store is serving a read-only snapshot")
+
+        with self._write_lock:
+            collection, _ = self._live()
+            self._write_aliases(collection, {doc_id: sources for doc_id, sources in aliases.items() if sources},
+                                batch_size)
+
+    @staticmethod
+    def _write_aliases(collection, aliases: Dict[str, List[str]], batch_size: int = 500):
+        """Overwrite the alias metadata of stored chunks (an empty list clears it)."""
+        ids = list(aliases)
+        for i in range(0, len(ids), batch_size):
+            stored = collection.get(ids=ids[i:i + batch_size], include=['metadatas'])
+            metadatas = [
+                dict(metadata, aliases="\n".join(aliases[doc_id]), alias_count=len(aliases[doc_id]))
+                for doc_id, metadata in zip(stored['ids'], stored['metadatas'])
+            ]
+            if metadatas:
+                collection.update(ids=stored['ids'], metadatas=metadatas)
+
+    def _dedup_for(self, collection) -> NearDuplicateFilter:
+        """Near-duplicate filter seeded with a collection's chunks and aliases (call under _dedup_lock)."""
+        if self._dedup is None or self._dedup_collection != collection.name:
+            dedup = NearDuplicateFilter(threshold=self.dedup_threshold, id_fn=self.chunk_id)
+            page_size = 5000
+            for offset in range(0, collection.count(), page_size):
+                page = collection.get(include=['documents', 'metadatas'], offset=offset, limit=page_size)
+                for doc_id, content, metadata in zip(page['ids'], page['documents'], page['metadatas']):
+                    aliases = metadata.get('aliases')
+                    dedup.remember(doc_id, content, metadata['source'], aliases.split("\n") if aliases else ())
+            self._dedup, self._dedup_collection = dedup, collection.name
+        return self._dedup
+
+    def add_documents(self, documents: Iterable[Dict[str, str]], batch_size: Optional[int] = None,
+                      on_batch: Optional[Callable[[int], None]] = None):
         """Add documents to the vector store with embeddings."""
-        texts = []
-        metadatas = []
-        ids = []
-
-        for doc in documents:
-            doc_id = self._generate_id(doc['content'], doc['source'])
-            texts.append(doc['content'])
-            metadatas.append({
-                'source': doc['source'],
-                'type': doc['type']
-            })
-            ids.append(doc_id)
+        if self.snapshot is not None:
+            raise RuntimeError("Vector store is serving a read-only snapshot")
+
+        with self._write_lock, self._using_live() as (collection, index):
+            try:
+                self._add_to(collection, index, documents, batch_size, on_batch)
+            finally:
+                # Persist whatever was added, even if on_batch stopped the loop early
+                if index is not None:
+                    index.save(self._index_dir(collection.name))
+
+    def _add_to(self, collection, index: Optional[VectorIndex], documents: Iterable[Dict[str, str]],
+                batch_size: Optional[int] = None, on_batch: Optional[Callable[[int], None]] = None) -> Set[str]:
+        """Embed documents into the given collection and index, one batch at a time.
+
+        Documents may be a generator (e.g. streamed PDF chunks); only one batch
+        is held in memory. A document carrying an 'embedding' (e.g. imported
+        from a snapshot) is stored with it instead of being embedded again, along
+        with its 'page' and alias metadata. Each batch is searchable as soon as it is added;
+        `on_batch(count)` is called after it commits. Returns the ids that were added.
+        The index is not saved here; callers persist it once they are done.
+        """
+        batch_size = batch_size or self.tuning['ingest_batch_size']
+        added = set()
+        documents = iter(documents)
 
         # Process in batches
-        for i in range(0, len(texts), batch_size):
-            batch_texts = texts[i:i + batch_size]
-            batch_metadatas = metadatas[i:i + batch_size]
-            batch_ids = ids[i:i + batch_size]
+        for batch_number in itertools.count(1):
+            batch = list(itertools.islice(documents, batch_size))
+            if not batch:
+                break
 
-            # Generate embeddings using local model
-            print(f"Generating embeddings for batch {i//batch_size + 1}... (device: {self.device})")
-            embeddings = self.model.encode(batch_texts, show_progress_bar=False, device=self.device)
+            batch_texts = [doc['content'] for doc in batch]
+            batch_ids = [self._generate_id(doc['content'], doc['source']) for doc in batch]
+            batch_metadatas = []
+            for doc in batch:
+                metadata = {'source': doc['source'], 'type': doc['type']}
+                for key in ('page', 'aliases', 'alias_count'):
+                    if doc.get(key) is not None:
+                        metadata[key] = doc[key]
+                batch_metadatas.append(metadata)
 
-            # Convert to list (move from GPU to CPU if needed)
-            if isinstance(embeddings, torch.Tensor):
-                embeddings = embeddings.cpu().numpy().tolist()
-            else:
-                embeddings = embeddings.tolist()
+            # Generate embeddings using local model (unless they came with the documents)
+            embeddings = [doc.get('embedding') for doc in batch]
+            missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+            if missing:
+                print(f"Generating embeddings for batch {batch_number}... (device: {self.device})")
+                for i, embedding in zip(missing, self.encode([batch_texts[i] for i in missing])):
+                    embeddings[i] = embedding
+            embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
 
             # Add to ChromaDB
-            self.collection.add(
-                embeddings=embeddings,
+            self._call_backend(
+                collection.add,
+                embeddings,
+                'embeddings',
                 documents=batch_texts,
                 metadatas=batch_metadatas,
                 ids=batch_ids
             )
 
+            # Incremental insert into the in-process index
+            if index is not None:
+                self._index_add(index, batch_ids, embeddings, batch_metadatas)
+
+            added.update(batch_ids)
             print(f"Added {len(batch_texts)} documents to vector store")
+            if collection is self.collection:
+                self._invalidate_results()
+            if on_batch is not None:
+                on_batch(len(batch_texts))
+        return added
+
+    @staticmethod
+    def _index_add(index: VectorIndex, ids: List[str], embeddings: np.ndarray, metadatas: List[Dict]):
+        """Insert into the in-process index; sharded indexes may place chunks by source."""
+        if isinstance(index, ShardedIndex):
+            index.add(ids, embeddings, keys=[metadata['source'] for metadata in metadatas])
+        else:
+            index.add(ids, embeddings)
+
+    def replace_source(self, source: str, documents: List[Dict[str, str]], batch_size: Optional[int] = None,
+                       on_batch: Optional[Callable[[int], None]] = None, persist: bool = True) -> Dict[str, int]:
+        """Replace the live chunks of one source, embedding only chunks that changed.
+
+        Pass an empty list to remove the source. Returns counts of added, removed
+        and duplicate (not embedded) chunks. With persist=False the index is left unsaved, so a caller
+        replacing many sources can call `save_index()` once at the end.
+
+        New chunks go through the same near-duplicate filter as full ingestion:
+        duplicates of live chunks become aliases instead of being embedded. When
+        a deleted chunk stood for near-duplicates elsewhere, its text is kept
+        under its first alias source, which becomes the canonical copy.
+
+        The update is all or nothing: new chunks are added first and the old ones
+        deleted only once every batch has committed. If embedding fails or
+        `on_batch` raises (a cancelled job), the chunks added so far are removed
+        again and the source keeps its previous chunks.
+        """
+        if self.snapshot is not None:
+            raise RuntimeError("Vector store is serving a read-only snapshot")
+
+        with self._write_lock, self._using_live() as (collection, index), self._dedup_lock:
+            existing = collection.get(where={'source': source}, include=['documents', 'metadatas'])
+            stored = {doc_id: (content, metadata) for doc_id, content, metadata
+                      in zip(existing['ids'], existing['documents'], existing['metadatas'])}
+            wanted = {self._generate_id(doc['content'], doc['source']): doc for doc in documents}
+
+            stale = [doc_id for doc_id in stored if doc_id not in wanted]
+            fresh = [doc for doc_id, doc in wanted.items() if doc_id not in stored]
+
+            dedup = self._dedup_for(collection)
+            # This source's chunks are matched again below, so it only stays an alias where it still duplicates
+            changed = set(dedup.drop_alias(source))
+            # The source's own chunks first, so a chunk that survived an edit stays canonical here
+            candidates = [(doc, []) for doc in fresh]
+            for doc_id in stale:
+                aliases = dedup.forget(doc_id)
+                if aliases:
+                    content, metadata = stored[doc_id]
+                    candidates.append(({'content': content, 'source': aliases[0], 'type': metadata['type']},
+                                       aliases[1:]))
+
+            kept = []
+            for doc, aliases in candidates:
+                canonical = dedup.canonical_id(doc)
+                if canonical is None:
+                    canonical = self.chunk_id(doc)
+                    kept.append(doc)
+                    if not aliases:
+                        continue
+                dedup.add_aliases(canonical, aliases)
+                changed.add(canonical)
+            stale_ids = set(stale)
+            alias_updates = {doc_id: list(dedup.aliases.get(doc_id, ())) for doc_id in changed
+                             if doc_id not in stale_ids}
+
+            try:
+                if kept:
+                    self._add_to(collection, index, kept, batch_size, on_batch)
+            except BaseException:
+                # Roll back the batches that did commit; the old chunks were not touched yet
+                added = collection.get(ids=[self.chunk_id(doc) for doc in kept], include=[])['ids']
+                if added:
+                    collection.delete(ids=added)
+                    if index is not None:
+                        index.remove(added)
+                    self._invalidate_results()
+                # The filter now lists chunks that were not stored; rebuild it next time
+                self._dedup = None
+                raise
+            if stale:
+                collection.delete(ids=stale)
+                if index is not None:
+                    index.remove(stale)
+                self._invalidate_results()
+            self._write_aliases(collection, alias_updates)
+            if persist and (stale or kept) and index is not None:
+                index.save(self._index_dir(collection.name))
+        return {'added': len(kept), 'removed': len(stale), 'duplicates': len(candidates) - len(kept)}
+
+    def exclusive_writes(self):
+        """Context manager holding off incremental writes from other threads (reentrant).
+
+        Use it around reading the source files and reindexing, so that a file
+        changed meanwhile is either in the new version or written to it afterwards.
+        """
+        return self._write_lock
+
+    def save_index(self):
+        """Persist the live in-process index (after replace_source(..., persist=False) calls)."""
+        if self.snapshot is not None:
+            return
+        with self._using_live() as (collection, index):
+            if index is not None:
+                index.save(self._index_dir(collection.name))
+
+    def reindex(self, documents: Iterable[Dict[str, str]], smoke_queries: Optional[List[str]] = None,
+                batch_size: Optional[int] = None, keep_versions: int = 2,
+                before_swap: Optional[Callable[[str], None]] = None) -> str:
+        """Rebuild the store into a new collection, validate it, then swap it in atomically.
+
+        Searches keep using the current collection until the new one is fully
+        built and validated; the previous version is kept for readers still
+        using it, and older versions are garbage-collected. `before_swap(name)`
+        runs after validation, to build side indexes for the new version; if it
+        fails, the new version is discarded like a failed validation. Incremental
+        writes (`add_documents`, `replace_source`) in this process wait for the
+        reindex to finish.
+
+        Returns:
+            Name of the new live collection.
+        """
+        if self.snapshot is not None:
+            raise RuntimeError("Vector store is serving a read-only snapshot")
+
+        # Incremental writes wait until the new version is live, then go to it
+        with self._write_lock:
+            new_name = f"{self.collection_name}_v{time.strftime('%Y%m%d%H%M%S')}_{os.getpid()}"
+            new_collection = self.chroma_client.create_collection(name=new_name)
+            new_index = None
+            if self.index_type:
+                new_index = create_index(self.index_type, self.model.get_sentence_embedding_dimension(),
+                                         **self.index_options)
+            print(f"Building collection {new_name}...")
+
+            try:
+                # Validate before going live: every unique chunk stored, smoke queries answered
+                expected = len(self._add_to(new_collection, new_index, documents, batch_size))
+                if new_index is not None:
+                    new_index.save(self._index_dir(new_name))
+                actual = new_collection.count()
+                if actual != expected:
+                    raise RuntimeError(f"Expected {expected} chunks in {new_name}, found {actual}")
+                if smoke_queries and expected:
+                    embeddings = self.encode(smoke_queries)
+                    for query, results in zip(smoke_queries, self._query(new_collection, new_index, embeddings, 1)):
+                        if not results:
+                            raise RuntimeError(f"Smoke query returned nothing: {query!r}")
+                if before_swap is not None:
+                    before_swap(new_name)
+            except Exception:
+                if new_index is not None:
+                    new_index.close()
+                self._remove_version(new_name, self._collection_names())
+                raise
+
+            self._swap(new_collection, new_index)
+            self._write_live_pointer(new_name)
+            print(f"✓ Collection {new_name} is live ({actual} chunks)")
+
+            self._collect_garbage(keep_versions)
+            return new_name
+
+    def _collection_names(self) -> List[str]:
+        return [c if isinstance(c, str) else c.name for c in self.chroma_client.list_collections()]
+
+    def _remove_version(self, name: str, all_names: List[str]):
+        """Delete a collection with its index directory and the side collections sharing its version tag."""
+        suffix = self.version_suffix(name)
+        for other in all_names:
+            if suffix and other != name and other.endswith(suffix):
+                self.chroma_client.delete_collection(name=other)
+        if name in all_names:
+            self.chroma_client.delete_collection(name=name)
+        shutil.rmtree(self._index_dir(name), ignore_errors=True)
+
+    def _collect_garbage(self, keep_versions: int):
+        """Delete old versioned collections, keeping the newest `keep_versions`."""
+        all_names = self._collection_names()
+        names = [n for n in all_names if n == self.collection_name or n.startswith(f"{self.collection_name}_v")]
+
+        live_name = self.collection.name
+        # Versioned names sort by build time; the unversioned base name is oldest
+        versions = sorted(n for n in names if n != self.collection_name)
+        stale = [n for n in names if n == self.collection_name] + versions[:-keep_versions]
+        for name in stale:
+            if name == live_name:
+                continue
+            self._remove_version(name, all_names)
+            print(f"Removed old collection {name}")
 
     def search(self, query: str, top_k: int = 3) -> List[Dict]:
         """Search for relevant documents using semantic similarity."""
-        # Generate query embedding using local model
-        query_embedding = self.model.encode([query], show_progress_bar=False, device=self.device)[0]
+        return self.search_batch([query], top_k=top_k)[0]
 
-        # Convert to list (move from GPU to CPU if needed)
-        if isinstance(query_embedding, torch.Tensor):
-            query_embedding = query_embedding.cpu().numpy().tolist()
-        else:
-            query_embedding = query_embedding.tolist()
+    def search_batch(self, queries: List[str], top_k: int = 3) -> List[List[Dict]]:
+        """Search for several queries at once (one encode pass, one ChromaDB query)."""
+        if not queries:
+            return []
+
+        # Generate query embeddings using local model
+        query_embeddings = self.encode_queries(queries)
+
+        return self.search_embeddings(query_embeddings, top_k=top_k)
+
+    @contextmanager
+    def _serving_query(self):
+        """Mark a user query as in flight (see `busy`)."""
+        with self._activity_lock:
+            self._queries_in_flight += 1
+        try:
+            yield
+        finally:
+            with self._activity_lock:
+                self._queries_in_flight -= 1
+                self._last_query_at = time.monotonic()
+
+    def busy(self, grace: float = 0.05) -> bool:
+        """True while user queries are running, or finished less than `grace` seconds ago."""
+        with self._activity_lock:
+            return self._queries_in_flight > 0 or time.monotonic() - self._last_query_at < grace
+
+    def encode_queries(self, queries: List[str]) -> np.ndarray:
+        """Embed user queries, reusing embeddings of recently seen (normalized) queries."""
+        keys = [normalize_query(q) for q in queries]
+        found: Dict[str, np.ndarray] = {}
+        with self._cache_lock:
+            for key in keys:
+                if key in self._embedding_cache:
+                    self._embedding_cache.move_to_end(key)
+                    found[key] = self._embedding_cache[key]
+            self.cache_stats['embedding_hits'] += sum(1 for key in keys if key in found)
+
+        missing = list(dict.fromkeys(k for k in keys if k not in found))
+        if missing:
+            with self._serving_query():
+                embeddings = self.encode(missing)
+            for key, embedding in zip(missing, embeddings):
+                found[key] = embedding
+            with self._cache_lock:
+                self.cache_stats['embedding_misses'] += len(missing)
+                for key in missing:
+                    self._embedding_cache[key] = found[key]
+                while len(self._embedding_cache) > self.query_cache_size:
+                    self._embedding_cache.popitem(last=False)
+
+        return np.ascontiguousarray([found[key] for key in keys], dtype=np.float32)
+
+    def cached_embedding(self, normalized_query: str) -> Optional[np.ndarray]:
+        """Embedding of a normalized query if it is cached (never computes one)."""
+        with self._cache_lock:
+            return self._embedding_cache.get(normalized_query)
+
+    def search_embeddings(self, query_embeddings: np.ndarray, top_k: int = 3) -> List[List[Dict]]:
+        """Search with precomputed query embeddings (one row per query).
+
+        Results are cached per (embedding, top_k) until the live chunks change.
+        """
+        # Switch to a reindex published by another process first; the swap
+        # clears the result cache, so no hit can come from the old collection
+        self.refresh()
+        keys = [(hashlib.blake2b(row.tobytes(), digest_size=16).digest(), top_k) for row in query_embeddings]
+        results: List[Optional[List[Dict]]] = [None] * len(keys)
+        with self._cache_lock:
+            generation = self._cache_generation
+            for i, key in enumerate(keys):
+                if key in self._result_cache:
+                    self._result_cache.move_to_end(key)
+                    results[i] = self._result_cache[key]
+            missing = [i for i, found in enumerate(results) if found is None]
+            self.cache_stats['result_hits'] += len(keys) - len(missing)
+            self.cache_stats['result_misses'] += len(missing)
+
+        if missing:
+            fresh = self._search_uncached(query_embeddings[missing], top_k)
+            with self._cache_lock:
+                for i, docs in zip(missing, fresh):
+                    results[i] = docs
+                    # Don't cache results computed against chunks that changed meanwhile
+                    if generation == self._cache_generation:
+                        self._result_cache[keys[i]] = docs
+                while len(self._result_cache) > self.query_cache_size:
+                    self._result_cache.popitem(last=False)
+
+        # Callers may annotate results (e.g. rerank scores); keep the cached copies clean
+        return [[dict(doc) for doc in docs] for docs in results]
+
+    def _search_uncached(self, query_embeddings: np.ndarray, top_k: int) -> List[List[Dict]]:
+        if self.snapshot is not None:
+            return self.snapshot.search(query_embeddings, top_k)
+
+        with self._using_live() as (collection, index), self._serving_query():
+            return self._query(collection, index, query_embeddings, top_k)
+
+    def _query(self, collection, index: Optional[VectorIndex], query_embeddings: np.ndarray,
+               top_k: int) -> List[List[Dict]]:
+        """Search one specific collection (and its index, if any)."""
+        if index is not None:
+            return self._search_index(collection, index, query_embeddings, top_k)
 
         # Query ChromaDB
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
+        results = self._call_backend(
+            collection.query,
+            query_embeddings,
+            'query_embeddings',
             n_results=top_k
         )
 
         # Format results
-        documents = []
-        if results['documents']:
-            for i in range(len(results['documents'][0])):
+        batch = []
+        for q in range(len(query_embeddings)):
+            documents = []
+            if results['documents']:
+                for i in range(len(results['documents'][q])):
+                    documents.append({
+                        'id': results['ids'][q][i],
+                        'content': results['documents'][q][i],
+                        'source': results['metadatas'][q][i]['source'],
+                        'type': results['metadatas'][q][i]['type'],
+                        'distance': results['distances'][q][i] if 'distances' in results else None
+                    })
+            batch.append(documents)
+
+        return batch
+
+    def _search_index(self, collection, index: VectorIndex, query_embeddings: np.ndarray,
+                      top_k: int) -> List[List[Dict]]:
+        """Search the in-process index, then fetch texts/metadata from ChromaDB."""
+        hits = index.search(query_embeddings, top_k)
+
+        unique_ids = list({doc_id for row in hits for doc_id, _ in row})
+        if not unique_ids:
+            return [[] for _ in hits]
+        stored = collection.get(ids=unique_ids, include=['documents', 'metadatas'])
+        by_id = {
+            doc_id: (content, metadata)
+            for doc_id, content, metadata in zip(stored['ids'], stored['documents'], stored['metadatas'])
+        }
+
+        batch = []
+        for row in hits:
+            documents = []
+            for doc_id, distance in row:
+                if doc_id not in by_id:
+                    continue
+                content, metadata = by_id[doc_id]
                 documents.append({
-                    'content': results['documents'][0][i],
-                    'source': results['metadatas'][0][i]['source'],
-                    'type': results['metadatas'][0][i]['type'],
-                    'distance': results['distances'][0][i] if 'distances' in results else None
+                    'id': doc_id,
+                    'content': content,
+                    'source': metadata['source'],
+                    'type': metadata['type'],
+                    'distance': distance
                 })
+            batch.append(documents)
 
-        return documents
+        return batch
 
     def clear_collection(self):
         """Clear all documents from the collection."""
+        if self.snapshot is not None:
+            raise RuntimeError("Vector store is serving a read-only snapshot")
         self.chroma_client.delete_collection(name=self.collection.name)
         self.collection = self.chroma_client.create_collection(name=self.collection.name)
+        if self.index is not None:
+            self.index.clear()
+            self.index.save(self._index_dir(self.collection.name))
+        self._invalidate_results()
         print("Collection cleared")
 
     def get_collection_count(self) -> int:
         """Get the number of documents in the collection."""
+        if self.snapshot is not None:
+            return len(self.snapshot)
         return self.collection.count()
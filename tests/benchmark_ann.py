@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark the approximate (HNSW) index against exact search on synthetic chunks.
+Reports build time, load time, recall@k and queries/second for several ef_search values.
+
+Usage:
+    python tests/benchmark_ann.py                      # 100k and 1M chunks
+    python tests/benchmark_ann.py --sizes 20000 --queries 200
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Add parent directory to Python path so imports work correctly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.ann_index import ExactIndex, HNSWIndex
+
+
+def synthetic_embeddings(n: int, dim: int, rng, n_topics: int = 200) -> np.ndarray:
+    """Clustered, L2-normalized vectors that resemble sentence embeddings."""
+    centers = rng.standard_normal((n_topics, dim)).astype(np.float32)
+    vectors = np.empty((n, dim), dtype=np.float32)
+    step = 100_000
+    for start in range(0, n, step):
+        end = min(start + step, n)
+        topics = rng.integers(0, n_topics, end - start)
+        vectors[start:end] = centers[topics] + 0.6 * rng.standard_normal((end - start, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def recall_at_k(approx, exact) -> float:
+    hits = sum(len({i for i, _ in a} & {i for i, _ in e}) for a, e in zip(approx, exact))
+    return hits / sum(len(e) for e in exact)
+
+
+def run(size: int, dim: int, n_queries: int, k: int, ef_values, rng):
+    print(f"\n{size:,} chunks x {dim} dims")
+    print("-" * 70)
+
+    vectors = synthetic_embeddings(size, dim, rng)
+    ids = [f"chunk-{i}" for i in range(size)]
+    queries = synthetic_embeddings(n_queries, dim, rng)
+
+    exact = ExactIndex(dim)
+    exact.add(ids, vectors)
+    start = time.perf_counter()
+    truth = []
+    for q in range(0, n_queries, 100):
+        truth.extend(exact.search(queries[q:q + 100], k))
+    exact_qps = n_queries / (time.perf_counter() - start)
+    print(f"  exact          recall@{k}=1.000  {exact_qps:10.0f} QPS (batches of 100)")
+
+    start = time.perf_counter()
+    hnsw = HNSWIndex(dim, max_elements=size)
+    for batch in range(0, size, 10_000):
+        hnsw.add(ids[batch:batch + 10_000], vectors[batch:batch + 10_000])
+    print(f"  hnsw build     {time.perf_counter() - start:.1f} s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        hnsw.save(tmp)
+        start = time.perf_counter()
+        hnsw = HNSWIndex.load(tmp)
+        print(f"  hnsw load      {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    for ef in ef_values:
+        hnsw.ef_search = ef
+        start = time.perf_counter()
+        approx = [hnsw.search(queries[q:q + 1], k)[0] for q in range(n_queries)]
+        qps = n_queries / (time.perf_counter() - start)
+        print(f"  hnsw ef={ef:<5d} recall@{k}={recall_at_k(approx, truth):.3f}  {qps:10.0f} QPS (single query)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ANN index benchmark")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--ef', type=int, nargs='+', default=[16, 32, 64, 128, 256])
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("ANN Index Benchmark (HNSW vs exact)")
+    print("=" * 70)
+
+    rng = np.random.default_rng(42)
+    for size in args.sizes:
+        run(size, args.dim, args.queries, args.k, args.ef, rng)
+
+
+if __name__ == "__main__":
+    main()
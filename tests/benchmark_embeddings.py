@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark the embedding handoff from the model to ChromaDB.
+Compares the old path (encode -> .tolist()) with the float32 array path
+used by VectorStore.encode, per query and per ingest batch, then times the
+handoff into ChromaDB itself (add and query with lists vs arrays).
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+import chromadb
+import numpy as np
+
+# Add parent directory to Python path so imports work correctly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.vector_store import VectorStore, chroma_accepts_numpy
+
+
+def legacy_handoff(vector_store, texts):
+    """Original path: encode, then convert to nested Python lists."""
+    embeddings = vector_store.model.encode(texts, show_progress_bar=False, device=vector_store.device)
+    return embeddings.tolist()
+
+
+def array_handoff(vector_store, texts):
+    """New path: contiguous normalized float32 matrix passed as-is."""
+    return vector_store.encode(texts)
+
+
+def measure(fn, vector_store, texts, repeats):
+    """Return (seconds per call, allocated blocks per call, peak bytes)."""
+    fn(vector_store, texts)  # warm up
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(vector_store, texts)
+    elapsed = (time.perf_counter() - start) / repeats
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = fn(vector_store, texts)
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.count_diff > 0)
+    del result
+    return elapsed, blocks, peak
+
+
+def measure_chroma(embeddings, documents, repeats):
+    """Seconds per add of a batch and per single query, for list and array embeddings."""
+    client = chromadb.EphemeralClient()
+    variants = [("lists (before)", lambda e: e.tolist())]
+    if chroma_accepts_numpy():
+        variants.append(("float32 array (after)", lambda e: e))
+
+    rows = []
+    for name, convert in variants:
+        add_times = []
+        for run in range(repeats):
+            collection = client.create_collection(f"handoff_{len(rows)}_{run}", metadata={"hnsw:space": "cosine"})
+            start = time.perf_counter()
+            collection.add(ids=[f"c{i}" for i in range(len(documents))], documents=documents,
+                           embeddings=convert(embeddings))
+            add_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        for _ in range(repeats * 10):
+            collection.query(query_embeddings=convert(embeddings[:1]), n_results=3)
+        query_time = (time.perf_counter() - start) / (repeats * 10)
+        rows.append((name, sum(add_times) / len(add_times), query_time))
+    return rows
+
+
+def main():
+    """Run the handoff benchmark."""
+    print("=" * 70)
+    print("Embedding Handoff Benchmark")
+    print("=" * 70)
+
+    vector_store = VectorStore()
+    print(f"Using device: {vector_store.device}")
+
+    query = ["How much does Buddy Bear cost?"]
+    batch = [f"Chunk {i}: Buddy Bear has a 10 hour battery and supports five languages." for i in range(64)]
+
+    for label, texts, repeats in [("Per query", query, 50), ("Per ingest batch (64 chunks)", batch, 5)]:
+        print(f"\n{label}:")
+        for name, fn in [("tolist (before)", legacy_handoff), ("float32 array (after)", array_handoff)]:
+            elapsed, blocks, peak = measure(fn, vector_store, texts, repeats)
+            print(f"  {name:24s} {elapsed * 1000:8.2f} ms  {blocks:7d} live allocations  peak {peak / 1024:8.1f} KiB")
+
+    sample = array_handoff(vector_store, batch)
+    print(f"\nArray dtype={sample.dtype}, contiguous={sample.flags['C_CONTIGUOUS']}, "
+          f"norm={np.linalg.norm(sample[0]):.4f}")
+
+    print(f"\nChromaDB {chromadb.__version__} handoff (add 64 chunks / query 1 vector):")
+    if not chroma_accepts_numpy():
+        print("  (this release needs lists; array path not available)")
+    for name, add_time, query_time in measure_chroma(sample, batch, repeats=5):
+        print(f"  {name:24s} add {add_time * 1000:8.2f} ms  query {query_time * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
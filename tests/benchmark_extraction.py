@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark Markdown/HTML text extraction on a large synthetic corpus.
+Compares the fast extractors in src/text_extraction.py with the original
+markdown -> HTML -> BeautifulSoup path (when those packages are installed).
+
+Usage:
+    python tests/benchmark_extraction.py
+    python tests/benchmark_extraction.py --docs 20000
+"""
+
+import argparse
+import glob
+import os
+import random
+import sys
+import time
+
+# Add parent directory to Python path so imports work correctly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src import text_extraction
+from src.text_extraction import markdown_to_text, html_to_text
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+def synthetic_markdown(n_docs: int, rng) -> list:
+    """Documents assembled from shuffled sections of the sample markdown."""
+    sections = []
+    for path in glob.glob(os.path.join(DATA_DIR, '**', '*.md'), recursive=True):
+        with open(path, 'r', encoding='utf-8') as f:
+            sections.extend(s for s in f.read().split('\n## ') if s.strip())
+
+    docs = []
+    for i in range(n_docs):
+        picked = rng.sample(sections, k=min(6, len(sections)))
+        docs.append(f"# Synthetic page {i}\n\n" + "\n\n## ".join(picked))
+    return docs
+
+
+def synthetic_html(n_docs: int, rng) -> list:
+    """Web pages with navigation chrome, scripts and a body of paragraphs and lists."""
+    words = "plush toy battery charge story voice bedtime shipping return warranty bear dragon rabbit".split()
+    docs = []
+    for i in range(n_docs):
+        paragraphs = "".join(
+            f"<h2>Section {j}</h2><p>{' '.join(rng.choices(words, k=60))} <a href='/p{j}'>more</a>.</p>"
+            f"<ul>{''.join(f'<li><b>{w}</b>: {w} details</li>' for w in rng.choices(words, k=5))}</ul>"
+            for j in range(8)
+        )
+        docs.append(
+            f"<html><head><title>Page {i}</title><style>p {{ margin: 0 }}</style>"
+            f"<script>var page = {i};</script></head><body>"
+            f"<header><nav><a href='/'>Home</a><a href='/shop'>Shop</a></nav></header>"
+            f"<main><h1>Support article {i}</h1>{paragraphs}</main>"
+            f"<footer>&copy; FluffyAI</footer></body></html>"
+        )
+    return docs
+
+
+def legacy_markdown(content: str) -> str:
+    import markdown
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup(markdown.markdown(content), 'html.parser').get_text()
+
+
+def legacy_html(content: str) -> str:
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(content, 'html.parser')
+    for element in soup(['script', 'style', 'nav', 'footer', 'header']):
+        element.decompose()
+    return soup.get_text()
+
+
+def stdlib_html(content: str) -> str:
+    """html_to_text forced onto the standard-library extractor."""
+    saved, text_extraction.lxml = text_extraction.lxml, None
+    try:
+        return html_to_text(content)
+    finally:
+        text_extraction.lxml = saved
+
+
+def measure(fn, docs) -> tuple:
+    """Return (seconds, MB/s) for extracting every document once."""
+    start = time.perf_counter()
+    for doc in docs:
+        fn(doc)
+    elapsed = time.perf_counter() - start
+    megabytes = sum(len(doc.encode('utf-8')) for doc in docs) / 1e6
+    return elapsed, megabytes / elapsed
+
+
+def main():
+    """Run the extraction benchmark."""
+    parser = argparse.ArgumentParser(description="Text extraction benchmark")
+    parser.add_argument('--docs', type=int, default=5000, help="Documents per corpus")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("Text Extraction Benchmark")
+    print("=" * 70)
+
+    rng = random.Random(0)
+    corpora = {
+        'markdown': (synthetic_markdown(args.docs, rng), [
+            ("markdown + BeautifulSoup (before)", legacy_markdown),
+            ("markdown_to_text (after)", markdown_to_text),
+        ]),
+        'html': (synthetic_html(args.docs, rng), [
+            ("BeautifulSoup html.parser (before)", legacy_html),
+            ("stdlib streaming extractor", stdlib_html),
+            ("lxml", html_to_text if text_extraction.lxml is not None else None),
+        ]),
+    }
+
+    for kind, (docs, extractors) in corpora.items():
+        size = sum(len(d.encode('utf-8')) for d in docs) / 1e6
+        print(f"\n{kind}: {len(docs)} documents, {size:.1f} MB")
+        baseline = None
+        for name, fn in extractors:
+            if fn is None:
+                print(f"  {name:36s} (not installed)")
+                continue
+            try:
+                elapsed, throughput = measure(fn, docs)
+            except ImportError as e:
+                print(f"  {name:36s} (skipped: {e})")
+                continue
+            baseline = baseline or elapsed
+            print(f"  {name:36s} {elapsed:7.2f} s  {throughput:7.1f} MB/s  {baseline / elapsed:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
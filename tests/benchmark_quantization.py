@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Compare the quantized indexes (int8, PQ) with the float32 exact index on synthetic chunks.
+Reports private memory per index, recall@k after re-scoring and queries/second.
+
+Usage:
+    python tests/benchmark_quantization.py                     # 100k chunks
+    python tests/benchmark_quantization.py --sizes 20000 --rescore 4 8 16
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Add parent directory to Python path so imports work correctly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.ann_index import ExactIndex, Int8Index, PQIndex, load_index
+from benchmark_ann import synthetic_embeddings, recall_at_k
+
+
+def timed_search(index, queries, k):
+    start = time.perf_counter()
+    results = [index.search(queries[q:q + 1], k)[0] for q in range(len(queries))]
+    return results, len(queries) / (time.perf_counter() - start)
+
+
+def run(size: int, dim: int, n_queries: int, k: int, rescore_values, rng):
+    print(f"\n{size:,} chunks x {dim} dims")
+    print("-" * 70)
+
+    vectors = synthetic_embeddings(size, dim, rng)
+    ids = [f"chunk-{i}" for i in range(size)]
+    queries = synthetic_embeddings(n_queries, dim, rng)
+
+    exact = ExactIndex(dim)
+    exact.add(ids, vectors)
+    truth, qps = timed_search(exact, queries, k)
+    float_bytes = size * dim * 4
+    print(f"  {'float32 exact':16s} {float_bytes / 1e6:8.1f} MB  recall@{k}=1.000  {qps:8.0f} QPS")
+
+    for cls in (Int8Index, PQIndex):
+        start = time.perf_counter()
+        index = cls(dim)
+        for batch in range(0, size, 10_000):
+            index.add(ids[batch:batch + 10_000], vectors[batch:batch + 10_000])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            index.save(tmp)
+            build = time.perf_counter() - start
+            index = load_index(tmp)
+            memory = index.memory_bytes()
+            print(f"  {cls.kind:16s} {memory / 1e6:8.1f} MB  ({float_bytes / memory:.1f}x smaller, "
+                  f"built in {build:.1f} s; float32 vectors memory-mapped for re-scoring)")
+
+            for rescore in rescore_values:
+                index.rescore = rescore
+                approx, qps = timed_search(index, queries, k)
+                print(f"    rescore={rescore:<4d}   recall@{k}={recall_at_k(approx, truth):.3f}  {qps:8.0f} QPS")
+            del index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantized index benchmark")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000])
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--rescore', type=int, nargs='+', default=[2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("Quantized Index Benchmark (int8 / PQ vs float32)")
+    print("=" * 70)
+
+    rng = np.random.default_rng(42)
+    for size in args.sizes:
+        run(size, args.dim, args.queries, args.k, args.rescore, rng)
+
+
+if __name__ == "__main__":
+    main()
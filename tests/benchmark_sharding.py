@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Compare scatter-gather search over sharded exact indexes with a single exact index.
+Reports queries/second and median single-query latency per shard count, for
+thread-backed and (optionally) process-backed shards.
+
+Usage:
+    python tests/benchmark_sharding.py                        # 200k chunks, 1/2/4/8 shards
+    python tests/benchmark_sharding.py --sizes 50000 --shards 1 4 --processes
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add parent directory to Python path so imports work correctly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.ann_index import ExactIndex, ShardedIndex
+from benchmark_ann import synthetic_embeddings, recall_at_k
+
+
+def timed_search(index, queries, k):
+    latencies, results = [], []
+    for q in range(len(queries)):
+        start = time.perf_counter()
+        results.append(index.search(queries[q:q + 1], k)[0])
+        latencies.append(time.perf_counter() - start)
+    return results, len(queries) / sum(latencies), float(np.median(latencies)) * 1000
+
+
+def run(size: int, dim: int, n_queries: int, k: int, shard_counts, processes: bool, rng):
+    print(f"\n{size:,} chunks x {dim} dims ({os.cpu_count()} cores)")
+    print("-" * 70)
+
+    vectors = synthetic_embeddings(size, dim, rng)
+    ids = [f"chunk-{i}" for i in range(size)]
+    queries = synthetic_embeddings(n_queries, dim, rng)
+
+    exact = ExactIndex(dim)
+    exact.add(ids, vectors)
+    truth, qps, p50 = timed_search(exact, queries, k)
+    print(f"  {'single index':22s} {qps:8.0f} QPS  p50 {p50:6.2f} ms")
+
+    modes = [False, True] if processes else [False]
+    for use_processes in modes:
+        for shards in shard_counts:
+            index = ShardedIndex(dim, shards=shards, processes=use_processes)
+            for batch in range(0, size, 10_000):
+                index.add(ids[batch:batch + 10_000], vectors[batch:batch + 10_000])
+            results, qps, p50 = timed_search(index, queries, k)
+            label = f"{shards} shards ({'processes' if use_processes else 'threads'})"
+            print(f"  {label:22s} {qps:8.0f} QPS  p50 {p50:6.2f} ms  "
+                  f"recall@{k}={recall_at_k(results, truth):.3f}")
+            index.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded index benchmark")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[200_000])
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--processes', action='store_true', help="Also benchmark process-backed shards")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("Sharded Index Benchmark (scatter-gather vs single exact index)")
+    print("=" * 70)
+
+    rng = np.random.default_rng(42)
+    for size in args.sizes:
+        run(size, args.dim, args.queries, args.k, args.shards, args.processes, rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Tests for admission control in front of LLM calls.
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# Add parent directory to Python path so imports work correctly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.admission import AdmissionController, Cancelled, Overloaded
+
+
+def _hold(controller, release, admitted):
+    """Take a slot and keep it until `release` is set."""
+    with controller.slot():
+        admitted.set()
+        release.wait(5)
+
+
+def _occupy(controller, count):
+    release = threading.Event()
+    threads = []
+    for _ in range(count):
+        admitted = threading.Event()
+        thread = threading.Thread(target=_hold, args=(controller, release, admitted), daemon=True)
+        thread.start()
+        assert admitted.wait(2)
+        threads.append(thread)
+    return release, threads
+
+
+def test_rejects_immediately_when_queue_full():
+    controller = AdmissionController(max_concurrent=2, max_queue=0, queue_timeout=5)
+    release, threads = _occupy(controller, 2)
+
+    start = time.perf_counter()
+    with pytest.raises(Overloaded) as exc:
+        controller.acquire()
+    assert exc.value.reason == 'queue_full'
+    assert time.perf_counter() - start < 0.05
+
+    release.set()
+    for thread in threads:
+        thread.join()
+    stats = controller.get_stats()
+    assert stats['active'] == 0
+    assert stats['admitted'] == 2
+    assert stats['rejected'] == 1
+
+
+def test_queued_request_times_out():
+    controller = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=0.2)
+    release, threads = _occupy(controller, 1)
+
+    with pytest.raises(Overloaded) as exc:
+        controller.acquire()
+    assert exc.value.reason == 'timeout'
+    assert controller.get_stats()['queue_depth'] == 0
+
+    release.set()
+    threads[0].join()
+
+
+def test_queued_request_gets_freed_slot():
+    controller = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=5)
+    release, threads = _occupy(controller, 1)
+
+    waited = []
+    waiter = threading.Thread(target=lambda: (waited.append(controller.acquire()), controller.release()))
+    waiter.start()
+    time.sleep(0.1)
+    assert controller.get_stats()['queue_depth'] == 1
+
+    release.set()
+    waiter.join(2)
+    assert waited and waited[0] >= 0.1
+    assert controller.get_stats()['peak_queue'] == 1
+
+
+def test_disconnected_client_leaves_queue():
+    controller = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=5)
+    release, threads = _occupy(controller, 1)
+
+    gone = threading.Event()
+    threading.Timer(0.1, gone.set).start()
+    start = time.perf_counter()
+    with pytest.raises(Cancelled):
+        controller.acquire(should_cancel=gone.is_set)
+    assert time.perf_counter() - start < 1.0
+    assert controller.get_stats()['cancelled'] == 1
+
+    release.set()
+    threads[0].join()
+
+
+if __name__ == "__main__":
+    test_rejects_immediately_when_queue_full()
+    test_queued_request_times_out()
+    test_queued_request_gets_freed_slot()
+    test_disconnected_client_leaves_queue()
@@ -0,0 +1,225 @@
+"""
+Tests for the in-process vector indexes (needs numpy; HNSW checks need hnswlib).
+"""
+
+import os
+import sys
+import tempfile
+import threading
+
+import numpy as np
+
+# Add parent directory to Python path so imports work correctly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src import ann_index
+from src.ann_index import ExactIndex, HNSWIndex, Int8Index, PQIndex, ShardedIndex, load_index
+
+
+def _data(n=500, dim=16):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    return [f"id{i}" for i in range(n)], vectors
+
+
+def test_exact_index_search_remove_and_persist():
+    """Exact search finds the query's own vector; removals and save/load work."""
+    ids, vectors = _data()
+    index = ExactIndex(vectors.shape[1])
+    index.add(ids, vectors)
+    index.add(ids[:10], vectors[:10])  # duplicates are ignored
+    assert len(index) == len(ids)
+
+    assert index.search(vectors[7:8], 3)[0][0][0] == "id7"
+
+    index.remove(["id7"])
+    assert index.search(vectors[7:8], 1)[0][0][0] != "id7"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index.save(tmp)
+        reloaded = load_index(tmp)
+        assert len(reloaded) == len(ids) - 1
+        assert reloaded.search(vectors[3:4], 1)[0][0][0] == "id3"
+
+
+def test_hnsw_matches_exact_top1():
+    """HNSW agrees with exact search on easy queries and survives a reload."""
+    if ann_index.hnswlib is None:
+        print("hnswlib not installed, skipping")
+        return
+
+    ids, vectors = _data()
+    index = HNSWIndex(vectors.shape[1], max_elements=100)  # forces a resize
+    index.add(ids, vectors)
+    index.remove(["id0"])
+    index.add(["new"], vectors[:1])
+
+    assert index.search(vectors[5:6], 1)[0][0][0] == "id5"
+    assert index.search(vectors[:1], 1)[0][0][0] == "new"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index.save(tmp)
+        reloaded = load_index(tmp)
+        assert len(reloaded) == len(ids)
+        assert reloaded.search(vectors[5:6], 1)[0][0][0] == "id5"
+
+
+def test_quantized_indexes_rescore_exactly():
+    """int8/PQ return exact float32 distances for re-scored hits, before and after a reload."""
+    ids, vectors = _data(n=2000, dim=32)
+    exact = ExactIndex(32)
+    exact.add(ids, vectors)
+
+    for index in (Int8Index(32), PQIndex(32, m=8, rescore=16)):
+        index.add(ids[:1000], vectors[:1000])
+        index.add(ids[1000:], vectors[1000:])
+        index.remove(["id7"])
+
+        queries = vectors[:20]
+        truth = exact.search(queries, 5)
+        hits = index.search(queries, 5)
+        assert hits[3][0][0] == truth[3][0][0]
+        assert abs(hits[3][1][1] - truth[3][1][1]) < 1e-4     # exact distance after re-scoring
+        assert "id7" not in {doc_id for row in hits for doc_id, _ in row}
+        overlap = sum(len({i for i, _ in h} & {i for i, _ in t}) for h, t in zip(hits[8:], truth[8:]))
+        assert overlap / (5 * 12) >= 0.9, index.kind
+
+        with tempfile.TemporaryDirectory() as tmp:
+            index.save(tmp)
+            reloaded = load_index(tmp)
+            assert type(reloaded) is type(index)
+            assert len(reloaded) == len(ids) - 1
+            assert reloaded.search(queries[3:4], 1)[0][0][0] == truth[3][0][0]
+
+            # Inserts after a reload go to memory alongside the mapped vectors
+            reloaded.add(["id7"], vectors[7:8])
+            assert reloaded.search(vectors[7:8], 1)[0][0][0] == "id7"
+            assert reloaded.memory_bytes() < len(ids) * 32 * 4
+            del reloaded
+
+
+def test_pq_retrains_as_the_index_grows():
+    """Codebooks trained on a small first batch are retrained in the background once the index doubles."""
+    ids, vectors = _data(n=2000, dim=32)
+    index = PQIndex(32, m=8, rescore=16)
+    index.add(ids[:300], vectors[:300])
+    assert index.search(vectors[5:6], 1)[0][0][0] == "id5"  # float32 scoring until the first training
+    index.train()                                           # waits for the fit the add started
+    first_codebooks = index._codebooks
+    assert index._trained_count == 300
+
+    index.add(ids[300:500], vectors[300:500])
+    index.train()
+    assert index._codebooks is first_codebooks          # below 2x: new vectors use the old codebooks
+
+    # Searches keep serving from the old codebooks while the retrain is fitting
+    fitting, release = threading.Event(), threading.Event()
+    fit = index._fit
+
+    def slow_fit(sample):
+        fitting.set()
+        release.wait(5)
+        return fit(sample)
+
+    index._fit = slow_fit
+    index.add(ids[500:], vectors[500:])
+    assert fitting.wait(5)
+    assert index.search(vectors[1500:1501], 1)[0][0][0] == "id1500"
+    assert index._codebooks is first_codebooks
+    release.set()
+    index.train()
+    assert index._codebooks is not first_codebooks and index._trained_count == 2000
+    assert index.search(vectors[1500:1501], 1)[0][0][0] == "id1500"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index.save(tmp)
+        assert load_index(tmp)._trained_count == 2000
+
+
+def test_sharded_index_matches_exact():
+    """Scatter-gather over shards returns the same global top-k as one exact index."""
+    ids, vectors = _data(n=1000)
+    exact = ExactIndex(16)
+    exact.add(ids, vectors)
+    queries = vectors[:25] + 0.1
+
+    index = ShardedIndex(16, shards=4)
+    index.add(ids[:600], vectors[:600])
+    index.add(ids[600:], vectors[600:])
+    index.add(ids[:5], vectors[:5])  # duplicates are ignored
+    assert len(index) == len(ids) and min(index.shard_sizes()) > 150
+
+    hits, truth = index.search(queries, 5), exact.search(queries, 5)
+    assert [[i for i, _ in row] for row in hits] == [[i for i, _ in row] for row in truth]
+    assert abs(hits[0][0][1] - truth[0][0][1]) < 1e-4
+
+    index.remove(["id3"])
+    assert index.search(vectors[3:4], 1)[0][0][0] != "id3"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index.save(tmp)
+        reloaded = load_index(tmp)
+        assert isinstance(reloaded, ShardedIndex) and len(reloaded) == len(ids) - 1
+        assert reloaded.search(queries, 5)[7] == hits[7]
+        assert reloaded.shard_sizes() == index.shard_sizes()
+    index.close()
+
+
+def test_sharded_index_by_source_and_processes():
+    """by='source' keeps a source on one shard; shards can run in worker processes."""
+    ids, vectors = _data(n=200)
+    sources = [f"brand{i % 3}.pdf" for i in range(len(ids))]
+    index = ShardedIndex(16, shards=3, by='source', processes=True)
+    try:
+        index.add(ids, vectors, keys=sources)
+        shard_of = {}
+        for doc_id, source in zip(ids, sources):
+            assert shard_of.setdefault(source, index._assigned[doc_id]) == index._assigned[doc_id]
+        assert sum(index.shard_sizes()) == len(ids)
+        assert index.search(vectors[9:10], 1)[0][0][0] == "id9"
+    finally:
+        index.close()
+
+
+def test_searches_run_safely_during_writes():
+    """Concurrent add/remove/save never break a search or pair an id with another vector."""
+    ids, vectors = _data(n=400)
+    vector_of = dict(zip(ids, vectors))
+    for index in (ExactIndex(vectors.shape[1]), Int8Index(vectors.shape[1]), PQIndex(vectors.shape[1], m=4)):
+        index.add(ids, vectors)
+        stop = threading.Event()
+        errors = []
+
+        def churn(tmp):
+            try:
+                for round_number in range(30):
+                    index.remove(ids[::2])
+                    index.add(ids[::2], vectors[::2])
+                    if round_number % 10 == 0:
+                        index.save(tmp)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                stop.set()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            writer = threading.Thread(target=churn, args=(tmp,))
+            writer.start()
+            while not stop.is_set():
+                for query, hits in zip(vectors[:8], index.search(vectors[:8], 5)):
+                    for doc_id, distance in hits:
+                        expected = float(np.sum((vector_of[doc_id] - query) ** 2))
+                        assert abs(distance - expected) < 1e-3 * max(1.0, expected)
+            writer.join()
+        assert not errors and len(index) == len(ids)
+
+
+if __name__ == "__main__":
+    test_exact_index_search_remove_and_persist()
+    test_hnsw_matches_exact_top1()
+    test_quantized_indexes_rescore_exactly()
+    test_pq_retrains_as_the_index_grows()
+    test_sharded_index_matches_exact()
+    test_sharded_index_by_source_and_processes()
+    print("✓ ANN index tests passed")
+    test_searches_run_safely_during_writes()
@@ -0,0 +1,81 @@
+"""
+Tests for the embedding thread/batch autotuner.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to Python path so imports work correctly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src import autotune
+from src.autotune import load_or_tune, load_profile, thread_candidates, tune
+
+
+class _FakeModel:
+    """Encode cost depends on the thread count: 2 threads suit queries, 4 threads and batch 32 suit bulk."""
+
+    def __init__(self):
+        self.threads = 1
+        self.encodes = 0
+
+    def get_threads(self):
+        return self.threads
+
+    def set_threads(self, threads):
+        self.threads = threads
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        self.encodes += 1
+        if len(texts) == 1:
+            time.sleep(0.002 if self.threads == 2 else 0.004)
+        else:
+            time.sleep(0.002 if (self.threads, batch_size) == (4, 32) else 0.008)
+
+
+def _tune(model, **kwargs):
+    return tune(model, "fake-model", thread_counts=[1, 2, 4], batch_sizes=(16, 32), bulk_texts=8,
+                query_repeats=3, set_threads=model.set_threads, get_threads=model.get_threads, **kwargs)
+
+
+def test_thread_candidates_split_cores_between_workers():
+    assert thread_candidates(16) == [1, 2, 4, 8, 16]
+    assert thread_candidates(16, workers=4) == [1, 2, 4]
+    assert thread_candidates(12, workers=2) == [1, 2, 4, 6]
+    assert thread_candidates(2, workers=8) == [1]
+
+
+def test_picks_fastest_settings_per_workload():
+    model = _FakeModel()
+    model.threads = 7
+    profile = _tune(model)
+
+    assert profile['query_threads'] == 2
+    assert profile['bulk_threads'] == 4
+    assert profile['encode_batch_size'] == 32
+    assert profile['ingest_batch_size'] == 64
+    assert model.threads == 7  # restored after benchmarking
+
+
+def test_profile_is_saved_and_reused():
+    with tempfile.TemporaryDirectory() as tmp:
+        model = _FakeModel()
+        options = dict(thread_counts=[1, 2, 4], batch_sizes=(16, 32), bulk_texts=8, query_repeats=3,
+                       set_threads=model.set_threads, get_threads=model.get_threads)
+        first = load_or_tune(model, "org/fake model", directory=tmp, **options)
+        encodes = model.encodes
+        second = load_or_tune(model, "org/fake model", directory=tmp, **options)
+
+        assert second == first
+        assert model.encodes == encodes          # loaded, not re-benchmarked
+        assert os.listdir(tmp) == [os.path.basename(autotune.profile_path("org/fake model", tmp))]
+        # A profile tuned for a different packing of workers is not reused
+        assert load_profile("org/fake model", workers=4, directory=tmp) is None
+
+
+if __name__ == "__main__":
+    test_thread_candidates_split_cores_between_workers()
+    test_picks_fastest_settings_per_workload()
+    test_profile_is_saved_and_reused()
@@ -0,0 +1,122 @@
+"""
+Tests for bulk offline ticket answering.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Add parent directory to Python path so imports work correctly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.batch_answer import BatchAnswerer, RateLimiter, completed_ids, read_tickets
+
+
+class _FakeVectorStore:
+    def __init__(self):
+        self.batches = []
+
+    def search_batch(self, queries, top_k=3):
+        self.batches.append(len(queries))
+        return [[{'content': f"about {q}", 'source': f"doc-{q}.txt"}] for q in queries]
+
+
+class _FakeChatbot:
+    """Stands in for HelpdeskChatbot: prompt helpers plus a slow, flaky LLM."""
+
+    def __init__(self, fail_first=()):
+        self.vector_store = _FakeVectorStore()
+        self.top_k = 3
+        self.reranker = None
+        self.rerank_candidates = 12
+        self.product_catalog = None
+        self.fail_first = set(fail_first)
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def _context_block(self, results):
+        return "\n".join(doc['content'] for doc in results)
+
+    def _build_messages(self, history, context=None, product_rows=()):
+        return [{"role": "system", "content": context}] + history
+
+    def _complete(self, messages, should_cancel=None):
+        question = messages[-1]['content']
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(0.01)
+            if question in self.fail_first:
+                self.fail_first.discard(question)
+                raise RuntimeError("upstream hiccup")
+            return f"Answer to {question}"
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def _write_tickets(path, count):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(count):
+            f.write(json.dumps({'id': f"T{i}", 'question': f"q{i}"}) + "\n")
+        f.write("not json\n")
+
+
+def test_answers_backlog_in_batches_with_bounded_concurrency():
+    chatbot = _FakeChatbot(fail_first={"q7"})
+    with tempfile.TemporaryDirectory() as tmp:
+        tickets_path, output_path = os.path.join(tmp, "tickets.jsonl"), os.path.join(tmp, "out.jsonl")
+        _write_tickets(tickets_path, 100)
+
+        answerer = BatchAnswerer(chatbot, batch_size=32, concurrency=4, max_retries=2)
+        stats = answerer.run(read_tickets(tickets_path), output_path)
+
+        with open(output_path, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+
+    assert chatbot.vector_store.batches == [32, 32, 32, 4]
+    assert chatbot.peak <= 4
+    assert stats['answered'] == 100 and stats['failed'] == 0
+    assert stats['retries'] == 1
+    assert sorted(r['id'] for r in records) == sorted(f"T{i}" for i in range(100))
+    assert next(r for r in records if r['id'] == "T7") == {
+        'id': "T7", 'question': "q7", 'sources': ["doc-q7.txt"], 'answer': "Answer to q7"}
+
+
+def test_resumes_from_output_file():
+    with tempfile.TemporaryDirectory() as tmp:
+        tickets_path, output_path = os.path.join(tmp, "tickets.jsonl"), os.path.join(tmp, "out.jsonl")
+        _write_tickets(tickets_path, 10)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            for i in range(6):
+                f.write(json.dumps({'id': f"T{i}", 'answer': "done"}) + "\n")
+            f.write(json.dumps({'id': "T6", 'error': "failed last time"}) + "\n")
+            f.write('{"id": "T7", "ans')  # cut short by a crash
+
+        chatbot = _FakeChatbot()
+        stats = BatchAnswerer(chatbot, batch_size=8).run(read_tickets(tickets_path), output_path)
+        done = completed_ids(output_path)
+
+    assert stats['skipped'] == 6
+    assert stats['answered'] == 4
+    assert chatbot.vector_store.batches == [4]
+    assert done == {f"T{i}" for i in range(10)}
+
+
+def test_rate_limiter_spaces_calls():
+    limiter = RateLimiter(requests_per_minute=1200)  # one call every 50 ms
+    start = time.monotonic()
+    for _ in range(5):
+        limiter.acquire()
+    assert time.monotonic() - start >= 0.19
+
+
+if __name__ == "__main__":
+    test_answers_backlog_in_batches_with_bounded_concurrency()
+    test_resumes_from_output_file()
+    test_rate_limiter_spaces_calls()
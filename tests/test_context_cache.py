@@ -0,0 +1,70 @@
+"""
+Tests for the prompt context block cache.
+"""
+
+import os
+import sys
+
+# Add parent directory to Python path so imports work correctly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.context_cache import ContextCache, chunk_key, estimate_tokens
+
+
+def _docs(*ids):
+    return [{'id': i, 'source': f"{i}.md", 'content': f"text of {i}"} for i in ids]
+
+
+class _Builder:
+    """Renders blocks like HelpdeskChatbot and counts how often it is called."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, results):
+        self.calls += 1
+        text = "\n\n---\n\n".join(f"[Source {n}: {d['source']}]\n{d['content']}" for n, d in enumerate(results, 1))
+        return text, {"role": "system", "content": "Context:\n\n" + text}
+
+
+def test_same_chunk_set_reuses_identical_message():
+    builder = _Builder()
+    cache = ContextCache(prefix_tokens=100)
+
+    first = cache.get(_docs("a", "b"), builder)
+    again = cache.get(_docs("a", "b"), builder)
+    reordered = cache.get(_docs("b", "a"), builder)  # source numbering differs, so a new block
+
+    assert builder.calls == 2
+    assert again.message is first.message  # byte-identical prefix for upstream caching
+    assert reordered.text.startswith("[Source 1: b.md]")
+    assert first.tokens == estimate_tokens(first.message['content']) > 0
+
+    stats = cache.get_stats()
+    assert stats['hits'] == 1 and stats['lookups'] == 3
+    assert abs(stats['prefix_reuse_rate'] - 1 / 3) < 1e-9
+    assert stats['bytes_saved'] == len(first.message['content'].encode())
+    assert stats['prefix_tokens_reused'] == 100 + first.tokens
+
+
+def test_eviction_disabled_cache_and_keys_without_ids():
+    builder = _Builder()
+    cache = ContextCache(max_entries=2)
+    for ids in (("a",), ("b",), ("c",), ("a",)):
+        cache.get(_docs(*ids), builder)
+    assert builder.calls == 4 and len(cache) == 2  # "a" was evicted before it came back
+
+    disabled = ContextCache(max_entries=0)
+    disabled.get(_docs("a"), builder)
+    disabled.get(_docs("a"), builder)
+    assert len(disabled) == 0 and disabled.get_stats()['hits'] == 0
+
+    no_ids = [{'source': "faq.md", 'content': "Returns within 30 days."}]
+    assert chunk_key(no_ids) == chunk_key([dict(no_ids[0])])
+    assert chunk_key(no_ids) != chunk_key([{'source': "faq.md", 'content': "Returns within 60 days."}])
+    assert chunk_key([]) == ()
+
+
+if __name__ == "__main__":
+    test_same_chunk_set_reuses_identical_message()
+    test_eviction_disabled_cache_and_keys_without_ids()
@@ -0,0 +1,167 @@
+"""
+Tests for the site crawler against a local HTTP server serving a synthetic site.
+"""
+
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+# Add parent directory to Python path so imports work correctly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.crawler import Crawler, normalize_url, parse_sitemap
+
+SITE_PAGES = 3000
+
+
+def _page_html(n):
+    """Page n links to a binary tree of pages, a mirror, a private page and off-site URLs."""
+    links = [f"/page/{child}" for child in (2 * n + 1, 2 * n + 2) if child < SITE_PAGES]
+    links += [f"/mirror/{n}", f"/private/{n}", "http://elsewhere.invalid/about",
+              f"/page/{(n + 1) % SITE_PAGES}?utm_source=nav#top", "/logo.png", "mailto:help@example.com"]
+    anchors = "".join(f'<li><a href="{href}">link</a></li>' for href in links)
+    return (f"<html><head><title>Page {n}</title></head><body>"
+            f"<nav><ul>{anchors}</ul></nav>"
+            f"<h1>Support article {n}</h1><p>Answer number {n} about plush toy care.</p>"
+            f"</body></html>")
+
+
+class _SiteHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, content_type="text/html; charset=utf-8"):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        host = f"http://{self.headers['Host']}"
+        if path == "/robots.txt":
+            return self._send(200, "User-agent: *\nDisallow: /private/\n", "text/plain")
+        if path == "/sitemap_index.xml":
+            return self._send(200, f'<?xml version="1.0"?><sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                                   f'<sitemap><loc>{host}/sitemap.xml</loc></sitemap></sitemapindex>',
+                              "application/xml")
+        if path == "/sitemap.xml":
+            urls = "".join(f"<url><loc>{host}/page/{n}</loc></url>" for n in range(2000, 2010))
+            return self._send(200, f'<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                                   f'{urls}</urlset>', "application/xml")
+
+        kind, _, number = path.strip('/').partition('/')
+        if kind == 'away' and number.isdigit():
+            # Same server under another host name, so off the crawl's hosts
+            self.send_response(302)
+            self.send_header("Location", f"http://localhost:{self.server.server_address[1]}/page/{number}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if kind in ('page', 'mirror', 'private') and number.isdigit() and int(number) < SITE_PAGES:
+            return self._send(200, _page_html(int(number)))
+        self._send(404, "not found")
+
+
+class _Site:
+    def __enter__(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _SiteHandler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def test_normalize_url():
+    assert normalize_url("HTTP://Example.COM:80/a?b=2&utm_source=x&a=1#frag") == "http://example.com/a?a=1&b=2"
+    assert normalize_url("../faq", base="https://example.com/help/shipping") == "https://example.com/faq"
+    assert normalize_url("https://example.com") == "https://example.com/"
+    assert normalize_url("mailto:help@example.com") is None
+    assert normalize_url("/logo.png", base="https://example.com/") is None
+    assert normalize_url("https://example.com/r?ref=nav&refund_id=7&referrer=x") == \
+        "https://example.com/r?referrer=x&refund_id=7"
+
+
+def test_parse_sitemap_index_and_urlset():
+    index = b'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"><sitemap><loc>https://a/s1.xml</loc></sitemap></sitemapindex>'
+    assert parse_sitemap(index) == ([], ["https://a/s1.xml"])
+    urlset = b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"><url><loc> https://a/p </loc></url></urlset>'
+    assert parse_sitemap(urlset) == (["https://a/p"], [])
+
+
+def test_crawls_whole_site_once():
+    """Every page is yielded once; mirrors, private and off-site pages are not."""
+    with _Site() as site:
+        crawler = Crawler([f"{site.url}/page/0"], max_pages=10000, max_depth=20, concurrency=16)
+        docs = list(crawler.crawl())
+
+    sources = [doc['source'] for doc in docs]
+    assert len(docs) == SITE_PAGES
+    assert len(set(sources)) == SITE_PAGES
+    assert all(urlsplit(s).path.startswith(("/page/", "/mirror/")) for s in sources)
+    assert all(doc['content'].startswith(f"Page ") for doc in docs)
+    assert "Home" not in docs[0]['content']
+
+    stats = crawler.get_stats()
+    assert stats['duplicates'] == SITE_PAGES          # every mirror matched its page
+    assert stats['robots_blocked'] == SITE_PAGES      # every /private/ link skipped
+    assert stats['errors'] == 0
+
+
+def test_depth_and_page_limits():
+    with _Site() as site:
+        shallow = list(Crawler([f"{site.url}/page/0"], max_depth=2, concurrency=4).crawl())
+        limited = Crawler([f"{site.url}/page/0"], max_pages=50, max_depth=20, concurrency=4)
+        capped = list(limited.crawl())
+
+    # Depth 0: page 0; depth 1: pages 1, 2 (+ page 1 again via the next-link); depth 2: pages 3-6
+    assert sorted(int(d['source'].rsplit('/', 1)[1]) for d in shallow) == list(range(7))
+    assert limited.get_stats()['fetched'] <= 50
+    assert len(capped) <= 50
+
+
+def test_sitemap_seeds():
+    """Pages listed in a sitemap (found through a sitemap index) are crawled as seeds."""
+    with _Site() as site:
+        crawler = Crawler([], sitemaps=[f"{site.url}/sitemap_index.xml"], max_depth=0)
+        docs = list(crawler.crawl())
+
+    assert sorted(d['source'] for d in docs) == sorted(f"{site.url}/page/{n}" for n in range(2000, 2010))
+
+
+def test_page_errors_and_offsite_redirects():
+    """A page that fails in any way is counted as an error; redirects off-site are dropped."""
+    with _Site() as site:
+        crawler = Crawler([f"{site.url}/page/0", f"{site.url}/away/1", f"{site.url}/page/2"], max_depth=0)
+        fetch = crawler._fetch
+
+        def flaky_fetch(url):
+            if url.endswith("/page/2"):
+                raise ValueError("unparseable page")
+            return fetch(url)
+
+        crawler._fetch = flaky_fetch
+        docs = list(crawler.crawl())
+
+    assert [d['source'] for d in docs] == [f"{site.url}/page/0"]
+    stats = crawler.get_stats()
+    assert stats['errors'] == 1
+    assert stats['out_of_scope'] == 1
+
+
+if __name__ == "__main__":
+    test_normalize_url()
+    test_parse_sitemap_index_and_urlset()
+    test_crawls_whole_site_once()
+    test_depth_and_page_limits()
+    test_sitemap_seeds()
+    test_page_errors_and_offsite_redirects()
@@ -0,0 +1,109 @@
+"""
+Tests for the data directory watcher using stand-in processor and vector store.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to Python path so imports work correctly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.data_watcher import DataWatcher
+
+
+class _FakeProcessor:
+    """Reads text files and chunks them one line per chunk."""
+
+    def load_file(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return {'content': f.read(), 'source': path, 'type': 'text'}
+
+    def chunk_text(self, text, chunk_size=800, overlap=150):
+        return [line for line in text.splitlines() if line]
+
+
+class _FakeVectorStore:
+    """Keeps chunks per source and reports what each replace changed."""
+
+    def __init__(self):
+        self.sources = {}
+        self.calls = []
+        self.saves = 0
+
+    def replace_source(self, source, documents, persist=True):
+        old = set(self.sources.get(source, []))
+        new = {doc['content'] for doc in documents}
+        self.sources[source] = sorted(new)
+        self.calls.append(source)
+        return {'added': len(new - old), 'removed': len(old - new)}
+
+    def save_index(self):
+        self.saves += 1
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_sync_path_replaces_only_changed_chunks():
+    """Editing one line re-embeds one chunk; deleting the file removes them all."""
+    store = _FakeVectorStore()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "policy.txt")
+        changes = []
+        watcher = DataWatcher(store, tmp, processor=_FakeProcessor(), use_inotify=False,
+                              on_change=lambda source, doc: changes.append((source, doc and doc['content'])))
+
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("Returns within 30 days.\nFree shipping over $75.\n")
+        assert watcher.sync_path(path) == {'added': 2, 'removed': 0}
+
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("Returns within 60 days.\nFree shipping over $75.\n")
+        assert watcher.sync_path(path) == {'added': 1, 'removed': 1}
+
+        os.remove(path)
+        assert watcher.sync_path(path) == {'added': 0, 'removed': 2}
+        assert watcher.get_stats()['files_removed'] == 1
+        # Side indexes see each edit: the new text, then None for the deleted file
+        assert changes[1] == (path, "Returns within 60 days.\nFree shipping over $75.\n")
+        assert changes[2] == (path, None)
+
+
+def test_bursts_are_debounced():
+    """A burst of writes to one file triggers a single update once it settles."""
+    store = _FakeVectorStore()
+    with tempfile.TemporaryDirectory() as tmp:
+        watcher = DataWatcher(store, tmp, processor=_FakeProcessor(), debounce=0.2,
+                              poll_interval=0.05, use_inotify=False)
+        watcher.start()
+        try:
+            path = os.path.join(tmp, "faq.txt")
+            for i in range(5):
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(f"Line {i}\n")
+                watcher.notify(path)
+                time.sleep(0.02)
+
+            with open(os.path.join(tmp, "notes.docx"), 'w', encoding='utf-8') as f:
+                f.write("ignored")
+
+            assert _wait_for(lambda: store.calls)
+            time.sleep(0.4)
+            assert store.calls == [path]
+            assert store.sources[path] == ["Line 4"]
+            assert store.saves == 1
+        finally:
+            watcher.stop()
+
+
+if __name__ == "__main__":
+    test_sync_path_replaces_only_changed_chunks()
+    test_bursts_are_debounced()
@@ -0,0 +1,98 @@
+"""
+Tests for MinHash/LSH near-duplicate chunk elimination.
+"""
+
+import os
+import random
+import sys
+
+# Add parent directory to Python path so imports work correctly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.dedup import NearDuplicateFilter, MinHasher, choose_bands, shingles
+
+POLICY = ("Returns are accepted within 30 days of delivery for a full refund. Items must be unused "
+          "and in their original packaging, with all accessories and the charging cable included. "
+          "Contact support with your order number to receive a prepaid return label by email.")
+
+
+def _chunk(text, source):
+    return {'content': text, 'source': source, 'type': 'text'}
+
+
+def test_signature_similarity_tracks_jaccard():
+    hasher = MinHasher(256)
+    a = shingles(POLICY)
+    b = shingles(POLICY.replace("30 days", "thirty days"))
+    exact = len(set(a) & set(b)) / len(set(a) | set(b))
+    estimate = (hasher.signature(a) == hasher.signature(b)).mean()
+    assert abs(estimate - exact) < 0.1
+
+
+def test_choose_bands():
+    bands, rows = choose_bands(128, 0.9)
+    assert bands * rows == 128
+    assert 0.8 < (1 / bands) ** (1 / rows) <= 0.9
+
+
+def test_near_duplicates_become_aliases():
+    dedup = NearDuplicateFilter(threshold=0.8, id_fn=lambda doc: f"{doc['source']}#0")
+    docs = [
+        _chunk(POLICY, "faq.txt"),
+        _chunk(POLICY + " Thanks!", "https://example.com/returns"),
+        _chunk(POLICY, "https://example.com/returns?mirror=1"),
+        _chunk("Buddy Bear has a ten hour battery and speaks five languages fluently.", "buddy_bear.md"),
+    ]
+    kept = list(dedup.filter(docs))
+
+    assert [doc['source'] for doc in kept] == ["faq.txt", "buddy_bear.md"]
+    assert dedup.aliases["faq.txt#0"] == ["https://example.com/returns", "https://example.com/returns?mirror=1"]
+    stats = dedup.get_stats()
+    assert stats['duplicates'] == 2
+    assert stats['removed_ratio'] == 0.5
+
+
+def test_synthetic_corpus():
+    """Injected near-duplicates are removed; distinct chunks all survive."""
+    rng = random.Random(0)
+    vocabulary = [f"word{i}" for i in range(5000)]
+    originals = [" ".join(rng.choices(vocabulary, k=120)) for _ in range(1000)]
+
+    docs = [_chunk(text, f"doc{i}") for i, text in enumerate(originals)]
+    for i in rng.sample(range(len(originals)), 300):
+        words = originals[i].split()
+        words[rng.randrange(len(words))] = "edited"   # one-word edit, ~0.96 Jaccard
+        docs.append(_chunk(" ".join(words), f"copy{i}"))
+    rng.shuffle(docs)
+
+    dedup = NearDuplicateFilter(threshold=0.8)
+    kept = list(dedup.filter(docs))
+
+    assert len(kept) == len(originals)
+    assert len({doc['source'].replace("copy", "doc") for doc in kept}) == len(originals)
+    assert sum(len(sources) for sources in dedup.aliases.values()) == 300
+
+
+def test_incremental_updates_seed_forget_and_drop_aliases():
+    """A filter seeded with live chunks matches new ones, forgets deleted ones and hands back their aliases."""
+    dedup = NearDuplicateFilter(threshold=0.8, id_fn=lambda doc: f"{doc['source']}#0")
+    dedup.remember("faq.txt#0", POLICY, "faq.txt", aliases=["mirror.html"])
+
+    assert dedup.canonical_id(_chunk(POLICY + " Thanks!", "returns.html")) == "faq.txt#0"
+    assert dedup.aliases["faq.txt#0"] == ["mirror.html", "returns.html"]
+
+    # returns.html is re-synced: it stops being an alias until its chunks match again
+    assert dedup.drop_alias("returns.html") == ["faq.txt#0"]
+    assert dedup.aliases["faq.txt#0"] == ["mirror.html"]
+
+    # faq.txt is deleted: the chunk no longer matches, and its aliases are returned for promotion
+    assert dedup.forget("faq.txt#0") == ["mirror.html"]
+    assert dedup.canonical_id(_chunk(POLICY, "mirror.html")) is None
+
+
+if __name__ == "__main__":
+    test_signature_similarity_tracks_jaccard()
+    test_choose_bands()
+    test_near_duplicates_become_aliases()
+    test_synthetic_corpus()
+    test_incremental_updates_seed_forget_and_drop_aliases()
@@ -0,0 +1,48 @@
+"""
+Tests for streaming chunking used for large PDFs.
+"""
+
+import os
+import sys
+
+# Add parent directory to Python path so imports work correctly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.document_processor import DocumentProcessor
+
+
+def _pages(count):
+    return [
+        (number, " ".join(f"Page {number} sentence {i} about plush toy care." for i in range(30)))
+        for number in range(1, count + 1)
+    ]
+
+
+def test_streamed_chunks_match_chunk_text():
+    """Chunking a page stream gives exactly the chunks of the joined text."""
+    processor = DocumentProcessor()
+    pages = _pages(12)
+    expected = processor.chunk_text("\n".join(text for _, text in pages), chunk_size=800, overlap=150)
+    streamed = [chunk for chunk, _ in processor.iter_chunks(iter(pages), chunk_size=800, overlap=150)]
+    assert streamed == expected
+
+
+def test_chunks_carry_starting_page():
+    """Each chunk is tagged with the page its first character came from."""
+    processor = DocumentProcessor()
+    chunks = list(processor.iter_chunks(iter(_pages(5)), chunk_size=800, overlap=150))
+    pages = [page for _, page in chunks]
+    assert pages[0] == 1
+    assert pages == sorted(pages)
+    for chunk, page in chunks:
+        assert chunk.startswith(f"Page {page} ") or f"Page {page} " in chunk
+
+
+def test_empty_stream():
+    assert list(DocumentProcessor().iter_chunks(iter([]))) == []
+
+
+if __name__ == "__main__":
+    test_streamed_chunks_match_chunk_text()
+    test_chunks_carry_starting_page()
+    test_empty_stream()
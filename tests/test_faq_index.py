@@ -0,0 +1,159 @@
+"""
+Tests for FAQ parsing used by the direct-answer fast path.
+"""
+
+import os
+import sys
+import threading
+
+# Add parent directory to Python path so imports work correctly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+
+from src.faq_index import FAQIndex, faq_collection_name, parse_faq
+
+
+class _FakeCollection:
+    """Just enough of a ChromaDB collection for the FAQ index."""
+
+    def __init__(self):
+        self.rows = {}
+
+    def add(self, ids, embeddings, documents, metadatas):
+        for row in zip(ids, embeddings, documents, metadatas):
+            self.rows[row[0]] = row[1:]
+
+    def delete(self, where):
+        self.rows = {i: r for i, r in self.rows.items() if r[2]['source'] != where['source']}
+
+    def get(self, include):
+        ids = list(self.rows)
+        return {'ids': ids, 'embeddings': [self.rows[i][0] for i in ids],
+                'documents': [self.rows[i][1] for i in ids], 'metadatas': [self.rows[i][2] for i in ids]}
+
+
+class _FakeVectorStore:
+    """Embeds text as a normalized bag of hashed words."""
+
+    def __init__(self):
+        self.chroma_client = self
+        self.collections = {}
+
+    def get_or_create_collection(self, name):
+        return self.collections.setdefault(name, _FakeCollection())
+
+    def create_collection(self, name):
+        self.collections[name] = _FakeCollection()
+        return self.collections[name]
+
+    def delete_collection(self, name):
+        self.collections.pop(name, None)
+
+    def encode(self, texts):
+        vectors = np.zeros((len(texts), 64), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, hash(word) % 64] += 1.0
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    encode_queries = encode
+
+    def version_suffix(self, collection_name=None):
+        return (collection_name or "helpdesk_docs")[len("helpdesk_docs"):]
+
+    def add_embedded(self, collection, ids, embeddings, documents, metadatas):
+        collection.add(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+
+def test_parse_sample_faq():
+    """Every Q/A pair in the sample FAQ is extracted with its full answer."""
+    faq_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'business_info', 'faq.txt')
+    with open(faq_path, 'r', encoding='utf-8') as f:
+        entries = parse_faq(f.read())
+
+    assert len(entries) == 10
+    assert entries[3]['question'] == "How long does the battery last?"
+    assert entries[3]['answer'].startswith("8-12 hours of active use.")
+    assert "Q:" not in entries[3]['answer']
+
+
+def test_parse_ignores_plain_text():
+    """Text without Q/A markers yields no entries."""
+    assert parse_faq("FluffyAI sells AI-powered plush toys.\nShipping is free over $75.") == []
+
+
+def test_parse_multiline_answer():
+    """Answers can span several lines until the next question."""
+    text = "Q: Do you ship abroad?\nA: Yes.\nWe ship to 50+ countries.\n\nQ: Gift wrap?\nA: Free."
+    entries = parse_faq(text)
+    assert entries[0]['answer'] == "Yes.\nWe ship to 50+ countries."
+    assert entries[1] == {'question': "Gift wrap?", 'answer': "Free."}
+
+
+def test_replace_source_updates_only_that_source():
+    """An edited FAQ file replaces its answers; other sources keep theirs; deleting removes them."""
+    index = FAQIndex(_FakeVectorStore(), threshold=0.99, tone_wrapper=False)
+    index.build([
+        {'question': "What is the return window?", 'answer': "30 days.", 'source': "faq.txt"},
+        {'question': "Do you gift wrap?", 'answer': "Yes, free.", 'source': "faq.txt"},
+        {'question': "Where do you ship?", 'answer': "50+ countries.", 'source': "shipping.txt"},
+    ])
+    assert index.match("What is the return window?")['answer'] == "30 days."
+
+    index.replace_source("faq.txt", "Q: What is the return window?\nA: 60 days.\nQ: Do you gift wrap?\nA: No.")
+    assert index.match("What is the return window?")['answer'] == "60 days."
+    assert index.match("Where do you ship?")['answer'] == "50+ countries."
+
+    index.replace_source("faq.txt", None)
+    assert index.match("What is the return window?") is None
+    assert len(index) == 1
+
+
+def test_new_version_is_built_aside_and_switched_with_the_chunks():
+    """A reindex builds the next version's FAQ collection without touching the live one."""
+    store = _FakeVectorStore()
+    live = FAQIndex(store, threshold=0.99, tone_wrapper=False)
+    live.build([{'question': "What is the return window?", 'answer': "30 days.", 'source': "faq.txt"}])
+
+    name = faq_collection_name(store, "helpdesk_docs_v2")
+    assert name == "helpdesk_faq_v2"
+    FAQIndex(store, collection_name=name).build(
+        [{'question': "What is the return window?", 'answer': "60 days.", 'source': "faq.txt"}])
+    assert live.match("What is the return window?")['answer'] == "30 days."
+
+    live.use_version("helpdesk_docs_v2")
+    assert live.collection_name == "helpdesk_faq_v2"
+    assert live.match("What is the return window?")['answer'] == "60 days."
+
+
+def test_stats_are_exact_under_concurrent_matches():
+    """Counters updated from many request threads add up."""
+    index = FAQIndex(_FakeVectorStore(), threshold=0.99, tone_wrapper=False)
+    index.build([{'question': "What is the return window?", 'answer': "30 days.", 'source': "faq.txt"}])
+
+    def worker():
+        for _ in range(200):
+            index.match("What is the return window?")
+            index.match("Is the bear washable?")
+            index.record_saving(0.5)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = index.get_stats()
+    assert (stats['lookups'], stats['hits']) == (3200, 1600)
+    assert stats['latency_saved'] == 800.0 and stats['hit_rate'] == 0.5
+
+
+if __name__ == "__main__":
+    test_parse_sample_faq()
+    test_parse_ignores_plain_text()
+    test_parse_multiline_answer()
+    test_replace_source_updates_only_that_source()
+    test_new_version_is_built_aside_and_switched_with_the_chunks()
+    test_stats_are_exact_under_concurrent_matches()
+    print("✓ FAQ index tests passed")
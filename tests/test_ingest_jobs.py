@@ -0,0 +1,189 @@
+"""
+Tests for background ingest jobs using stand-in processor and vector store.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Add parent directory to Python path so imports work correctly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.ingest_jobs import IngestJobs, CANCELLED, DONE
+
+
+class _FakeProcessor:
+    """Reads text files, serves pages from `pages`, and chunks one line per chunk."""
+
+    def __init__(self, pages=None):
+        self.pages = pages or {}
+        self.fetched = []
+
+    def load_file(self, path):
+        if not path.endswith(('.txt', '.md')):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return {'content': f.read(), 'source': path, 'type': 'text'}
+
+    def load_webpage(self, url, allow_redirects=True):
+        self.fetched.append((url, allow_redirects))
+        if url not in self.pages:
+            return None
+        return {'content': self.pages[url], 'source': url, 'type': 'webpage'}
+
+    def chunk_text(self, text, chunk_size=800, overlap=150):
+        return [line for line in text.splitlines() if line]
+
+
+class _FakeVectorStore:
+    """Commits chunks in batches, makes each batch visible, and reports user queries.
+
+    Like VectorStore.replace_source, a source whose update fails is rolled back.
+    """
+
+    def __init__(self):
+        self.visible = []
+        self.queries_running = False
+        self.batch_gate = threading.Event()
+        self.batch_gate.set()
+        self.saves = 0
+
+    def busy(self, grace=0.05):
+        return self.queries_running
+
+    def replace_source(self, source, documents, batch_size=None, on_batch=None, persist=True):
+        batch_size = batch_size or 2
+        added = len(self.visible)
+        try:
+            for i in range(0, len(documents), batch_size):
+                self.batch_gate.wait(5)
+                batch = documents[i:i + batch_size]
+                self.visible.extend(doc['content'] for doc in batch)
+                if on_batch is not None:
+                    on_batch(len(batch))
+        except BaseException:
+            del self.visible[added:]
+            raise
+        return {'added': len(documents), 'removed': 0}
+
+    def save_index(self):
+        self.saves += 1
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def _write(path, lines):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def test_job_ingests_directory_incrementally_and_reports_progress():
+    """Chunks become visible batch by batch; bad sources are reported, not fatal."""
+    store = _FakeVectorStore()
+    with tempfile.TemporaryDirectory() as tmp:
+        jobs = IngestJobs(store, tmp, processor=_FakeProcessor(), nice=0, allowed_hosts=["example.com"])
+        _write(os.path.join(tmp, "a.txt"), [f"a{i}" for i in range(4)])
+        _write(os.path.join(tmp, "b.md"), ["b0", "b1"])
+        _write(os.path.join(tmp, "ignored.docx"), ["x"])
+
+        store.batch_gate.clear()
+        job = jobs.submit([tmp, "https://example.com/missing", ""])
+        assert job.sources == [tmp, "https://example.com/missing"]
+        assert _wait_for(lambda: job.progress()['current_source'] is not None)
+        store.batch_gate.set()
+        assert _wait_for(lambda: job.status == DONE)
+
+    progress = job.progress()
+    assert store.visible == ["a0", "a1", "a2", "a3", "b0", "b1"]
+    assert progress['files_total'] == 3 and progress['files_done'] == 3
+    assert progress['chunks_added'] == 6 and progress['chunks_seen'] == 6
+    assert progress['chunks_per_second'] > 0
+    assert len(progress['errors']) == 1 and "example.com" in progress['errors'][0]
+    assert jobs.get(job.id) is job
+    assert store.saves == 1  # one index save for the whole job
+    jobs.stop()
+
+
+def test_job_yields_to_queries_and_can_be_cancelled():
+    """The worker waits while queries run, and stops after the current batch when cancelled."""
+    store = _FakeVectorStore()
+    with tempfile.TemporaryDirectory() as tmp:
+        jobs = IngestJobs(store, tmp, processor=_FakeProcessor(), yield_grace=0.01, max_yield=10, nice=0)
+        path = os.path.join(tmp, "big.txt")
+        _write(path, [f"line{i}" for i in range(20)])
+
+        store.queries_running = True
+        job = jobs.submit([path])
+        time.sleep(0.1)
+        assert store.visible == []  # held back while queries are running
+
+        store.batch_gate.clear()
+        store.queries_running = False
+        jobs.cancel(job.id)
+        store.batch_gate.set()
+        assert _wait_for(lambda: job.status == CANCELLED)
+        assert store.visible == []  # the batch in progress commits, then the file is rolled back
+        assert job.progress()['chunks_added'] == 0
+        assert job.progress()['yield_time'] >= 0.1
+
+        # A job still waiting behind a running one is cancelled immediately
+        store.batch_gate.clear()
+        running = jobs.submit([path])
+        queued = jobs.submit([path])
+        assert jobs.cancel(queued.id) and queued.status == CANCELLED
+        jobs.cancel(running.id)
+        store.batch_gate.set()
+        assert _wait_for(lambda: running.status == CANCELLED)
+    jobs.stop()
+
+
+
+def test_sources_are_restricted_and_urls_are_persisted():
+    """Paths outside the data dir and URLs on other hosts are refused; ingested URLs go to urls.txt."""
+    store = _FakeVectorStore()
+    processor = _FakeProcessor(pages={"https://docs.example.com/faq": "q1\nq2"})
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = os.path.join(tmp, "data")
+        os.makedirs(os.path.join(data_dir, "business_info"))
+        _write(os.path.join(data_dir, "notes.md"), ["n0"])
+        _write(os.path.join(tmp, "secret.txt"), ["s0"])
+        changes = []
+        jobs = IngestJobs(store, data_dir, processor=processor, nice=0, allowed_hosts=[" Docs.Example.com "],
+                          on_change=lambda source, doc: changes.append((source, doc['content'])))
+
+        for source in [os.path.join(tmp, "secret.txt"), "../secret.txt", "/etc/passwd",
+                       "http://169.254.169.254/latest/meta-data", "https://example.com/faq"]:
+            try:
+                jobs.submit(["notes.md", source])
+                assert False, f"{source} should have been refused"
+            except ValueError:
+                pass
+        assert jobs.jobs() == [] and processor.fetched == []
+
+        job = jobs.submit(["notes.md", "https://docs.example.com/faq"])
+        assert job.sources == [os.path.join(data_dir, "notes.md"), "https://docs.example.com/faq"]
+        assert _wait_for(lambda: job.status == DONE)
+        assert store.visible == ["n0", "q1", "q2"]
+        assert processor.fetched == [("https://docs.example.com/faq", False)]  # redirects not followed
+        assert changes == [(os.path.join(data_dir, "notes.md"), "n0\n"), ("https://docs.example.com/faq", "q1\nq2")]
+
+        again = jobs.submit([os.path.join(data_dir, "notes.md"), "https://docs.example.com/faq"])
+        assert _wait_for(lambda: again.status == DONE)
+        with open(os.path.join(data_dir, "business_info", "urls.txt"), encoding='utf-8') as f:
+            assert f.read() == "https://docs.example.com/faq\n"  # listed once, for the next reindex
+    jobs.stop()
+
+
+if __name__ == "__main__":
+    test_job_ingests_directory_incrementally_and_reports_progress()
+    test_job_yields_to_queries_and_can_be_cancelled()
+    test_sources_are_restricted_and_urls_are_persisted()
@@ -0,0 +1,87 @@
+"""
+Tests for nearest-centroid intent routing in front of retrieval.
+"""
+
+import os
+import re
+import sys
+import zlib
+
+import numpy as np
+
+# Add parent directory to Python path so imports work correctly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.intent_router import IntentRouter, SUPPORT
+
+
+class _FakeEncoder:
+    """Bag-of-words hashing embedder standing in for the sentence-transformer."""
+
+    def __init__(self, dim=384):
+        self.dim = dim
+        self.calls = 0
+
+    def encode(self, texts):
+        self.calls += 1
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r'\w+', text.lower()):
+                out[row, zlib.crc32(word.encode()) % self.dim] += 1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-9)
+
+
+def _router(**kwargs):
+    return IntentRouter(_FakeEncoder(), threshold=0.3, margin=0.05, **kwargs)
+
+
+def test_exact_small_talk_skips_embedding():
+    router = _router()
+    calls = router.encoder.calls
+    route = router.route("Thanks!")
+    assert route['intent'] == 'thanks'
+    assert route['reply'] is not None
+    assert router.encoder.calls == calls
+    assert route['embedding'] is None and route['latency'] >= 0
+
+
+def test_routes_by_nearest_centroid():
+    router = _router()
+    assert router.route("good morning everyone")['intent'] == 'greeting'
+    assert router.route("what's the weather like in Paris today?")['intent'] == 'off_topic'
+    assert router.route("who are you?")['intent'] == 'small_talk'
+
+    route = router.route("how long does shipping to Canada take?")
+    assert route['intent'] == SUPPORT
+    assert route['reply'] is None
+    # Support messages keep their embedding so retrieval doesn't encode again
+    assert route['embedding'] is not None and route['embedding'].shape == (384,)
+
+
+def test_long_messages_go_to_retrieval():
+    router = _router(max_words=5)
+    route = router.route("hello hello hello hello hello hello hello")
+    assert route['intent'] == SUPPORT
+    assert route['embedding'] is None
+
+
+def test_stats_and_routing_latency():
+    router = _router()
+    for message in ["hi", "thank you", "where is my order?", "what is the capital of France?"] * 50:
+        router.route(message)
+
+    stats = router.get_stats()
+    assert stats['routed'] == 200
+    assert stats['intents']['greeting'] == 50
+    assert stats['intents'][SUPPORT] == 50
+    assert stats['shortcuts'] == 150
+    assert stats['shortcut_rate'] == 0.75
+    assert stats['avg_route_ms'] < 1.0
+
+
+if __name__ == "__main__":
+    test_exact_small_talk_skips_embedding()
+    test_routes_by_nearest_centroid()
+    test_long_messages_go_to_retrieval()
+    test_stats_and_routing_latency()
@@ -0,0 +1,106 @@
+"""
+Tests for the structured product catalog built from data/products/*.md.
+"""
+
+import glob
+import os
+import sys
+import tempfile
+
+# Add parent directory to Python path so imports work correctly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.product_catalog import ProductCatalog
+
+
+PRODUCTS_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'products')
+
+
+def _catalog():
+    return ProductCatalog.from_markdown_files(sorted(glob.glob(os.path.join(PRODUCTS_DIR, '*.md'))))
+
+
+def test_extracts_sample_products():
+    """Name, price, ages and battery are extracted for every sample product."""
+    catalog = _catalog()
+    by_name = {p['name']: p for p in catalog.products}
+    assert set(by_name) == {"Buddy Bear", "Robo Rabbit", "Dreamy Dragon"}
+    assert by_name["Buddy Bear"]['price'] == 79.99
+    assert (by_name["Robo Rabbit"]['min_age'], by_name["Robo Rabbit"]['max_age']) == (5, 12)
+    assert by_name["Dreamy Dragon"]['battery'].startswith("8 hours")
+
+
+def test_direct_attribute_and_comparison_answers():
+    """Single-fact and comparison questions are answered without the LLM."""
+    catalog = _catalog()
+    assert "$79.99" in catalog.answer("How much does Buddy Bear cost?")
+    comparison = catalog.answer("Compare Robo Rabbit and Dreamy Dragon price")
+    assert "$89.99" in comparison and "$94.99" in comparison
+    age_answer = catalog.answer("Which toy is best for a 4-year-old?")
+    assert "Dreamy Dragon" in age_answer and "Robo Rabbit" not in age_answer
+
+
+def test_open_questions_are_grounded_not_answered():
+    """Open-ended product questions fall through to the LLM with relevant rows."""
+    catalog = _catalog()
+    assert catalog.answer("Tell me about Dreamy Dragon") is None
+    rows = catalog.context_rows("Tell me about Dreamy Dragon")
+    assert len(rows) == 1 and rows[0].startswith("Dreamy Dragon")
+    assert catalog.answer("Can I wash the toy?") is None
+
+
+def test_keywords_match_whole_words_only():
+    """Keywords inside other words ("language", "install", "surcharge") are not attribute questions."""
+    catalog = _catalog()
+    assert catalog.detect_attributes("Does Buddy Bear speak my language?") == []
+    assert catalog.detect_attributes("What is in the Buddy Bear package?") == []
+    assert catalog.detect_attributes("Can I install an app for Robo Rabbit?") == []
+    assert catalog.detect_attributes("Is there a surcharge to ship Robo Rabbit?") == []
+    assert catalog.detect_attributes("Is Buddy Bear under $80?") == ['price']
+
+    assert catalog.answer("Does Buddy Bear speak my language?") is None
+    assert catalog.answer("What is in the Buddy Bear package?") is None
+    assert catalog.answer("Can I install an app for Robo Rabbit?") is None
+    assert catalog.answer("Is there a surcharge to ship Robo Rabbit?") is None
+
+
+def test_ambiguous_attribute_questions_fall_through():
+    """Only plain fact questions get a canned answer; anything more goes to RAG."""
+    catalog = _catalog()
+    assert "$79.99" in catalog.answer("What's the price of Buddy Bear?")
+    assert "Robo Rabbit" in catalog.answer("What colors does Robo Rabbit come in?")
+    assert catalog.answer("Does Robo Rabbit's battery charge wirelessly?") is None
+    assert catalog.answer("Is Buddy Bear too expensive as a birthday gift?") is None
+
+
+def test_with_source_replaces_one_product_and_saves():
+    """An edited product page replaces its own row; a deleted page drops it; the file follows."""
+    catalog = _catalog()
+    source = next(p['source'] for p in catalog.products if p['name'] == "Buddy Bear")
+    with open(source, 'r', encoding='utf-8') as f:
+        text = f.read()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "product_catalog.json")
+        catalog.save(path)
+        catalog = ProductCatalog.load(path)
+
+        edited = catalog.with_source(source, text.replace("$79.99", "$69.99"))
+        assert "$69.99" in edited.answer("How much does Buddy Bear cost?")
+        assert "$79.99" in catalog.answer("How much does Buddy Bear cost?")  # old copy untouched
+        assert edited.stats is catalog.stats
+        assert len(ProductCatalog.load(path)) == 3
+
+        removed = edited.with_source(source, None)
+        assert "Buddy Bear" not in {p['name'] for p in removed.products}
+        assert len(ProductCatalog.load(path)) == 2
+
+
+if __name__ == "__main__":
+    test_extracts_sample_products()
+    test_direct_attribute_and_comparison_answers()
+    test_open_questions_are_grounded_not_answered()
+    test_keywords_match_whole_words_only()
+    test_ambiguous_attribute_questions_fall_through()
+    test_with_source_replaces_one_product_and_saves()
+    print("✓ Product catalog tests passed")
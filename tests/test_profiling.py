@@ -0,0 +1,85 @@
+"""
+Tests for opt-in per-request profiling.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to Python path so imports work correctly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src import profiling
+
+
+def _spin(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class _Service:
+    def search(self, query):
+        _spin(0.03)
+        self.buffer = bytearray(512 * 1024)
+        return [query]
+
+    def chat(self, message):
+        _spin(0.02)
+        return self.search(message)
+
+
+def test_disabled_leaves_methods_untouched():
+    original = _Service.__dict__['chat']
+    assert not profiling.enabled()
+    with profiling.force():
+        assert _Service().chat("hi") == ["hi"]
+    assert _Service.__dict__['chat'] is original
+
+
+def test_forced_call_writes_reports():
+    with tempfile.TemporaryDirectory() as tmp:
+        profiling.enable([(_Service, 'chat'), (_Service, 'search'), (_Service, 'missing')],
+                         rate=0.0, directory=tmp)
+        try:
+            service = _Service()
+            service.chat("unsampled")
+            assert os.listdir(tmp) == []
+
+            with profiling.force():
+                assert service.chat("hello") == ["hello"]
+        finally:
+            profiling.disable()
+
+        # Nested search ran inside the chat profile instead of getting its own
+        files = sorted(os.listdir(tmp))
+        assert len(files) == 3
+        assert all("_Service.chat" in name for name in files)
+
+        speedscope = next(name for name in files if name.endswith(".speedscope.json"))
+        with open(os.path.join(tmp, speedscope), encoding='utf-8') as f:
+            document = json.load(f)
+        frame_names = {frame['name'] for frame in document['shared']['frames']}
+        assert {'chat', 'search', '_spin'} <= frame_names
+        profile = document['profiles'][0]
+        assert profile['type'] == 'sampled'
+        assert len(profile['samples']) == len(profile['weights'])
+        assert 30 < profile['endValue'] < 500
+
+        collapsed = next(name for name in files if name.endswith(".collapsed.txt"))
+        with open(os.path.join(tmp, collapsed), encoding='utf-8') as f:
+            assert any(";search (" in line for line in f)
+
+        allocations = next(name for name in files if name.endswith(".alloc.txt"))
+        with open(os.path.join(tmp, allocations), encoding='utf-8') as f:
+            assert "test_profiling.py" in f.read()
+
+    assert _Service.__dict__['chat'].__name__ == 'chat'
+    assert not profiling.enabled()
+
+
+if __name__ == "__main__":
+    test_disabled_leaves_methods_untouched()
+    test_forced_call_writes_reports()
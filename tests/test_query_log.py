@@ -0,0 +1,84 @@
+"""
+Tests for the query log and cache prewarming.
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+# Add parent directory to Python path so imports work correctly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.query_log import Prewarmer, QueryLog, embedding_hash, normalize_query, top_queries
+
+
+class _FakeChatbot:
+    top_k = 3
+
+    def __init__(self):
+        self.retrieved = []
+
+    def _retrieve(self, query, top_k=3, query_embedding=None):
+        self.retrieved.append(query)
+        return []
+
+
+def test_normalize_query():
+    assert normalize_query("  How LONG does\tshipping take? ") == "how long does shipping take?"
+
+
+def test_log_records_compact_lines_off_the_hot_path():
+    cached = {"where is my order?": np.ones(4, dtype=np.float32)}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "queries.jsonl")
+        log = QueryLog(path, flush_interval=60, embedding_lookup=cached.get)
+        log.record("Where is  my ORDER?", ["c1", "c2"], {'retrieval': 0.0123, 'llm': 0.8})
+        log.record("hi", timings={'intent': 0.0001}, route='greeting')
+        assert not os.path.exists(path)  # nothing written until the writer flushes
+        log.close()
+
+        with open(path, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+
+    first, second = json.loads(lines[0]), json.loads(lines[1])
+    assert first['q'] == "where is my order?"
+    assert first['c'] == ["c1", "c2"]
+    assert first['ms'] == {'retrieval': 12.3, 'llm': 800.0}
+    assert first['e'] == embedding_hash(np.ones(4, dtype=np.float32))
+    assert second['r'] == "greeting" and 'e' not in second
+    assert ' ' not in lines[0].replace(first['q'], '')  # compact separators
+    assert log.stats == {'recorded': 2, 'written': 2, 'dropped': 0}
+
+
+def test_top_queries_and_prewarm():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "queries.jsonl")
+        log = QueryLog(path, flush_interval=60)
+        for _ in range(10):
+            log.record("hello", route='greeting')
+        for query, count in [("Return policy?", 5), ("battery life", 3), ("shipping cost", 1)]:
+            for _ in range(count):
+                log.record(query)
+        log.close()
+
+        frequent = top_queries(path, n=2)
+        assert frequent == ["return policy?", "battery life"]
+        # Reading only the newest bytes still works (partial first line skipped)
+        recent = top_queries(path, n=5, max_bytes=200)
+        assert "shipping cost" in recent and "return policy?" not in recent
+
+    chatbot = _FakeChatbot()
+    prewarmer = Prewarmer(chatbot, frequent, pause=0)
+    prewarmer.start()
+    prewarmer.join(5)
+    assert chatbot.retrieved == frequent
+    assert prewarmer.get_stats()['warmed'] == 2
+
+
+if __name__ == "__main__":
+    test_normalize_query()
+    test_log_records_compact_lines_off_the_hot_path()
+    test_top_queries_and_prewarm()
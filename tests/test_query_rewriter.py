@@ -0,0 +1,103 @@
+"""
+Tests for conversation-aware retrieval query rewriting (no API key needed).
+"""
+
+import os
+import sys
+
+# Add parent directory to Python path so imports work correctly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.query_rewriter import QueryRewriter
+
+
+HISTORY = [
+    {"role": "user", "content": "Tell me about Buddy Bear"},
+    {"role": "assistant", "content": "Buddy Bear is our flagship AI teddy bear for ages 3-10."},
+]
+
+
+def test_follow_up_detection():
+    """Pronoun-heavy and short messages are follow-ups, full questions are not."""
+    rewriter = QueryRewriter()
+    assert rewriter.is_follow_up("How much is it?")
+    assert rewriter.is_follow_up("what about Robo Rabbit")
+    assert not rewriter.is_follow_up("What is your return policy for damaged toys?")
+
+
+def test_heuristic_rewrite_folds_recent_terms():
+    """Follow-ups pick up salient terms from earlier user turns."""
+    rewriter = QueryRewriter()
+    rewritten = rewriter.rewrite("How much is it?", HISTORY)
+    assert "Buddy" in rewritten and "Bear" in rewritten
+    assert rewritten.endswith("How much is it?")
+    assert rewriter.get_stats()['rewritten'] == 1
+
+
+def test_standalone_query_unchanged():
+    """Standalone questions and first turns are passed through untouched."""
+    rewriter = QueryRewriter()
+    assert rewriter.rewrite("How long does shipping take?", HISTORY) == "How long does shipping take?"
+    assert rewriter.rewrite("How much is it?", []) == "How much is it?"
+
+
+class _FakeClient:
+    """Minimal stand-in for the OpenAI client's chat.completions.create."""
+
+    def __init__(self):
+        self.calls = 0
+        self.chat = self
+        self.completions = self
+
+    def create(self, **kwargs):
+        self.calls += 1
+        message = type('Message', (), {'content': 'Buddy Bear price'})()
+        choice = type('Choice', (), {'message': message})()
+        return type('Response', (), {'choices': [choice]})()
+
+
+def test_llm_rewrite_is_cached():
+    """Repeated LLM rewrites of the same conversation tail hit the cache."""
+    client = _FakeClient()
+    rewriter = QueryRewriter(client=client, use_llm=True)
+    assert rewriter.rewrite("How much is it?", HISTORY) == "Buddy Bear price"
+    assert rewriter.rewrite("How much is it?", HISTORY) == "Buddy Bear price"
+    assert client.calls == 1
+    assert rewriter.get_stats()['cache_hits'] == 1
+
+
+def test_concurrent_rewrites_keep_cache_and_stats_consistent():
+    """Concurrent turns share the LRU cache without losing counts."""
+    import threading
+
+    rewriter = QueryRewriter(client=_FakeClient(), use_llm=True, cache_size=4)
+    errors = []
+
+    def worker(n):
+        try:
+            for i in range(200):
+                history = [{'role': 'user', 'content': f"Tell me about toy {(n + i) % 8}"}]
+                rewriter.rewrite("How much is it?", history)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = rewriter.get_stats()
+    assert errors == []
+    assert stats['queries'] == 800
+    assert stats['llm_calls'] + stats['cache_hits'] == 800
+    assert 0.0 <= stats['cache_hit_rate'] <= 1.0
+
+
+if __name__ == "__main__":
+    test_follow_up_detection()
+    test_heuristic_rewrite_folds_recent_terms()
+    test_standalone_query_unchanged()
+    test_llm_rewrite_is_cached()
+    test_concurrent_rewrites_keep_cache_and_stats_consistent()
+    print("✓ Query rewriter tests passed")
@@ -0,0 +1,102 @@
+"""
+Tests for the cross-encoder reranker using a stand-in model (no download needed).
+"""
+
+import os
+import sys
+import threading
+import time
+
+# Add parent directory to Python path so imports work correctly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.reranker import Reranker
+
+
+class _FakeCrossEncoder:
+    """Scores a pair by how many query words appear in the chunk."""
+
+    def __init__(self):
+        self.pairs_seen = 0
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.pairs_seen += len(pairs)
+        return [sum(w in text.lower() for w in query.lower().split()) for query, text in pairs]
+
+
+def _make_reranker(**kwargs):
+    return Reranker(model=_FakeCrossEncoder(), **kwargs)
+
+
+DOCS = [
+    {'id': 'a', 'content': 'Shipping takes 5-7 days', 'source': 'faq', 'type': 'text'},
+    {'id': 'b', 'content': 'Buddy Bear battery lasts 10 hours', 'source': 'bear', 'type': 'markdown'},
+    {'id': 'c', 'content': 'Buddy Bear costs $79.99', 'source': 'bear', 'type': 'markdown'},
+]
+
+
+def test_rerank_orders_by_score_and_caches():
+    """Best-scoring chunks come first and repeated queries use cached scores."""
+    reranker = _make_reranker()
+    top = reranker.rerank("buddy bear battery", DOCS, top_n=2)
+    assert [d['id'] for d in top] == ['b', 'c']
+
+    reranker.rerank("buddy bear battery", DOCS, top_n=2)
+    assert reranker.model.pairs_seen == 3
+    assert reranker.get_stats()['cache_hits'] == 3
+
+
+def test_budget_keeps_vector_order_for_unscored():
+    """When scoring is too slow, unscored candidates keep vector order."""
+    reranker = _make_reranker(latency_budget=0.01)
+    reranker._seconds_per_pair = 1.0  # pretend each pair takes a second
+    top = reranker.rerank("buddy bear battery", DOCS, top_n=2)
+    assert [d['id'] for d in top] == ['a', 'b']
+    assert reranker.get_stats()['fallbacks'] == 1
+
+
+class _SlowCrossEncoder(_FakeCrossEncoder):
+    """Takes 50 ms per predict call."""
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        time.sleep(0.05)
+        return super().predict(pairs, batch_size, show_progress_bar)
+
+
+def test_budget_overrun_returns_vector_order():
+    """Scoring stops at the budget and the candidates keep vector order; scores are still cached."""
+    reranker = Reranker(model=_SlowCrossEncoder(), latency_budget=0.03, batch_size=1)
+    top = reranker.rerank("buddy bear battery", DOCS, top_n=2)
+    assert [d['id'] for d in top] == ['a', 'b']
+    assert reranker.model.pairs_seen == 1  # later batches skipped
+    stats = reranker.get_stats()
+    assert stats['fallbacks'] == 1 and stats['fallback_rate'] == 1.0
+
+
+def test_concurrent_reranks_share_cache_safely():
+    """Concurrent turns can read and evict the score cache at the same time."""
+    reranker = _make_reranker(cache_size=4)
+    errors = []
+
+    def worker(n):
+        try:
+            for i in range(300):
+                reranker.rerank(f"buddy bear {(n + i) % 5}", DOCS, top_n=2)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert reranker.get_stats()['queries'] == 1200
+
+
+if __name__ == "__main__":
+    test_rerank_orders_by_score_and_caches()
+    test_budget_keeps_vector_order_for_unscored()
+    test_budget_overrun_returns_vector_order()
+    test_concurrent_reranks_share_cache_safely()
+    print("✓ Reranker tests passed")
@@ -0,0 +1,61 @@
+"""
+Tests for the shared retrieval service using a stand-in vector store (no model needed).
+"""
+
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to Python path so imports work correctly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.retrieval_service import RetrievalServer, RetrievalClient
+
+
+class _FakeVectorStore:
+    """Returns one result per query echoing the query text."""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def search_batch(self, queries, top_k=3):
+        self.batch_sizes.append(len(queries))
+        return [[{'content': q, 'source': 'fake', 'type': 'text', 'distance': float(i)}
+                 for i in range(top_k)] for q in queries]
+
+    def get_collection_count(self):
+        return 42
+
+
+def test_client_server_roundtrip():
+    """Concurrent clients get their own results back, in batched searches."""
+    store = _FakeVectorStore()
+    with tempfile.TemporaryDirectory() as tmp:
+        socket_path = os.path.join(tmp, "retrieval.sock")
+        server = RetrievalServer(store, socket_path, max_wait=0.02)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        try:
+            client = RetrievalClient(socket_path)
+            assert client.get_collection_count() == 42
+
+            queries = [f"question {i}" for i in range(16)]
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                results = list(pool.map(lambda q: client.search(q, top_k=2), queries))
+
+            for query, docs in zip(queries, results):
+                assert len(docs) == 2
+                assert docs[0]['content'] == query
+            assert client.get_stats()['queries'] == 16
+            assert max(store.batch_sizes) > 1
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    test_client_server_roundtrip()
+    print("✓ Retrieval service tests passed")
@@ -0,0 +1,122 @@
+"""
+Tests for the pluggable session stores (no API key or model needed).
+"""
+
+import os
+import sys
+import tempfile
+import threading
+
+# Add parent directory to Python path so imports work correctly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.session_store import (
+    MemorySessionStore,
+    SQLiteSessionStore,
+    serialize_history,
+    deserialize_history,
+)
+
+
+HISTORY = [
+    {"role": "user", "content": "How much is Buddy Bear?"},
+    {"role": "assistant", "content": "Buddy Bear costs $79.99. " * 20},
+]
+
+
+def test_serialization_roundtrip():
+    """Histories survive encode/decode, and long ones are compressed."""
+    blob = serialize_history(HISTORY)
+    assert deserialize_history(blob) == HISTORY
+    assert len(blob) < len(HISTORY[1]['content'])
+
+
+def test_memory_store_evicts_lru():
+    """The in-memory store keeps only the most recently used sessions."""
+    store = MemorySessionStore(max_sessions=2)
+    store.save("a", HISTORY)
+    store.save("b", HISTORY)
+    store.load("a")
+    store.save("c", HISTORY)
+    assert store.load("a") == HISTORY
+    assert store.load("b") == []
+
+
+def test_sqlite_store_persists_across_instances():
+    """Buffered writes are flushed on close and lazily loaded by a new instance."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.db")
+
+        store = SQLiteSessionStore(path, flush_interval=60)
+        store.save("s1", HISTORY)
+        store.save("s2", HISTORY[:1])
+        store.delete("s2")
+        assert store.load("s1") == HISTORY  # served from the write-behind buffer
+        store.close()
+
+        reopened = SQLiteSessionStore(path)
+        assert reopened.load("s1") == HISTORY
+        assert reopened.load("s2") == []
+        reopened.close()
+
+
+def test_sqlite_store_sees_other_workers_turns():
+    """A cached history is re-read once another worker writes a newer version."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.db")
+        worker_a = SQLiteSessionStore(path, flush_interval=60)
+        worker_b = SQLiteSessionStore(path, flush_interval=60)
+
+        worker_a.save("s1", HISTORY[:1])
+        worker_a.flush()
+        assert worker_b.load("s1") == HISTORY[:1]
+        assert worker_b.load("s1") == HISTORY[:1]  # unchanged version, served from cache
+
+        worker_a.save("s1", HISTORY)
+        worker_a.flush()
+        assert worker_b.load("s1") == HISTORY
+        assert worker_a.load("s1") == HISTORY
+
+        worker_a.delete("s1")
+        worker_a.flush()
+        assert worker_b.load("s1") == []
+        worker_a.close()
+        worker_b.close()
+
+
+
+def test_sqlite_store_serves_batch_while_it_is_written():
+    """A load during a slow flush sees the batch being written, not the old row."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteSessionStore(os.path.join(tmp, "sessions.db"), flush_interval=60)
+        store.save("s1", HISTORY[:1])
+        store.flush()
+
+        writing, release = threading.Event(), threading.Event()
+        write_batch = store._write_batch
+
+        def slow_write_batch(upserts, deletes):
+            writing.set()
+            release.wait(5)
+            return write_batch(upserts, deletes)
+
+        store._write_batch = slow_write_batch
+        store.save("s1", HISTORY)
+        store._cache.clear()  # evicted, so only the write-behind buffers have the new turns
+        flusher = threading.Thread(target=store.flush)
+        flusher.start()
+        assert writing.wait(5)
+        assert store.load("s1") == HISTORY
+        release.set()
+        flusher.join()
+        assert store.load("s1") == HISTORY
+        store.close()
+
+
+if __name__ == "__main__":
+    test_serialization_roundtrip()
+    test_memory_store_evicts_lru()
+    test_sqlite_store_persists_across_instances()
+    test_sqlite_store_sees_other_workers_turns()
+    test_sqlite_store_serves_batch_while_it_is_written()
+    print("✓ Session store tests passed")
@@ -0,0 +1,96 @@
+"""
+Tests for the single-file, memory-mapped index snapshot format.
+"""
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+# Add parent directory to Python path so imports work correctly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.snapshot import Snapshot, import_snapshot, write_snapshot
+
+
+def test_snapshot_roundtrip_and_search():
+    """Written chunks are readable via mmap and searchable in VectorStore format."""
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((50, 8)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    ids = [f"chunk-{i}" for i in range(50)]
+    texts = [f"Text for chunk {i} — ünïcödé" for i in range(50)]
+    metadatas = [{'source': f"doc{i % 3}.md", 'type': 'markdown'} for i in range(50)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "test.snap")
+        write_snapshot(path, ids, embeddings, texts, metadatas, "test-model",
+                       chunker={'chunk_size': 800, 'overlap': 150})
+
+        snapshot = Snapshot(path)
+        assert len(snapshot) == 50
+        assert snapshot.model_name == "test-model"
+        assert snapshot.manifest['chunker'] == {'chunk_size': 800, 'overlap': 150}
+        assert snapshot.verify()
+        assert snapshot.get_text(7) == texts[7]
+        assert snapshot.get_metadata(7) == metadatas[7]
+
+        results = snapshot.search(embeddings[12:13], top_k=3)[0]
+        assert results[0]['id'] == "chunk-12"
+        assert results[0]['content'] == texts[12]
+        assert set(results[0]) == {'id', 'content', 'source', 'type', 'distance'}
+        assert results[0]['distance'] < results[1]['distance']
+
+        batches = list(snapshot.iter_batches(batch_size=20))
+        assert [len(b[0]) for b in batches] == [20, 20, 10]
+        snapshot.close()
+
+
+def test_import_refuses_corrupted_snapshot():
+    """A snapshot that fails its checksum is never handed to the vector store."""
+    class _FakeVectorStore:
+        model_name = "test-model"
+        reindexed = False
+
+        def reindex(self, documents, **kwargs):
+            self.reindexed = True
+
+    embeddings = np.eye(4, dtype=np.float32)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "test.snap")
+        write_snapshot(path, [f"chunk-{i}" for i in range(4)], embeddings, ["text"] * 4,
+                       [{'source': "doc.md", 'type': 'markdown'}] * 4, "test-model")
+        snapshot = Snapshot(path)
+        offset, _ = snapshot.manifest['sections']['texts']
+        snapshot.close()
+        with open(path, 'r+b') as f:
+            f.seek(offset)
+            f.write(b"T")
+
+        store = _FakeVectorStore()
+        try:
+            import_snapshot(path, store)
+        except ValueError:
+            assert not store.reindexed
+            return
+        raise AssertionError("expected ValueError")
+
+
+def test_rejects_other_files():
+    """Opening a file that isn't a snapshot fails clearly."""
+    with tempfile.NamedTemporaryFile(suffix=".snap") as f:
+        f.write(b"not a snapshot" * 10)
+        f.flush()
+        try:
+            Snapshot(f.name)
+        except ValueError:
+            return
+        raise AssertionError("expected ValueError")
+
+
+if __name__ == "__main__":
+    test_snapshot_roundtrip_and_search()
+    test_import_refuses_corrupted_snapshot()
+    test_rejects_other_files()
+    print("✓ Snapshot tests passed")
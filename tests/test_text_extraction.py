@@ -0,0 +1,116 @@
+"""
+Tests for the fast Markdown/HTML text extractors, including parity with the
+BeautifulSoup path they replace.
+"""
+
+import glob
+import os
+import sys
+
+import pytest
+
+# Add parent directory to Python path so imports work correctly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.text_extraction import markdown_to_text, html_to_text
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+SAMPLE_HTML = """<!DOCTYPE html>
+<html>
+<head><title>Shipping</title><style>body { color: red; }</style></head>
+<body>
+  <header><a href="/">Home</a></header>
+  <nav><ul><li>Products</li><li>Support</li></ul></nav>
+  <main>
+    <h1>Shipping &amp; Returns</h1>
+    <p>Free shipping on orders over <b>$75</b>.<br>Express is $14.99.</p>
+    <h2>Returns</h2>
+    <ul>
+      <li>30-day returns</li>
+      <li>See the <a href="/faq">FAQ</a></li>
+    </ul>
+  </main>
+  <script>track('page');</script>
+  <footer>&copy; FluffyAI</footer>
+</body>
+</html>"""
+
+
+def _words(text):
+    return text.split()
+
+
+def test_markdown_keeps_headings_and_strips_syntax():
+    text = markdown_to_text(
+        "# Buddy Bear - Classic\n\n## Features\n\n- **Voice**: talks back\n"
+        "1. See [the guide](https://example.com) or `reset`\n\n> Quoted _tip_\n\n---\n"
+    )
+    assert text.splitlines() == [
+        "Buddy Bear - Classic",
+        "Features",
+        "Voice: talks back",
+        "See the guide or reset",
+        "Quoted tip",
+    ]
+
+
+def test_markdown_fenced_code_is_kept_verbatim():
+    text = markdown_to_text("Run:\n\n```\npip install **fluffy**\n```\n")
+    assert text.splitlines() == ["Run:", "pip install **fluffy**"]
+
+
+def test_html_skips_chrome_and_keeps_blocks():
+    lines = html_to_text(SAMPLE_HTML).splitlines()
+    assert "Shipping & Returns" in lines
+    assert "Returns" in lines
+    assert "Express is $14.99." in lines
+    assert "See the FAQ" in lines
+    text = "\n".join(lines)
+    for chrome in ("Home", "Products", "track(", "color: red", "©"):
+        assert chrome not in text
+
+
+def test_html_accepts_bytes():
+    assert html_to_text(SAMPLE_HTML.encode('utf-8')) == html_to_text(SAMPLE_HTML)
+    assert html_to_text(b"  ") == ""
+
+
+def test_html_bytes_use_declared_charset():
+    """Bytes are decoded with the page's declared charset, not assumed utf-8."""
+    page = '<html><head><meta charset="iso-8859-1"></head><body><p>Café crème</p></body></html>'
+    assert html_to_text(page.encode('iso-8859-1')) == "Café crème"
+    assert html_to_text(page.replace('iso-8859-1', 'utf-8').encode('utf-8')) == "Café crème"
+
+    declared = '<?xml version="1.0" encoding="utf-8"?><html><body><p>Prix 10 €</p></body></html>'
+    assert html_to_text(declared) == "Prix 10 €"
+    assert html_to_text(declared.encode('utf-8')) == "Prix 10 €"
+
+
+def test_markdown_parity_with_beautifulsoup():
+    """Same words, in the same order, as rendering with markdown + BeautifulSoup."""
+    markdown = pytest.importorskip("markdown")
+    bs4 = pytest.importorskip("bs4")
+
+    for path in sorted(glob.glob(os.path.join(DATA_DIR, '**', '*.md'), recursive=True)):
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        legacy = bs4.BeautifulSoup(markdown.markdown(content), 'html.parser').get_text()
+        assert _words(markdown_to_text(content)) == _words(legacy), path
+
+
+def test_html_parity_with_beautifulsoup():
+    bs4 = pytest.importorskip("bs4")
+
+    soup = bs4.BeautifulSoup(SAMPLE_HTML, 'html.parser')
+    for element in soup(['script', 'style', 'nav', 'footer', 'header']):
+        element.decompose()
+    assert _words(html_to_text(SAMPLE_HTML)) == _words(soup.get_text())
+
+
+if __name__ == "__main__":
+    test_markdown_keeps_headings_and_strips_syntax()
+    test_markdown_fenced_code_is_kept_verbatim()
+    test_html_skips_chrome_and_keeps_blocks()
+    test_html_accepts_bytes()
+    test_html_bytes_use_declared_charset()
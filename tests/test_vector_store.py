@@ -0,0 +1,258 @@
+"""
+Tests for VectorStore's incremental updates, caches and index swaps.
+
+The real VectorStore runs against an in-memory stand-in for the ChromaDB client
+and a tiny hashing "model", so no embedding model is downloaded.
+"""
+
+import contextlib
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+
+import numpy as np
+import pytest
+
+# Add parent directory to Python path so imports work correctly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+pytest.importorskip("chromadb")
+pytest.importorskip("sentence_transformers")
+
+from src import vector_store as vector_store_module
+from src.ann_index import ExactIndex
+from src.snapshot import export_snapshot, import_snapshot
+from src.vector_store import VectorStore
+
+POLICY = ("Returns are accepted within 30 days of delivery for a full refund. Items must be unused "
+          "and in their original packaging, with all accessories and the charging cable included.")
+DIM = 64
+
+
+def _doc(content, source):
+    return {'content': content, 'source': source, 'type': 'text'}
+
+
+class _FakeModel:
+    """Bag-of-words hashing embedder with the SentenceTransformer calls VectorStore makes."""
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+    def get_sentence_embedding_dimension(self):
+        return DIM
+
+    def encode(self, texts, normalize_embeddings=True, **kwargs):
+        embeddings = np.zeros((len(texts), DIM), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                embeddings[row, int(hashlib.md5(word.encode()).hexdigest(), 16) % DIM] += 1.0
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-9)
+
+
+class _FakeCollection:
+    """Dict-backed collection supporting the ChromaDB calls VectorStore makes."""
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = {}  # id -> (document, metadata, embedding)
+
+    def count(self):
+        return len(self.rows)
+
+    def add(self, ids, embeddings, documents, metadatas):
+        for doc_id, embedding, document, metadata in zip(ids, embeddings, documents, metadatas):
+            assert doc_id not in self.rows, f"duplicate id {doc_id}"
+            self.rows[doc_id] = (document, dict(metadata), list(embedding))
+
+    def update(self, ids, metadatas):
+        for doc_id, metadata in zip(ids, metadatas):
+            document, _, embedding = self.rows[doc_id]
+            self.rows[doc_id] = (document, dict(metadata), embedding)
+
+    def delete(self, ids):
+        for doc_id in ids:
+            self.rows.pop(doc_id, None)
+
+    def get(self, ids=None, where=None, include=(), offset=0, limit=None):
+        keys = [doc_id for doc_id in ids if doc_id in self.rows] if ids is not None else list(self.rows)
+        if where:
+            keys = [doc_id for doc_id in keys
+                    if all(self.rows[doc_id][1].get(field) == value for field, value in where.items())]
+        keys = keys[offset:offset + limit] if limit else keys[offset:]
+        return {
+            'ids': keys,
+            'documents': [self.rows[doc_id][0] for doc_id in keys],
+            'metadatas': [self.rows[doc_id][1] for doc_id in keys],
+            'embeddings': [self.rows[doc_id][2] for doc_id in keys],
+        }
+
+
+class _FakeClient:
+    def __init__(self, settings=None):
+        self.collections = {}
+
+    def get_collection(self, name):
+        if name not in self.collections:
+            raise ValueError(f"Collection {name} does not exist")
+        return self.collections[name]
+
+    def create_collection(self, name):
+        self.collections[name] = _FakeCollection(name)
+        return self.collections[name]
+
+    def get_or_create_collection(self, name):
+        return self.collections.get(name) or self.create_collection(name)
+
+    def delete_collection(self, name):
+        del self.collections[name]
+
+    def list_collections(self):
+        return list(self.collections)
+
+
+@contextlib.contextmanager
+def _store(**kwargs):
+    """A VectorStore with an exact in-process index, backed by the stand-ins above."""
+    saved = (vector_store_module.SentenceTransformer, vector_store_module.chromadb.Client,
+             vector_store_module.CHROMA_DIR, vector_store_module.chroma_accepts_numpy)
+    with tempfile.TemporaryDirectory() as tmp:
+        vector_store_module.SentenceTransformer = _FakeModel
+        vector_store_module.chromadb.Client = _FakeClient
+        vector_store_module.CHROMA_DIR = os.path.join(tmp, "chroma_db")
+        vector_store_module.chroma_accepts_numpy = lambda version=None: True
+        os.makedirs(vector_store_module.CHROMA_DIR)
+        try:
+            yield VectorStore(index_type='exact', index_path=os.path.join(tmp, "ann_index"), **kwargs)
+        finally:
+            (vector_store_module.SentenceTransformer, vector_store_module.chromadb.Client,
+             vector_store_module.CHROMA_DIR, vector_store_module.chroma_accepts_numpy) = saved
+
+
+def _sources(store):
+    return {metadata['source']: (document, metadata.get('aliases') or None)
+            for document, metadata, _ in store.collection.rows.values()}
+
+
+def test_edit_embeds_only_changed_chunks():
+    """Editing a source keeps the ids of its unchanged chunks and swaps only the edited one."""
+    with _store() as store:
+        first = [_doc("Buddy Bear speaks five languages.", "faq.md"), _doc("Shipping takes 3-5 days.", "faq.md")]
+        assert store.replace_source("faq.md", first) == {'added': 2, 'removed': 0, 'duplicates': 0}
+        kept_id = store.chunk_id(first[0])
+
+        edited = [first[0], _doc("Shipping takes 2 days.", "faq.md")]
+        assert store.replace_source("faq.md", edited) == {'added': 1, 'removed': 1, 'duplicates': 0}
+        assert set(store.collection.rows) == {kept_id, store.chunk_id(edited[1])}
+        assert set(store.index._positions) == set(store.collection.rows)
+
+        assert store.replace_source("faq.md", []) == {'added': 0, 'removed': 2, 'duplicates': 0}
+        assert store.get_collection_count() == 0 and len(store.index) == 0
+
+
+def test_deleting_canonical_chunk_promotes_first_alias():
+    """Duplicates become aliases; deleting the kept chunk re-homes it under its first alias."""
+    with _store() as store:
+        store.replace_source("faq.txt", [_doc(POLICY, "faq.txt")])
+        assert store.replace_source("mirror.html", [_doc(POLICY, "mirror.html")])['duplicates'] == 1
+        assert store.replace_source("copy.html", [_doc(POLICY, "copy.html")])['duplicates'] == 1
+        assert _sources(store) == {"faq.txt": (POLICY, "mirror.html\ncopy.html")}
+
+        assert store.replace_source("faq.txt", []) == {'added': 1, 'removed': 1, 'duplicates': 0}
+        assert _sources(store) == {"mirror.html": (POLICY, "copy.html")}
+        assert [doc['source'] for doc in store.search(POLICY, top_k=1)] == ["mirror.html"]
+
+        # Editing the new canonical copy away promotes the remaining alias
+        store.replace_source("mirror.html", [_doc("Parcels ship from Berlin.", "mirror.html")])
+        assert _sources(store) == {"mirror.html": ("Parcels ship from Berlin.", None), "copy.html": (POLICY, None)}
+
+
+def test_result_cache_is_dropped_after_a_write():
+    """Repeated searches are served from the cache until the live chunks change."""
+    with _store() as store:
+        store.replace_source("faq.md", [_doc("Shipping takes 3-5 days.", "faq.md")])
+        store.search("how long does shipping take", top_k=2)
+        first = store.search("how long does shipping take", top_k=2)
+        assert store.cache_stats['result_hits'] == 1 and len(first) == 1
+
+        store.replace_source("shipping.md", [_doc("Express shipping takes 1 day.", "shipping.md")])
+        after = store.search("how long does shipping take", top_k=2)
+        assert store.cache_stats['result_hits'] == 1 and store.cache_stats['result_misses'] == 2
+        assert {doc['source'] for doc in after} == {"faq.md", "shipping.md"}
+        assert store.cache_stats['embedding_hits'] == 2  # the query embedding is still reused
+
+
+class _SlowIndex(ExactIndex):
+    """Exact index whose searches wait for `release`, and that records being closed."""
+
+    def __init__(self, dim):
+        super().__init__(dim)
+        self.searching = threading.Event()
+        self.release = threading.Event()
+        self.closed = False
+
+    def search(self, queries, k):
+        self.searching.set()
+        self.release.wait(5)
+        return super().search(queries, k)
+
+    def close(self):
+        self.closed = True
+
+
+def test_swapped_out_index_is_closed_after_its_last_search():
+    """A reindex retires the old index; it is closed once the search still using it returns."""
+    with _store() as store:
+        store.replace_source("faq.md", [_doc("Shipping takes 3-5 days.", "faq.md")])
+        old = _SlowIndex(DIM)
+        old.add(list(store.index._positions), store.index.vectors.copy())
+        store.index = old
+
+        results = []
+        search = threading.Thread(target=lambda: results.append(store.search("shipping", top_k=1)))
+        search.start()
+        assert old.searching.wait(5)
+
+        name = store.reindex([_doc("Shipping takes 2 days.", "faq.md")])
+        assert store.collection.name == name and store.index is not old
+        assert not old.closed  # still in use by the running search
+
+        old.release.set()
+        search.join(5)
+        assert old.closed
+        assert results[0][0]['content'] == "Shipping takes 3-5 days."  # answered from the old version
+        assert store.search("shipping", top_k=1)[0]['content'] == "Shipping takes 2 days."
+
+
+def test_snapshot_import_is_a_new_version():
+    """Importing a snapshot reuses its embeddings and swaps in a new collection through the index."""
+    with _store() as source:
+        source.replace_source("faq.txt", [_doc(POLICY, "faq.txt"), _doc("Shipping takes 3-5 days.", "faq.txt")])
+        source.replace_source("mirror.html", [_doc(POLICY, "mirror.html")])
+        expected = {doc_id: (row[0], row[1]) for doc_id, row in source.collection.rows.items()}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "helpdesk.snap")
+            export_snapshot(source, path)
+
+            with _store() as store:
+                store.replace_source("old.md", [_doc("Parcels ship from Berlin.", "old.md")])
+                old = store.collection
+                store.model.encode = lambda *args, **kwargs: pytest.fail("snapshot chunks were re-embedded")
+
+                name = import_snapshot(path, store, batch_size=2)
+                assert store.collection.name == name and store.collection is not old
+                assert {doc_id: (row[0], row[1]) for doc_id, row in store.collection.rows.items()} == expected
+                assert set(store.index._positions) == set(expected)
+                assert old.count() == 1  # the previous version was not cleared first
+
+
+if __name__ == "__main__":
+    test_edit_embeds_only_changed_chunks()
+    test_deleting_canonical_chunk_promotes_first_alias()
+    test_result_cache_is_dropped_after_a_write()
+    test_swapped_out_index_is_closed_after_its_last_search()
+    test_snapshot_import_is_a_new_version()
+    print("✓ Vector store tests passed")